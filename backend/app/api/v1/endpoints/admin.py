@@ -3,7 +3,7 @@ Admin endpoints for course approval and management.
 Based on CLAUDE.md admin workflows.
 """
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from app.core.deps import get_current_admin
 from app.models.user import User
 from app.models.course import CourseStatus, CourseCategory, CourseLevel
@@ -30,6 +30,7 @@ logger = logging.getLogger(__name__)
 
 @router.get("/dashboard/stats", response_model=StandardResponse[AdminDashboardStats])
 async def get_admin_dashboard_stats(
+    refresh: bool = Query(False, description="Recompute the snapshot before returning"),
     current_admin: User = Depends(get_current_admin)
 ):
     """
@@ -40,9 +41,10 @@ async def get_admin_dashboard_stats(
     - Pending reviews count
     - Platform revenue stats
     - Recent activity
+    - Snapshot age (stats are precomputed; pass refresh=true for fresh numbers)
     """
     try:
-        stats = await AdminService.get_dashboard_stats()
+        stats = await AdminService.get_dashboard_stats(refresh=refresh)
         return StandardResponse(
             success=True,
             data=stats,
@@ -55,22 +57,29 @@ async def get_admin_dashboard_stats(
 
 @router.get("/courses/pending-review", response_model=StandardResponse[List[PendingReviewResponse]])
 async def get_pending_review_courses(
+    response: Response,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_admin: User = Depends(get_current_admin)
 ):
     """
     Get courses pending review/approval.
     
     Returns courses with status='review' that need admin approval.
+    The next page cursor is returned in the X-Next-Cursor header.
     """
     try:
-        courses = await AdminService.get_pending_review_courses(page, per_page)
+        courses, next_cursor = await AdminService.get_pending_review_courses(page, per_page, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return StandardResponse(
             success=True,
             data=courses,
             message="Pending review courses retrieved successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching pending courses: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch pending courses")
@@ -85,6 +94,7 @@ async def list_all_courses(
     category: Optional[CourseCategory] = Query(None, description="Filter by course category"),
     level: Optional[CourseLevel] = Query(None, description="Filter by course level"),
     creator_id: Optional[str] = Query(None, description="Filter by creator ID"),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_admin: User = Depends(get_current_admin)
 ):
     """
@@ -114,13 +124,16 @@ async def list_all_courses(
             search=search,
             category=category.value if category else None,
             level=level.value if level else None,
-            creator_id=creator_id
+            creator_id=creator_id,
+            cursor=cursor
         )
         return StandardResponse(
             success=True,
             data=courses,
             message="Courses retrieved successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching admin courses: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch courses")
@@ -369,6 +382,7 @@ async def list_users(
     role: Optional[str] = Query(None, pattern="^(student|creator|admin)$"),
     premium_only: Optional[bool] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_admin: User = Depends(get_current_admin)
 ):
     """
@@ -387,13 +401,16 @@ async def list_users(
             per_page=per_page,
             role=role,
             premium_only=premium_only,
-            search=search
+            search=search,
+            cursor=cursor
         )
         return StandardResponse(
             success=True,
             data=users,
             message="Users retrieved successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing users: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to list users")
@@ -533,7 +550,7 @@ async def bulk_user_action(
 
 # Payment Management Endpoints
 
-@router.get("/payments", response_model=StandardResponse[List[dict]])
+@router.get("/payments", response_model=StandardResponse[dict])
 async def list_payments(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
@@ -541,6 +558,7 @@ async def list_payments(
     user_id: Optional[str] = Query(None),
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_admin: User = Depends(get_current_admin)
 ):
     """
@@ -560,13 +578,16 @@ async def list_payments(
             status=status,
             user_id=user_id,
             date_from=date_from,
-            date_to=date_to
+            date_to=date_to,
+            cursor=cursor
         )
         return StandardResponse(
             success=True,
             data=payments,
             message="Payments retrieved successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing payments: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to list payments")
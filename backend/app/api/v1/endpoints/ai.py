@@ -3,14 +3,16 @@ AI endpoints for chat functionality and educational assistance
 Handles PydanticAI integration with Claude 3.5 Sonnet
 """
 
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from app.core.deps import get_current_user
 from app.models.user import User
 from app.models.enrollment import Enrollment, EnrollmentType
 from app.services.ai_service import ai_service
+from app.services.ai_conversation_service import ai_conversation_service
 from app.schemas.base import StandardResponse
 from app.schemas.ai import (
     AIChatRequest,
@@ -21,8 +23,10 @@ from app.schemas.ai import (
     AISuggestionsResponse,
     AIHealthCheckResponse,
     ConversationHistory,
-    AIErrorResponse
+    AIErrorResponse,
+    AIUsageStats
 )
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -195,6 +199,60 @@ async def ai_chat(
         )
 
 
+async def _sse_events(
+    first_event: Dict[str, Any],
+    events: AsyncIterator[Dict[str, Any]]
+) -> AsyncIterator[str]:
+    """Format chat stream events as Server-Sent Events"""
+    yield f"event: {first_event['event']}\ndata: {json.dumps(first_event['data'], default=str)}\n\n"
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    request: AIChatRequest,
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Chat with AI Study Buddy, streaming the answer as it is generated
+    
+    Returns `text/event-stream` with `delta` events (`{"text": ...}`) followed by
+    one `done` event (same fields as /chat) or an `error` event.
+    """
+    # Check AI access - paid users only
+    course_id = request.context.get("course_id") if request.context else None
+    if not await _check_ai_access(current_user, course_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="AI Study Buddy requires a paid course enrollment or Pro subscription"
+        )
+
+    events = ai_service.chat_stream(
+        user_id=str(current_user.id),
+        message=request.message,
+        context=request.context
+    )
+
+    # Rate limiting happens before generation - surface it as a proper status code
+    first_event = await events.__anext__()
+    if first_event["event"] == "error" and "rate limit" in first_event["data"]["error"].lower():
+        await events.aclose()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=ChatErrorResponse(
+                error=first_event["data"]["error"],
+                retry_after=first_event["data"].get("retry_after")
+            ).dict()
+        )
+
+    return StreamingResponse(
+        _sse_events(first_event, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/conversation-history", response_model=StandardResponse[ConversationHistory])
 async def get_conversation_history(
     current_user: User = Depends(get_current_user)
@@ -263,6 +321,32 @@ async def clear_conversation_history(
         )
 
 
+@router.get("/usage", response_model=StandardResponse[AIUsageStats])
+async def get_ai_usage(
+    current_user: User = Depends(get_current_user)
+) -> StandardResponse[AIUsageStats]:
+    """
+    Get AI Study Buddy usage for the current user
+    
+    Message and token totals (all time and today) and messages in the
+    current hourly rate limit window.
+    """
+    try:
+        stats = await ai_conversation_service.get_usage_stats(str(current_user.id))
+        return StandardResponse(
+            success=True,
+            data=AIUsageStats(**stats),
+            message="AI usage retrieved successfully"
+        )
+        
+    except Exception as e:
+        logger.error(f"Get AI usage error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve AI usage"
+        )
+
+
 @router.post("/generate-quiz", 
              response_model=StandardResponse[AIQuizGenerationResponse],
              dependencies=[Depends(get_current_user)])
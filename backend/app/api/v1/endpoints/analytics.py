@@ -6,6 +6,7 @@ Provides insights on course performance, student engagement, and revenue
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from app.core.deps import get_current_user
 from app.models.user import User
 from app.models.course import Course
@@ -14,6 +15,9 @@ from app.models.progress import Progress
 from app.models.payment import Payment
 from app.schemas.base import StandardResponse
 from app.core.database import get_database
+from app.services.analytics_service import AnalyticsService, ROSTER_SORT_FIELDS
+import csv
+import io
 import logging
 from bson import ObjectId
 
@@ -307,8 +311,10 @@ async def get_course_analytics(
 async def get_student_analytics(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    sort_by: str = Query("progress", description="Sort by: progress, last_activity, courses, completed"),
+    format: str = Query("json", description="Response format: json or csv (full roster)"),
     current_user: User = Depends(get_current_user)
-) -> StandardResponse[Dict[str, Any]]:
+):
     """
     Get analytics about students enrolled in creator's courses
     
@@ -316,6 +322,8 @@ async def get_student_analytics(
     - Student list with progress
     - Engagement metrics
     - Learning patterns
+    
+    format=csv streams the full roster as a CSV download (limit/offset ignored).
     """
     try:
         # Verify user is a creator
@@ -325,80 +333,26 @@ async def get_student_analytics(
                 detail="Only content creators can access student analytics"
             )
         
-        # Get creator's courses
-        courses = await Course.find(Course.creator_id == str(current_user.id)).to_list()
-        course_ids = [str(course.id) for course in courses]
-        course_map = {str(course.id): course for course in courses}
-        
-        # Get all enrollments for creator's courses
-        enrollments = await get_database().enrollments.find({
-            "course_id": {"$in": course_ids}
-        }).skip(offset).limit(limit).to_list(limit)
-        
-        # Get unique student IDs
-        student_ids = list(set(enrollment["user_id"] for enrollment in enrollments))
-        
-        # Get student information
-        students = await get_database().users.find({
-            "_id": {"$in": [ObjectId(sid) for sid in student_ids]}
-        }).to_list(None)
-        
-        student_map = {str(student["_id"]): student for student in students}
-        
-        # Build student analytics
-        student_analytics = []
-        
-        for student_id in student_ids:
-            student = student_map.get(student_id)
-            if not student:
-                continue
-            
-            # Get all enrollments for this student in creator's courses
-            student_enrollments = [e for e in enrollments if e["user_id"] == student_id]
-            
-            # Calculate metrics
-            total_courses = len(student_enrollments)
-            completed_courses = sum(1 for e in student_enrollments if e.get("progress", {}).get("is_completed"))
-            total_progress = sum(e.get("progress", {}).get("completion_percentage", 0) for e in student_enrollments)
-            average_progress = (total_progress / total_courses) if total_courses > 0 else 0
-            
-            # Get last activity
-            last_activity = max(
-                (e.get("progress", {}).get("last_accessed", e["enrolled_at"]) for e in student_enrollments),
-                default=None
+        if sort_by not in ROSTER_SORT_FIELDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid sort. Must be one of: {', '.join(ROSTER_SORT_FIELDS)}"
             )
-            
-            student_analytics.append({
-                "student": {
-                    "id": student_id,
-                    "name": student.get("name", "Unknown"),
-                    "email": student.get("email", ""),
-                    "joined_date": student.get("created_at", datetime.utcnow()).isoformat()
-                },
-                "metrics": {
-                    "courses_enrolled": total_courses,
-                    "courses_completed": completed_courses,
-                    "average_progress": round(average_progress, 1),
-                    "last_activity": last_activity.isoformat() if last_activity else None
-                },
-                "courses": [
-                    {
-                        "course_id": e["course_id"],
-                        "course_title": course_map.get(e["course_id"], {}).title if e["course_id"] in course_map else "Unknown",
-                        "progress": e.get("progress", {}).get("completion_percentage", 0),
-                        "enrolled_at": e["enrolled_at"].isoformat()
-                    }
-                    for e in student_enrollments
-                ]
-            })
         
-        # Sort by most active students
-        student_analytics.sort(key=lambda x: x["metrics"]["average_progress"], reverse=True)
+        if format == "csv":
+            filename = f"students_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+            return StreamingResponse(
+                _stream_roster_csv(str(current_user.id), sort_by),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
         
-        # Get total count
-        total_count = await get_database().enrollments.count_documents({
-            "course_id": {"$in": course_ids}
-        })
+        student_analytics, total_count = await AnalyticsService.get_creator_student_roster(
+            str(current_user.id),
+            limit=limit,
+            offset=offset,
+            sort_by=sort_by
+        )
         
         return StandardResponse(
             success=True,
@@ -424,6 +378,34 @@ async def get_student_analytics(
         )
 
 
+async def _stream_roster_csv(creator_id: str, sort_by: str):
+    """Yield the roster as CSV chunks, one student per row"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([
+        "Student ID", "Name", "Email", "Joined Date", "Courses Enrolled",
+        "Courses Completed", "Average Progress", "Last Activity", "Courses"
+    ])
+    
+    async for entry in AnalyticsService.iter_creator_student_roster(creator_id, sort_by=sort_by):
+        student = entry["student"]
+        metrics = entry["metrics"]
+        writer.writerow([
+            student["id"], student["name"], student["email"], student["joined_date"],
+            metrics["courses_enrolled"], metrics["courses_completed"],
+            metrics["average_progress"], metrics["last_activity"] or "",
+            "; ".join(course["course_title"] for course in entry["courses"])
+        ])
+        
+        # Flush in chunks to keep memory bounded
+        if output.tell() >= 64 * 1024:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    
+    yield output.getvalue()
+
+
 @router.get("/creator/revenue", response_model=StandardResponse[Dict[str, Any]])
 async def get_revenue_analytics(
     time_range: str = Query("30days", description="Time range: 7days, 30days, 90days, year"),
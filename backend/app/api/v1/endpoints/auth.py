@@ -14,6 +14,7 @@ import logging
 
 from app.core.config import settings
 from app.core.database import get_database
+from app.core.principal import invalidate_user_cache
 from app.core.email import email_service
 from app.core.rate_limit import rate_limit, reset_rate_limit, get_client_ip
 from app.models.user import User
@@ -101,7 +102,8 @@ def create_refresh_jwt(subject: str, expires_delta: timedelta = None) -> str:
     else:
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    # iat lets blanket revocations (logout everywhere, deactivation) cut off older tokens only
+    to_encode = {"exp": expire, "iat": datetime.utcnow(), "sub": str(subject), "type": "refresh"}
     encoded_jwt = jwt.encode(
         to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM
     )
@@ -217,6 +219,7 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
             {"_id": user["_id"]},
             {"$set": {"last_login": datetime.utcnow()}}
         )
+        invalidate_user_cache(user["_id"])
 
         # Reset rate limit on successful login
         ip = get_client_ip(request)
@@ -341,6 +344,7 @@ async def verify_email(request: Request, token: str) -> StandardResponse[dict]:
             }
         }
     )
+    invalidate_user_cache(user["_id"])
     
     # If no document was modified, user was already verified by another request
     if update_result.modified_count == 0:
@@ -408,6 +412,7 @@ async def oauth_login(request: Request, oauth_data: OAuthUserCreate) -> Standard
                 }
             }
         )
+        invalidate_user_cache(new_user.id)
         
         # Get user doc for token creation
         user_doc = await db.users.find_one({"_id": new_user.id})
@@ -446,6 +451,7 @@ async def oauth_login(request: Request, oauth_data: OAuthUserCreate) -> Standard
                 }
             }
         )
+        invalidate_user_cache(user["_id"])
         user = await db.users.find_one({"_id": user["_id"]})
         user_doc = user  # For consistency in token creation below
     
@@ -455,6 +461,7 @@ async def oauth_login(request: Request, oauth_data: OAuthUserCreate) -> Standard
         {"_id": user_doc["_id"]},
         {"$set": {"last_login": datetime.utcnow()}}
     )
+    invalidate_user_cache(user_doc["_id"])
     
     # Create tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -496,6 +503,14 @@ async def refresh_access_token(token_request: RefreshTokenRequest) -> StandardRe
             detail="Invalid refresh token"
         )
     
+    # Revoked by logout or a blanket blacklist issued after it (same index as access tokens)
+    from app.services.token_blacklist_service import token_blacklist_service
+    if await token_blacklist_service.is_token_blacklisted(token_request.refresh_token, payload=payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked"
+        )
+    
     # Get user data to include in new access token
     db = get_database()
     user = await db.users.find_one({"_id": ObjectId(payload.get("sub"))})
@@ -506,6 +521,13 @@ async def refresh_access_token(token_request: RefreshTokenRequest) -> StandardRe
             detail="User not found"
         )
     
+    # Deactivated accounts can't mint new tokens (read fresh, not from the user snapshot)
+    if user.get("status") == "deactivated":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account has been deactivated"
+        )
+    
     # Create new access token with user claims
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -643,6 +665,7 @@ async def forgot_password(request: Request, reset_request: PasswordResetRequest)
             }
         }
     )
+    invalidate_user_cache(user["_id"])
     
     # Send password reset email
     try:
@@ -693,6 +716,7 @@ async def reset_password(reset_data: PasswordReset) -> StandardResponse[dict]:
             }
         }
     )
+    invalidate_user_cache(user["_id"])
     
     return StandardResponse(
         success=True,
@@ -738,6 +762,7 @@ async def resend_verification(request: Request, email_request: EmailVerification
             }
         }
     )
+    invalidate_user_cache(user["_id"])
     
     # Send verification email
     try:
@@ -806,6 +831,7 @@ async def change_password(
             }
         }
     )
+    invalidate_user_cache(user["_id"])
     
     logger.info(f"Password changed for user: {user['email']}")
     
@@ -905,6 +931,7 @@ async def update_preferences(
         {"_id": user["_id"]},
         {"$set": update_data}
     )
+    invalidate_user_cache(user["_id"])
     
     # Get updated preferences
     updated_user = await db.users.find_one({"_id": user["_id"]})
@@ -76,6 +76,7 @@ async def list_courses(
     search: Optional[str] = None,
     is_free: Optional[bool] = None,
     language: Optional[str] = Query(None, description="Filter by course language (vi, en)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_user: Optional[User] = Depends(get_current_optional_user)
 ) -> StandardResponse[CourseListResponse]:
     """
@@ -89,6 +90,7 @@ async def list_courses(
     - search: Search in title and description
     - is_free: Filter free/paid courses
     - language: Filter by course language (vi, en)
+    - cursor: Keyset pagination token from the previous page's next_cursor
 
     Access control:
     - Students/Unauthenticated: Only published courses
@@ -109,7 +111,8 @@ async def list_courses(
             status=status,
             creator_id=creator_id,
             is_free=is_free,
-            language=language
+            language=language,
+            cursor=cursor
         )
         
         # Batch check access for all courses at once (avoid N+1 queries)
@@ -142,10 +145,13 @@ async def list_courses(
                 total=result["total"],
                 page=result["page"],
                 per_page=result["per_page"],
-                total_pages=result["total_pages"]
+                total_pages=result["total_pages"],
+                next_cursor=result["next_cursor"]
             ),
             message="Courses retrieved successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing courses: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to list courses")
@@ -159,6 +165,7 @@ async def get_my_courses(
     search: Optional[str] = None,
     status: Optional[CourseStatus] = None,
     category: Optional[CourseCategory] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_user: User = Depends(get_current_user)
 ) -> StandardResponse[CourseListResponse]:
     """Get current creator's own courses for dashboard."""
@@ -178,7 +185,8 @@ async def get_my_courses(
             category=category,
             creator_id=str(current_user.id),
             level=None,
-            is_free=None
+            is_free=None,
+            cursor=cursor
         )
         
         # Convert courses to response format (copy from list_courses logic)
@@ -201,7 +209,8 @@ async def get_my_courses(
                 total=result["total"],
                 page=result["page"],
                 per_page=result["per_page"],
-                total_pages=result["total_pages"]
+                total_pages=result["total_pages"],
+                next_cursor=result["next_cursor"]
             ),
             message="Creator courses retrieved successfully"
         )
@@ -3,7 +3,7 @@ FAQ API endpoints
 """
 # Standard library imports
 import logging
-from typing import List
+from typing import List, Optional
 
 # Third-party imports
 from fastapi import APIRouter, Depends, Query, HTTPException
@@ -33,6 +33,7 @@ async def get_faqs(
     is_published: bool = Query(None, description="Filter by published status"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     sort_by: str = Query("priority", pattern="^(priority|view_count|created_at)$"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
 ):
@@ -52,6 +53,7 @@ async def get_faqs(
         is_published=is_published,
         page=page,
         per_page=per_page,
+        cursor=cursor,
         sort_by=sort_by,
         sort_order=sort_order
     )
@@ -154,6 +156,7 @@ async def get_admin_faqs(
     is_published: bool = Query(None, description="Filter by published status (None = all)"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     sort_by: str = Query("priority", pattern="^(priority|view_count|created_at)$"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
     current_user: User = Depends(get_admin_user)
@@ -169,6 +172,7 @@ async def get_admin_faqs(
         is_published=is_published,  # None means show all
         page=page,
         per_page=per_page,
+        cursor=cursor,
         sort_by=sort_by,
         sort_order=sort_order
     )
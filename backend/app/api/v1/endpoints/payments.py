@@ -26,6 +26,7 @@ from app.schemas.payment import (
 )
 from app.schemas.base import StandardResponse
 from app.services.payment_service import PaymentService
+from app.services.webhook_queue_service import webhook_queue_service
 from app.services.course_service import CourseService
 from app.core.exceptions import NotFoundException
 from beanie import PydanticObjectId
@@ -428,7 +429,12 @@ async def stripe_webhook(
             logger.error(f"Invalid webhook payload: {str(e)}")
             raise HTTPException(status_code=400, detail="Invalid payload")
         
-        # Handle the event
+        # Queue the event for background processing (deduped by event id)
+        if webhook_queue_service.is_running:
+            await webhook_queue_service.ingest(event)
+            return {"status": "success"}
+        
+        # No workers running: handle the event inline
         success = await PaymentService.handle_webhook_event(event)
         
         if not success:
@@ -450,6 +456,42 @@ async def stripe_webhook(
         )
 
 
+@router.post("/webhook/replay", response_model=StandardResponse[dict])
+async def replay_webhook_events(
+    event_id: Optional[str] = Query(None, description="Replay a single event; default replays all failed events"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Re-queue failed (or specific) Stripe webhook events for processing (admin only).
+    """
+    try:
+        if current_user.role != "admin":
+            raise HTTPException(
+                status_code=403,
+                detail="Only admins can replay webhook events"
+            )
+        
+        requeued = await webhook_queue_service.replay(event_id=event_id)
+        
+        return StandardResponse(
+            success=True,
+            data={
+                "requeued": requeued,
+                "queue": await webhook_queue_service.get_stats()
+            },
+            message=f"{requeued} webhook event(s) re-queued"
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Webhook replay error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to replay webhook events"
+        )
+
+
 @router.get("/subscription/status", response_model=StandardResponse[dict])
 async def get_subscription_status(
     current_user: User = Depends(get_current_user)
@@ -528,7 +570,7 @@ async def get_payment_analytics_dashboard(
     - 'summary': Only summary metrics
     - 'trends': Only trends data
     
-    This reduces API calls and improves performance by fetching data once.
+    All metrics come from a single server-side $facet aggregation.
     """
     try:
         
@@ -539,188 +581,12 @@ async def get_payment_analytics_dashboard(
                 detail="Only admins and creators can access payment analytics"
             )
         
-        # Single data fetch for efficiency
-        from datetime import datetime, timedelta
-        from collections import defaultdict
-        
-        now = datetime.utcnow()
-        month_start = datetime(now.year, now.month, 1)
-        
-        # Determine date range for trends
-        end_date = now
-        start_date = end_date - timedelta(days=days)
-        
-        # Get all payments - single query
-        all_payments = await Payment.find({}).to_list()
-        
-        # Filter payments by creator if not admin
-        if current_user.role == "creator":
-            creator_courses = await Course.find({"creator_id": current_user.id}).to_list()
-            course_ids = [course.id for course in creator_courses]
-            all_payments = [p for p in all_payments if p.course_id and p.course_id in course_ids]
-        
-        # Initialize response
-        response_data = {}
-        
-        # SUMMARY DATA (if requested)
-        if include in ["all", "summary"]:
-            # Calculate summary metrics
-            total_revenue = sum(p.amount for p in all_payments if p.status == PaymentStatus.COMPLETED)
-            month_revenue = sum(
-                p.amount for p in all_payments 
-                if p.status == PaymentStatus.COMPLETED and p.created_at >= month_start
-            )
-            
-            # Payment counts by status
-            payment_counts = {}
-            for status in PaymentStatus:
-                payment_counts[status.value] = len([p for p in all_payments if p.status == status])
-            
-            # Active subscriptions
-            if current_user.role == "admin":
-                thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-                active_subscriptions = len([
-                    p for p in all_payments 
-                    if p.type == PaymentType.SUBSCRIPTION 
-                    and p.status == PaymentStatus.COMPLETED
-                    and p.created_at >= thirty_days_ago
-                ])
-            else:
-                active_subscriptions = 0
-            
-            # Average payment value
-            completed_payments = [p for p in all_payments if p.status == PaymentStatus.COMPLETED]
-            avg_payment_value = (
-                sum(p.amount for p in completed_payments) / len(completed_payments)
-                if completed_payments else 0
-            )
-            
-            # Payment types breakdown
-            course_payments = len([p for p in all_payments if p.type == PaymentType.COURSE_PURCHASE])
-            subscription_payments = len([p for p in all_payments if p.type == PaymentType.SUBSCRIPTION])
-            
-            response_data["summary"] = {
-                "revenue": {
-                    "total": round(total_revenue, 2),
-                    "this_month": round(month_revenue, 2),
-                    "average_payment": round(avg_payment_value, 2)
-                },
-                "payments": {
-                    "total_count": len(all_payments),
-                    "by_status": payment_counts,
-                    "by_type": {
-                        "course_purchases": course_payments,
-                        "subscriptions": subscription_payments
-                    }
-                },
-                "subscriptions": {
-                    "active_count": active_subscriptions
-                },
-                "period": {
-                    "from": month_start.isoformat(),
-                    "to": now.isoformat()
-                }
-            }
-        
-        # TRENDS DATA (if requested)
-        if include in ["all", "trends"]:
-            # Filter payments for date range
-            payments_in_range = [p for p in all_payments 
-                                 if p.created_at >= start_date and p.created_at <= end_date]
-            
-            # Revenue trends by day
-            daily_revenue = defaultdict(float)
-            daily_payment_counts = defaultdict(int)
-            
-            for payment in payments_in_range:
-                if payment.status == PaymentStatus.COMPLETED:
-                    day_key = payment.created_at.strftime("%Y-%m-%d")
-                    daily_revenue[day_key] += payment.amount
-                    daily_payment_counts[day_key] += 1
-            
-            # Generate complete date range
-            revenue_trends = []
-            current_date = start_date
-            while current_date <= end_date:
-                day_key = current_date.strftime("%Y-%m-%d")
-                revenue_trends.append({
-                    "date": day_key,
-                    "revenue": round(daily_revenue.get(day_key, 0), 2),
-                    "payment_count": daily_payment_counts.get(day_key, 0)
-                })
-                current_date += timedelta(days=1)
-            
-            # Payment success/failure rates
-            total_payments = len(payments_in_range)
-            successful_payments = len([p for p in payments_in_range if p.status == PaymentStatus.COMPLETED])
-            failed_payments = len([p for p in payments_in_range if p.status == PaymentStatus.FAILED])
-            pending_payments = len([p for p in payments_in_range if p.status == PaymentStatus.PENDING])
-            
-            success_rate = (successful_payments / total_payments * 100) if total_payments > 0 else 0
-            
-            # Top paying courses
-            course_revenue = defaultdict(float)
-            course_titles = {}
-            
-            for payment in payments_in_range:
-                if payment.status == PaymentStatus.COMPLETED and payment.course_id:
-                    course_revenue[str(payment.course_id)] += payment.amount
-            
-            # Get course titles for top courses
-            if course_revenue:
-                top_course_ids = sorted(course_revenue.keys(), key=lambda x: course_revenue[x], reverse=True)[:5]
-                for course_id in top_course_ids:
-                    try:
-                        course = await Course.get(course_id)
-                        if course:
-                            course_titles[course_id] = course.title
-                    except:
-                        course_titles[course_id] = "Unknown Course"
-            
-            top_courses = [
-                {
-                    "course_id": course_id,
-                    "course_title": course_titles.get(course_id, "Unknown Course"),
-                    "revenue": round(course_revenue[course_id], 2),
-                    "payment_count": len([p for p in payments_in_range 
-                                        if p.status == PaymentStatus.COMPLETED and str(p.course_id) == course_id])
-                }
-                for course_id in sorted(course_revenue.keys(), key=lambda x: course_revenue[x], reverse=True)[:5]
-            ]
-            
-            # Payment type breakdown
-            course_purchases = [p for p in payments_in_range if p.type == PaymentType.COURSE_PURCHASE]
-            subscriptions = [p for p in payments_in_range if p.type == PaymentType.SUBSCRIPTION]
-            
-            course_revenue_total = sum(p.amount for p in course_purchases if p.status == PaymentStatus.COMPLETED)
-            subscription_revenue_total = sum(p.amount for p in subscriptions if p.status == PaymentStatus.COMPLETED)
-            
-            response_data["trends"] = {
-                "period": {
-                    "start_date": start_date.strftime("%Y-%m-%d"),
-                    "end_date": end_date.strftime("%Y-%m-%d"),
-                    "days": days
-                },
-                "revenue_trends": revenue_trends,
-                "payment_stats": {
-                    "total_payments": total_payments,
-                    "successful": successful_payments,
-                    "failed": failed_payments,
-                    "pending": pending_payments,
-                    "success_rate": round(success_rate, 2)
-                },
-                "top_courses": top_courses,
-                "payment_types": {
-                    "course_purchases": {
-                        "count": len(course_purchases),
-                        "revenue": round(course_revenue_total, 2)
-                    },
-                    "subscriptions": {
-                        "count": len(subscriptions),
-                        "revenue": round(subscription_revenue_total, 2)
-                    }
-                }
-            }
+        # Single aggregation, scoped to the creator's courses for creators
+        response_data = await PaymentService.get_analytics_dashboard(
+            include=include,
+            days=days,
+            creator_id=current_user.id if current_user.role == "creator" else None
+        )
         
         # Return optimized response
         return {
@@ -3,12 +3,17 @@ Performance monitoring endpoints for admin users
 """
 
 from fastapi import APIRouter, Depends, Query
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
 
 from app.core.deps import get_admin_user
 from app.core.performance import performance_monitor
+from app.core.rate_limit import rate_limit_stats
 from app.services.db_optimization import db_optimizer
+from app.services.analytics_rollup_service import analytics_rollup_service
+from app.services.payment_provider import payment_provider
+from app.services.ai_cache import ai_response_cache
+from app.services.course_counter_service import course_counter_service
 from app.schemas.base import StandardResponse
 from app.models.user import User
 
@@ -56,6 +61,67 @@ async def get_performance_metrics(
     )
 
 
+@router.get("/rate-limits", response_model=StandardResponse[Dict[str, Any]])
+async def get_rate_limit_metrics(
+    current_user: User = Depends(get_admin_user)
+) -> StandardResponse[Dict[str, Any]]:
+    """
+    Get rate limit hit/deny counters per endpoint (admin only)
+    
+    Counters are per process and reset on restart.
+    """
+    return StandardResponse(
+        success=True,
+        message="Rate limit metrics retrieved successfully",
+        data={
+            "endpoints": rate_limit_stats.get_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+
+@router.get("/payment-provider", response_model=StandardResponse[Dict[str, Any]])
+async def get_payment_provider_metrics(
+    current_user: User = Depends(get_admin_user)
+) -> StandardResponse[Dict[str, Any]]:
+    """
+    Get payment provider call/retry/error counters and latency (admin only)
+    
+    Counters are per process and reset on restart.
+    """
+    metrics = performance_monitor.get_metrics()
+    
+    return StandardResponse(
+        success=True,
+        message="Payment provider metrics retrieved successfully",
+        data={
+            "provider": payment_provider.name,
+            "operations": payment_provider.stats.get_stats(),
+            "latency": {k: v for k, v in metrics.items() if k.startswith(f"payments.{payment_provider.name}.")},
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+
+@router.get("/ai-cache", response_model=StandardResponse[Dict[str, Any]])
+async def get_ai_cache_metrics(
+    current_user: User = Depends(get_admin_user)
+) -> StandardResponse[Dict[str, Any]]:
+    """
+    Get AI response cache hit rate and generation time saved per request kind (admin only)
+    
+    Counters are per process and reset on restart.
+    """
+    return StandardResponse(
+        success=True,
+        message="AI cache metrics retrieved successfully",
+        data={
+            **ai_response_cache.get_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+
 @router.post("/optimize/indexes", response_model=StandardResponse[Dict[str, str]])
 async def optimize_database_indexes(
     current_user: User = Depends(get_admin_user)
@@ -116,6 +182,51 @@ async def clear_cache(
     )
 
 
+@router.post("/analytics/rollups/rebuild", response_model=StandardResponse[Dict[str, Any]])
+async def rebuild_analytics_rollups(
+    course_id: Optional[str] = Query(None, description="Only rebuild this course"),
+    days: Optional[int] = Query(None, ge=1, le=3650, description="Only rebuild the last N days (watch time is left as counted live)"),
+    current_user: User = Depends(get_admin_user)
+) -> StandardResponse[Dict[str, Any]]:
+    """
+    Rebuild daily analytics rollups from raw collections (admin only)
+    """
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    result = await analytics_rollup_service.rebuild(
+        course_ids=[course_id] if course_id else None,
+        since=since
+    )
+    
+    return StandardResponse(
+        success=True,
+        message="Analytics rollups rebuilt successfully",
+        data={
+            **result,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+
+@router.post("/counters/reconcile", response_model=StandardResponse[Dict[str, Any]])
+async def reconcile_course_counters(
+    course_id: Optional[str] = Query(None, description="Only reconcile this course"),
+    current_user: User = Depends(get_admin_user)
+) -> StandardResponse[Dict[str, Any]]:
+    """
+    Recompute course like/dislike/review counters and repair drift (admin only)
+    """
+    result = await course_counter_service.reconcile([course_id] if course_id else None)
+    
+    return StandardResponse(
+        success=True,
+        message="Course counters reconciled successfully",
+        data={
+            **result,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+
 @router.get("/slow-queries", response_model=StandardResponse[Dict[str, Any]])
 async def analyze_slow_queries(
     current_user: User = Depends(get_admin_user)
@@ -90,7 +90,7 @@ async def update_video_progress(
             message="Preview mode - Progress not saved"
         )
     try:
-        progress = await progress_service.update_video_progress(
+        progress, just_completed = await progress_service.update_video_progress(
             lesson_id,
             str(current_user.id),
             update_data.watch_percentage,
@@ -103,7 +103,9 @@ async def update_video_progress(
         if progress.is_completed:
             message = "Lesson completed! Next lesson unlocked."
 
-            # Auto-issue certificate if course is now fully completed
+        # Auto-issue certificate if this update completed the course
+        # (only a lesson completing can; rewatch heartbeats skip the lookups)
+        if just_completed:
             try:
                 enrollment = await Enrollment.find_one({
                     "user_id": str(current_user.id),
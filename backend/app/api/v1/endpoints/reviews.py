@@ -58,6 +58,7 @@ async def get_course_reviews(
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_user: Optional[User] = Depends(get_current_optional_user)
 ):
     """Get reviews for a course"""
@@ -69,7 +70,8 @@ async def get_course_reviews(
             sort_by=sort_by,
             sort_order=sort_order,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor
         )
         
         result = await review_service.get_reviews(query, current_user)
@@ -109,6 +111,7 @@ async def get_user_reviews(
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     current_user: Optional[User] = Depends(get_current_optional_user)
 ):
     """Get reviews by a specific user"""
@@ -118,7 +121,8 @@ async def get_user_reviews(
             sort_by=sort_by,
             sort_order=sort_order,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor
         )
         
         result = await review_service.get_reviews(query, current_user)
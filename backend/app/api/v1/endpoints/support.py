@@ -191,6 +191,7 @@ async def get_tickets(
     user_id: Optional[str] = None,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page (overrides page)"),
     sort_by: str = "created_at",
     sort_order: str = "desc",
     current_user: User = Depends(get_current_user)
@@ -219,6 +220,7 @@ async def get_tickets(
             user_id=user_id,
             page=page,
             per_page=per_page,
+            cursor=cursor,
             sort_by=sort_by,
             sort_order=sort_order
         )
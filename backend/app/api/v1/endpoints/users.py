@@ -8,6 +8,7 @@ from app.models.course import Course
 from app.models.lesson import Lesson
 from app.models.chapter import Chapter
 from app.core.deps import get_current_user
+from app.core.principal import invalidate_user_cache
 from app.services.enrollment_service import enrollment_service
 from app.services.progress_service import progress_service
 from app.schemas.user import UserResponse, UserProfileUpdate, DashboardData
@@ -1145,6 +1146,7 @@ async def delete_my_account(
                     }
                 }
             )
+            invalidate_user_cache(user_doc["_id"])
         else:
             # HARD DELETE: User has no important data - safe to remove completely
             logger.info(f"🗑️ HARD DELETE: User {user_id} has no payments/certificates - performing complete deletion")
@@ -1167,6 +1169,7 @@ async def delete_my_account(
 
             # 5. Delete the user account itself
             await db.users.delete_one({"_id": user_doc["_id"]})
+            invalidate_user_cache(user_doc["_id"])
 
         logger.info(f"✅ Account deleted for user: {user_doc['email']}")
 
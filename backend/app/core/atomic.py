@@ -0,0 +1,114 @@
+"""
+Atomic partial updates.
+Helpers that build $inc / $max / $min / $set update documents and apply them
+with a single update_one, find_one_and_update or bulk_write. Hot counters and
+monotonic fields are then one small write with no prior read, and concurrent
+updates are never lost the way read-modify-save() loses them.
+"""
+from typing import Any, Dict, List, Optional, Type, TypeVar, Union
+
+from beanie import Document
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+DocumentT = TypeVar("DocumentT", bound=Document)
+
+
+def id_filter(doc_id: Any) -> Dict[str, Any]:
+    """{"_id": ...} filter, converting string ids to ObjectId when valid"""
+    if isinstance(doc_id, str) and ObjectId.is_valid(doc_id):
+        doc_id = ObjectId(doc_id)
+    return {"_id": doc_id}
+
+
+class AtomicUpdate:
+    """Builder for a partial update document"""
+
+    def __init__(self):
+        self._operators: Dict[str, Dict[str, Any]] = {}
+
+    def _add(self, operator: str, field: str, value: Any) -> "AtomicUpdate":
+        self._operators.setdefault(operator, {})[field] = value
+        return self
+
+    def inc(self, field: str, amount: Union[int, float] = 1) -> "AtomicUpdate":
+        """Add `amount` (negative to decrement); zero amounts are skipped"""
+        if amount:
+            self._add("$inc", field, amount)
+        return self
+
+    def max(self, field: str, value: Any) -> "AtomicUpdate":
+        """Set the field only if `value` is greater (never moves backwards)"""
+        return self._add("$max", field, value)
+
+    def min(self, field: str, value: Any) -> "AtomicUpdate":
+        """Set the field only if `value` is smaller"""
+        return self._add("$min", field, value)
+
+    def set(self, field: str, value: Any) -> "AtomicUpdate":
+        return self._add("$set", field, value)
+
+    def set_many(self, values: Dict[str, Any]) -> "AtomicUpdate":
+        for field, value in values.items():
+            self._add("$set", field, value)
+        return self
+
+    def set_on_insert(self, field: str, value: Any) -> "AtomicUpdate":
+        return self._add("$setOnInsert", field, value)
+
+    def unset(self, field: str) -> "AtomicUpdate":
+        return self._add("$unset", field, "")
+
+    def __bool__(self) -> bool:
+        return bool(self._operators)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {operator: dict(fields) for operator, fields in self._operators.items()}
+
+    def as_operation(self, filter_dict: Dict[str, Any], upsert: bool = False) -> UpdateOne:
+        """UpdateOne for use with bulk_update"""
+        return UpdateOne(filter_dict, self.to_dict(), upsert=upsert)
+
+
+async def update_one(
+    model: Type[Document],
+    filter_dict: Dict[str, Any],
+    update: AtomicUpdate,
+    upsert: bool = False
+) -> bool:
+    """Apply the update to one document. Returns True if a document matched or was inserted."""
+    if not update:
+        return False
+    result = await model.get_motor_collection().update_one(filter_dict, update.to_dict(), upsert=upsert)
+    return bool(result.matched_count or result.upserted_id is not None)
+
+
+async def find_one_and_update(
+    model: Type[DocumentT],
+    filter_dict: Dict[str, Any],
+    update: AtomicUpdate,
+    projection: Optional[Dict[str, Any]] = None,
+    upsert: bool = False
+) -> Optional[Union[DocumentT, Dict[str, Any]]]:
+    """
+    Apply the update and return the document as it is afterwards:
+    a model instance, or the raw projected fields when `projection` is given.
+    """
+    doc = await model.get_motor_collection().find_one_and_update(
+        filter_dict,
+        update.to_dict(),
+        projection=projection,
+        upsert=upsert,
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is None or projection is not None:
+        return doc
+    return model.model_validate(doc)
+
+
+async def bulk_update(model: Type[Document], operations: List[UpdateOne]) -> int:
+    """Unordered bulk write of update operations. Returns documents modified."""
+    if not operations:
+        return 0
+    result = await model.get_motor_collection().bulk_write(operations, ordered=False)
+    return result.modified_count + len(result.upserted_ids)
@@ -0,0 +1,231 @@
+"""
+Caching utilities.
+In-process LRU cache with TTL plus an optional shared MongoDB backend,
+so cached data can be reused across workers/instances.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import time
+import logging
+
+from app.core.config import settings
+from app.core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Bounded in-process cache with per-entry TTL (least recently used evicted first)"""
+
+    def __init__(self, maxsize: int = 1000, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value if present and not expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value, evicting the least recently used entry when full"""
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove a single key"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all keys"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0.0
+        }
+
+
+class MongoCacheBackend:
+    """Shared cache backend stored in a MongoDB collection with a TTL index"""
+
+    def __init__(self, collection_name: str = "cache_entries"):
+        self.collection_name = collection_name
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value if present and not expired"""
+        try:
+            db = get_database()
+            doc = await db[self.collection_name].find_one({
+                "_id": key,
+                "expires_at": {"$gt": datetime.utcnow()}
+            })
+            return doc["value"] if doc else None
+        except Exception as e:
+            logger.warning(f"Shared cache get failed for {key}: {e}")
+            return None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store value with expiry"""
+        try:
+            db = get_database()
+            now = datetime.utcnow()
+            await db[self.collection_name].update_one(
+                {"_id": key},
+                {"$set": {
+                    "value": value,
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Shared cache set failed for {key}: {e}")
+
+    async def delete(self, key: str) -> None:
+        """Remove a single key"""
+        try:
+            db = get_database()
+            await db[self.collection_name].delete_one({"_id": key})
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed for {key}: {e}")
+
+    async def get_field_many(self, keys: List[str], field: str) -> Optional[Dict[str, Any]]:
+        """
+        One projected read of `value.<field>` for many keys (present, unexpired only).
+        Returns None if the backend could not be read.
+        """
+        try:
+            db = get_database()
+            docs = await db[self.collection_name].find(
+                {"_id": {"$in": keys}, "expires_at": {"$gt": datetime.utcnow()}},
+                {f"value.{field}": 1}
+            ).to_list(None)
+            return {doc["_id"]: (doc.get("value") or {}).get(field) for doc in docs}
+        except Exception as e:
+            logger.warning(f"Shared cache field read failed for {len(keys)} keys: {e}")
+            return None
+
+
+def get_shared_cache_backend() -> Optional[MongoCacheBackend]:
+    """Get shared cache backend if enabled in settings"""
+    if settings.CACHE_BACKEND == "mongo":
+        return MongoCacheBackend()
+    return None
+
+
+class TieredCache:
+    """
+    Two-level cache: in-process LRU in front of the optional shared backend.
+    Values stored in the shared backend must be BSON serializable.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1000,
+        local_ttl: Optional[float] = 60,
+        shared_ttl: float = 3600,
+        shared: Optional[MongoCacheBackend] = None
+    ):
+        self.namespace = namespace
+        self.local = LRUCache(maxsize=maxsize, ttl=local_ttl)
+        self.shared_ttl = shared_ttl
+        self.shared = shared if shared is not None else get_shared_cache_backend()
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get from local cache, falling back to the shared backend"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        if self.shared:
+            value = await self.shared.get(self._key(key))
+            if value is not None:
+                self.local.set(key, value)
+
+        return value
+
+    async def get_many_versioned(self, keys: Iterable[str], version_field: str = "version") -> Dict[str, Any]:
+        """
+        Get many values whose local copies are only trusted while their
+        `version_field` still matches the shared entry - one small read checks
+        all of them, so an invalidation by any worker is seen immediately.
+        Missing keys are left out of the result.
+        """
+        keys = list(dict.fromkeys(keys))
+        result = {}
+        for key in keys:
+            value = self.local.get(key)
+            if value is not None:
+                result[key] = value
+
+        if self.shared:
+            if result:
+                versions = await self.shared.get_field_many([self._key(key) for key in result], version_field)
+                if versions is not None:
+                    for key in list(result):
+                        if versions.get(self._key(key)) != result[key].get(version_field):
+                            self.local.delete(key)
+                            del result[key]
+
+            for key in keys:
+                if key not in result:
+                    value = await self.shared.get(self._key(key))
+                    if value is not None:
+                        self.local.set(key, value)
+                        result[key] = value
+
+        return result
+
+    async def set(self, key: str, value: Any) -> None:
+        """Write through to both levels"""
+        self.local.set(key, value)
+        if self.shared:
+            await self.shared.set(self._key(key), value, self.shared_ttl)
+
+    async def delete(self, key: str) -> None:
+        """Invalidate both levels"""
+        self.local.delete(key)
+        if self.shared:
+            await self.shared.delete(self._key(key))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "namespace": self.namespace,
+            "shared_backend": type(self.shared).__name__ if self.shared else None,
+            **self.local.get_stats()
+        }
@@ -51,6 +51,17 @@ class Settings(BaseSettings):
     AZURE_TENANT_ID: str
     MAIL_FROM_ADDRESS: str
     EMAILS_FROM_NAME: Optional[str] = "AI E-Learning Platform"
+    GRAPH_API_ENDPOINT: str = "https://graph.microsoft.com/v1.0"  # point at a local stub for tests
+    GRAPH_API_STATIC_TOKEN: Optional[str] = None  # bypasses MSAL (stub Graph endpoint only)
+    GRAPH_API_TIMEOUT: float = 10.0  # seconds
+    GRAPH_TOKEN_REFRESH_MARGIN: int = 300  # seconds before expiry to refresh the MSAL token
+    EMAIL_OUTBOX_WORKERS: int = 2  # background delivery workers; 0 = send inline
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 5.0  # seconds between polls when idle
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 120  # claimed messages are retried after this
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: int = 30  # doubled after each failed attempt
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: int = 3600
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7  # sent/failed messages kept for inspection
     
     # Legacy SMTP (deprecated)
     SMTP_HOST: Optional[str] = None
@@ -69,6 +80,14 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: Optional[str] = None
     GEMINI_MODEL: str = "gemini-2.5-flash"
     
+    # "anthropic" (Anthropic with Gemini fallback) or "fake" (local canned model for tests)
+    AI_PROVIDER: str = "anthropic"
+    AI_RATE_LIMIT_PER_HOUR: int = 50  # chat messages per user, shared by all workers
+    AI_HISTORY_LIMIT: int = 10  # exchanges kept per user
+    AI_HISTORY_RETENTION_DAYS: int = 30  # history removed after this long without activity
+    AI_HISTORY_CACHE_SIZE: int = 5000  # users whose recent history is cached in process
+    AI_HISTORY_CACHE_TTL: int = 30  # seconds
+    
     # AI Settings
     @property
     def anthropic_api_key(self) -> str:
@@ -90,9 +109,46 @@ class Settings(BaseSettings):
     def debug(self) -> bool:
         return self.DEBUG
     
+    # Caching
+    CACHE_BACKEND: str = "memory"  # "memory" (per process) or "mongo" (shared across instances)
+    COURSE_MANIFEST_CACHE_SIZE: int = 500
+    COURSE_MANIFEST_CACHE_TTL: int = 300  # seconds in process; shared entries live 24h
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 30  # seconds; explicit invalidation on role/premium/status changes
+    PAGINATION_COUNT_CACHE_TTL: int = 60  # seconds; totals reused across cursor pages
+    DASHBOARD_SNAPSHOT_TTL: int = 60  # seconds before a background refresh is triggered
+    DASHBOARD_SNAPSHOT_REFRESH_INTERVAL: int = 0  # seconds; 0 = refresh on demand only
+    ANALYTICS_ROLLUP_FLUSH_INTERVAL: int = 10  # seconds between bulk writes of buffered rollup counters
+    COURSE_COUNTER_RECONCILE_INTERVAL: int = 3600  # seconds between like/review counter repairs; 0 = disabled
+    PROGRESS_HEARTBEAT_FLUSH_INTERVAL: float = 10.0  # seconds between bulk writes of video heartbeats; 0 = write each one
+    PROGRESS_HEARTBEAT_MAX_PENDING: int = 5000  # buffered lessons that trigger an early flush
+    PROGRESS_HEARTBEAT_TRACKED_SIZE: int = 20000  # validated (user, lesson) progress documents kept in process
+    PROGRESS_HEARTBEAT_TRACKED_TTL: int = 120  # seconds before a heartbeat re-checks lesson/enrollment
+    FAQ_TELEMETRY_FLUSH_INTERVAL: float = 30.0  # seconds between bulk writes of FAQ view/vote counters; 0 = write each one
+    AI_CACHE_SIZE: int = 2000  # in-process AI responses
+    AI_CACHE_TTL: int = 86400  # seconds (both levels)
+    AI_CACHE_PERSISTENT: bool = True  # back the AI cache with MongoDB (shared, survives restarts)
+    
+    # Search
+    SEARCH_REGEX_FALLBACK: bool = False  # regex collection scan when the text index has no match (partial words)
+    
+    # Rate limiting
+    RATE_LIMIT_BACKEND: str = "mongo"  # "mongo" (shared across instances) or "memory" (single node)
+    
     # Payment
     STRIPE_SECRET_KEY: str
     STRIPE_WEBHOOK_SECRET: str
+    PAYMENT_PROVIDER: str = "stripe"  # "fake" = in-memory provider for offline load tests
+    PAYMENT_PROVIDER_MAX_RETRIES: int = 2  # transient errors, same idempotency key
+    PAYMENT_CUSTOMER_CACHE_TTL: int = 300  # seconds
+    PAYMENT_FAKE_LATENCY_MS: int = 0  # simulated round trip for the fake provider
+    WEBHOOK_WORKERS: int = 2  # background webhook processors; 0 = process inline
+    WEBHOOK_BATCH_SIZE: int = 100  # due events scanned per worker pass
+    WEBHOOK_POLL_INTERVAL: float = 2.0  # seconds between polls when idle
+    WEBHOOK_LEASE_SECONDS: int = 60  # per-customer processing lease
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BASE_SECONDS: int = 15  # doubled after each failed attempt
+    WEBHOOK_RETENTION_DAYS: int = 30  # processed events kept for dedupe/inspection
     
     # Storage & CDN
     CLOUDFLARE_API_TOKEN: Optional[str] = None
@@ -107,6 +163,7 @@ class Settings(BaseSettings):
     LOCAL_UPLOAD_DIR: str = "./uploads"
     LOCAL_UPLOAD_URL_PREFIX: str = "/uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_JSON_BODY_SIZE: int = 5 * 1024 * 1024  # 5MB, enforced by InputValidationMiddleware
     ALLOWED_FILE_EXTENSIONS: List[str] = [
         ".pdf", ".doc", ".docx", ".zip", ".rar",
         ".jpg", ".jpeg", ".png", ".gif", ".webp",
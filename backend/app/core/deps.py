@@ -2,30 +2,32 @@
 Common dependencies for API endpoints.
 """
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.security import decode_token
+from app.core.principal import get_token_claims, load_user
 from app.models.user import User
-from beanie import PydanticObjectId
+from app.services.token_blacklist_service import token_blacklist_service
 
 
 # HTTP Bearer Security
 security = HTTPBearer()
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
     """
     Get current authenticated user from JWT token.
     Raises HTTPException if token is invalid or user not found.
+    Claims are decoded once per request; the user comes from the snapshot cache.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     # Extract token from Bearer header
     token = credentials.credentials
     
-    # Decode token
-    user_id = decode_token(token)
+    # Decode token (once per request)
+    claims = get_token_claims(request, token)
+    user_id = claims.get("sub") if claims else None
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,9 +35,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user from database
+    # Check revocation index (in-memory, covers routes outside the blacklist middleware)
+    if await token_blacklist_service.is_token_blacklisted(token, payload=claims):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been invalidated. Please login again.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Get user from snapshot cache / database
     try:
-        user = await User.get(PydanticObjectId(user_id))
+        user = await load_user(user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,7 +70,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     return user
 
 
-async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))) -> Optional[User]:
+async def get_current_user_optional(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
+) -> Optional[User]:
     """
     Get current authenticated user from JWT token.
     Returns None if no token provided or token is invalid.
@@ -77,16 +90,24 @@ async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCrede
         # Extract token from Bearer header
         token = credentials.credentials
         
-        # Decode token
-        user_id = decode_token(token)
+        # Decode token (once per request)
+        claims = get_token_claims(request, token)
+        user_id = claims.get("sub") if claims else None
         
         if not user_id:
             logger.warning("Token decode returned None")
             return None
         
-        # Get user from database
+        if await token_blacklist_service.is_token_blacklisted(token, payload=claims):
+            logger.info("Blacklisted token treated as anonymous")
+            return None
+        
+        # Get user from snapshot cache / database
         try:
-            user = await User.get(PydanticObjectId(user_id))
+            user = await load_user(user_id)
+            if user and user.status == "deactivated":
+                logger.info("Deactivated user treated as anonymous")
+                return None
             return user
         except Exception as e:
             logger.error(f"Error getting user from DB: {e}")
@@ -127,13 +148,14 @@ get_current_admin = get_admin_user
 
 
 async def get_current_optional_user(
+    request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
 ) -> Optional[User]:
     """
     ALIAS for get_current_user_optional() - for backward compatibility with api/deps.py
     This ensures all imports work with the consolidated deps file.
     """
-    return await get_current_user_optional(credentials)
+    return await get_current_user_optional(request, credentials)
 
 
 async def get_current_active_user(
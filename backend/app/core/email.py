@@ -6,11 +6,15 @@ import logging
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 from datetime import datetime
+import asyncio
 import json
-import requests
+import time
+import httpx
 from msal import ConfidentialClientApplication
 
 from app.core.config import settings
+from app.core.email_outbox import email_outbox
+from app.core.email_templates import CompiledTemplate, email_templates
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +25,7 @@ class EmailService:
     def __init__(self):
         self.authority = f"https://login.microsoftonline.com/{settings.AZURE_TENANT_ID}"
         self.scope = ["https://graph.microsoft.com/.default"]
-        self.graph_endpoint = "https://graph.microsoft.com/v1.0"
+        self.graph_endpoint = settings.GRAPH_API_ENDPOINT.rstrip("/")
         self.from_email = settings.MAIL_FROM_ADDRESS
         self.from_name = settings.EMAILS_FROM_NAME
         
@@ -32,31 +36,60 @@ class EmailService:
             client_credential=settings.AZURE_CLIENT_SECRET,
         )
         
-        # Cache for access token
-        self._token_cache = None
+        # Cache for access token (refreshed ahead of expiry)
+        self._token_cache: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
         
-    def get_access_token(self) -> Optional[str]:
+        # Pooled HTTP client for Graph API calls (created lazily)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        
+    async def get_access_token(self) -> Optional[str]:
         """Get access token using client credentials flow"""
-        try:
-            # Try to get token from cache first
-            if self._token_cache:
-                # In production, check token expiry
+        if settings.GRAPH_API_STATIC_TOKEN:
+            return settings.GRAPH_API_STATIC_TOKEN
+        
+        if self._token_cache and time.monotonic() < self._token_expires_at:
+            return self._token_cache
+        
+        async with self._token_lock:
+            # Another caller may have refreshed while we waited
+            if self._token_cache and time.monotonic() < self._token_expires_at:
                 return self._token_cache
             
-            # Acquire token
-            result = self.app.acquire_token_for_client(scopes=self.scope)
-            
-            if "access_token" in result:
-                self._token_cache = result["access_token"]
-                logger.info("Successfully acquired access token")
-                return result["access_token"]
-            else:
-                logger.error(f"Failed to acquire token: {result.get('error')}, {result.get('error_description')}")
-                return None
+            try:
+                # MSAL is blocking; keep it off the event loop
+                result = await asyncio.to_thread(self.app.acquire_token_for_client, scopes=self.scope)
                 
-        except Exception as e:
-            logger.error(f"Error acquiring access token: {str(e)}")
-            return None
+                if "access_token" in result:
+                    expires_in = int(result.get("expires_in", 3600))
+                    self._token_cache = result["access_token"]
+                    self._token_expires_at = time.monotonic() + max(
+                        expires_in - settings.GRAPH_TOKEN_REFRESH_MARGIN, 0
+                    )
+                    logger.info("Successfully acquired access token")
+                    return self._token_cache
+                else:
+                    logger.error(f"Failed to acquire token: {result.get('error')}, {result.get('error_description')}")
+                    return None
+                    
+            except Exception as e:
+                logger.error(f"Error acquiring access token: {str(e)}")
+                return None
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=settings.GRAPH_API_TIMEOUT,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._http_client
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP client"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
         
     async def send_email(
         self,
@@ -69,6 +102,9 @@ class EmailService:
         """
         Send email using Microsoft Graph API.
         
+        When the outbox workers are running the message is queued and
+        delivered in the background, so callers don't wait for Graph API.
+        
         Args:
             to_email: Recipient email address
             subject: Email subject
@@ -77,58 +113,78 @@ class EmailService:
             attachments: List of file paths to attach (optional)
             
         Returns:
-            bool: True if email sent successfully, False otherwise
+            bool: True if email was queued or sent successfully, False otherwise
         """
-        try:
-            # Get access token
-            access_token = self.get_access_token()
-            if not access_token:
-                logger.error("Failed to get access token")
-                return False
-            
-            # Note: Current Graph API implementation doesn't support attachments
-            # This can be added later if needed
-            if attachments:
-                logger.warning("Attachments are not yet supported with Graph API")
-            
-            # Prepare email message
-            message = {
-                "message": {
-                    "subject": subject,
-                    "body": {
-                        "contentType": "HTML",
-                        "content": html_content
-                    },
-                    "toRecipients": [
-                        {
-                            "emailAddress": {
-                                "address": to_email
-                            }
-                        }
-                    ]
-                },
-                "saveToSentItems": True
-            }
-            
-            # Send email via Graph API
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            }
-            
-            endpoint = f"{self.graph_endpoint}/users/{self.from_email}/sendMail"
-            response = requests.post(endpoint, headers=headers, json=message)
-            
-            if response.status_code == 202:
-                logger.info(f"Email sent successfully to {to_email}")
+        # Note: Current Graph API implementation doesn't support attachments
+        # This can be added later if needed
+        if attachments:
+            logger.warning("Attachments are not yet supported with Graph API")
+        
+        if email_outbox.is_running:
+            try:
+                await email_outbox.enqueue(to_email, subject, html_content, text_content)
                 return True
-            else:
-                logger.error(f"Failed to send email: {response.status_code}, {response.text}")
-                return False
-                
+            except Exception as e:
+                logger.error(f"Failed to queue email, sending directly: {str(e)}")
+        
+        try:
+            return await self.deliver(to_email, subject, html_content, text_content)
         except Exception as e:
             logger.error(f"Error sending email: {str(e)}")
             return False
+    
+    async def deliver(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> bool:
+        """Send one message through Graph API (used by the outbox workers)"""
+        # Get access token
+        access_token = await self.get_access_token()
+        if not access_token:
+            logger.error("Failed to get access token")
+            return False
+        
+        # Prepare email message
+        message = {
+            "message": {
+                "subject": subject,
+                "body": {
+                    "contentType": "HTML",
+                    "content": html_content
+                },
+                "toRecipients": [
+                    {
+                        "emailAddress": {
+                            "address": to_email
+                        }
+                    }
+                ]
+            },
+            "saveToSentItems": True
+        }
+        
+        # Send email via Graph API
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        
+        endpoint = f"{self.graph_endpoint}/users/{self.from_email}/sendMail"
+        response = await self._get_http_client().post(endpoint, headers=headers, json=message)
+        
+        if response.status_code == 202:
+            logger.info(f"Email sent successfully to {to_email}")
+            return True
+        
+        if response.status_code == 401:
+            # Token revoked or expired early; acquire a new one on retry
+            self._token_cache = None
+        
+        logger.error(f"Failed to send email: {response.status_code}, {response.text}")
+        return False
 
     def get_email_template(
         self,
@@ -152,143 +208,61 @@ class EmailService:
         Returns:
             str: Complete HTML email template
         """
-        # Context box styling based on type
-        context_html = ""
-        if context_box:
-            context_type = context_box.get("type", "info")
-            context_content = context_box.get("content", "")
-
-            if context_type == "success":
-                box_bg = "#f0fdf4"
-                border_color = "#10b981"
-            elif context_type == "warning":
-                box_bg = "#fef3c7"
-                border_color = "#f59e0b"
-            else:  # info
-                box_bg = "#f8fafc"
-                border_color = "hsl(221, 83%, 53%)"
-
-            context_html = f"""
-            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="background-color: {box_bg}; border-left: 3px solid {border_color}; border-radius: 6px; margin: 24px 0 32px 0;">
-                <tr>
-                    <td style="padding: 20px 24px;">
-                        {context_content}
-                    </td>
-                </tr>
-            </table>
-            """
-
-        # Button HTML
-        button_html = ""
-        if button_text and button_url:
-            button_html = f"""
-            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="margin: 24px 0 32px 0;">
-                <tr>
-                    <td align="center">
-                        <a href="{button_url}" class="email-button"
-                           style="background: linear-gradient(135deg, hsl(221, 83%, 53%) 0%, hsl(221, 83%, 40%) 100%);
-                                  color: #ffffff;
-                                  padding: 14px 28px;
-                                  border-radius: 6px;
-                                  text-decoration: none;
-                                  display: inline-block;
-                                  font-weight: 500;
-                                  font-size: 16px;
-                                  box-shadow: 0 2px 8px rgba(59, 130, 246, 0.3);
-                                  letter-spacing: 0.2px;">
-                            {button_text}
-                        </a>
-                    </td>
-                </tr>
-            </table>
-            """
+        return email_templates.render(
+            title=title,
+            content=content,
+            button_text=button_text,
+            button_url=button_url,
+            context_box=context_box
+        )
 
-        # Complete email template
-        return f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <meta http-equiv="X-UA-Compatible" content="IE=edge">
-            <title>{title} - HEART HT</title>
-            <style>
-                @media only screen and (max-width: 600px) {{
-                    .email-wrapper {{ padding: 0 !important; }}
-                    .email-title {{ font-size: 20px !important; }}
-                    .email-content {{ font-size: 15px !important; }}
-                    .email-button {{ font-size: 15px !important; }}
-                    .email-secondary {{ font-size: 14px !important; }}
-                    .email-footer {{ font-size: 13px !important; }}
-                    .email-footer-links {{ font-size: 12px !important; }}
-                }}
-            </style>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif; background-color: #f8fafc;">
-
-            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" class="email-wrapper" style="background-color: #f8fafc; padding: 20px 0;">
-                <tr>
-                    <td align="center">
-                        <table role="presentation" cellpadding="0" cellspacing="0" width="580" style="background-color: #ffffff; box-shadow: 0 1px 3px rgba(0,0,0,0.08);">
-
-                            <!-- HEADER -->
-                            <tr>
-                                <td style="background: linear-gradient(135deg, hsl(221, 83%, 53%) 0%, hsl(221, 83%, 40%) 100%); padding: 16px 35px;">
-                                    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
-                                        <tr>
-                                            <td style="vertical-align: middle;">
-                                                <img src="{settings.FRONTEND_URL}/images/logo/heartht-logo-192x192.png"
-                                                     alt="HEART HT"
-                                                     style="height: 40px; vertical-align: middle; margin-right: 12px;"
-                                                     onerror="this.style.display='none';">
-                                                <span style="color: #ffffff; font-size: 18px; font-weight: 600; letter-spacing: 0.3px; vertical-align: middle;">
-                                                    HEART HT
-                                                </span>
-                                            </td>
-                                        </tr>
-                                    </table>
-                                </td>
-                            </tr>
-
-                            <!-- CONTENT -->
-                            <tr>
-                                <td style="padding: 40px 35px;">
-                                    <h1 class="email-title" style="color: #1e293b; font-size: 24px; font-weight: 600; margin: 0 0 24px 0; line-height: 1.3;">
-                                        {title}
-                                    </h1>
-
-                                    <div class="email-content" style="color: #475569; font-size: 16px; line-height: 1.6;">
-                                        {content}
-                                    </div>
-
-                                    {context_html}
-
-                                    {button_html}
-                                </td>
-                            </tr>
-
-                            <!-- FOOTER -->
-                            <tr>
-                                <td style="background-color: #f8fafc; padding: 16px 35px; text-align: center; border-top: 1px solid #e2e8f0;">
-                                    <p class="email-footer" style="color: #64748b; font-size: 14px; margin: 0 0 8px 0;">
-                                        © 2026 HEART HT AI E-Learning Platform
-                                    </p>
-                                    <p style="margin: 0;">
-                                        <a href="{settings.FRONTEND_URL}/privacy" class="email-footer-links" style="color: hsl(221, 83%, 53%); font-size: 13px; text-decoration: none; margin: 0 6px;">Privacy</a>
-                                        <span class="email-footer-links" style="color: #cbd5e1; font-size: 13px;">•</span>
-                                        <a href="{settings.FRONTEND_URL}/terms" class="email-footer-links" style="color: hsl(221, 83%, 53%); font-size: 13px; text-decoration: none; margin: 0 6px;">Terms</a>
-                                        <span class="email-footer-links" style="color: #cbd5e1; font-size: 13px;">•</span>
-                                        <a href="{settings.FRONTEND_URL}/support" class="email-footer-links" style="color: hsl(221, 83%, 53%); font-size: 13px; text-decoration: none; margin: 0 6px;">Support</a>
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
+    async def send_bulk_email(
+        self,
+        recipients: List[Dict[str, Any]],
+        subject: str,
+        title: str,
+        content: str,
+        button_text: Optional[str] = None,
+        button_url: Optional[str] = None,
+        context_box: Optional[Dict[str, Any]] = None
+    ) -> int:
         """
+        Send one personalised message per recipient from a single template pass.
+        
+        Each recipient dict needs "email" plus values for the `{placeholders}`
+        used in subject/title/content/button/context box (literal braces doubled).
+        
+        Returns:
+            int: Number of messages queued or sent
+        """
+        if not recipients:
+            return 0
+        
+        subject_template = CompiledTemplate(subject)
+        bodies = email_templates.render_batch(
+            recipients, title, content, button_text, button_url, context_box
+        )
+        messages = [
+            {
+                "to_email": recipient["email"],
+                "subject": subject_template.render(**recipient),
+                "html_content": html_content
+            }
+            for recipient, html_content in zip(recipients, bodies)
+        ]
+        
+        if email_outbox.is_running:
+            try:
+                await email_outbox.enqueue_many(messages)
+                return len(messages)
+            except Exception as e:
+                logger.error(f"Failed to queue bulk email, sending directly: {str(e)}")
+        
+        sent = 0
+        for message in messages:
+            if await self.send_email(**message):
+                sent += 1
+        return sent
 
     async def send_verification_email(
         self,
@@ -0,0 +1,209 @@
+"""
+Durable email outbox.
+Requests only insert a message into the `email_outbox` collection; a pool of
+background workers claims pending messages, delivers them and retries
+failures with exponential backoff. Messages survive restarts, and a message
+claimed by a crashed worker is picked up again once its lease expires.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+# Delivery callable: (to_email, subject, html_content, text_content) -> sent?
+DeliverFunc = Callable[[str, str, str, Optional[str]], Awaitable[bool]]
+
+
+class EmailOutbox:
+    """Persistent email queue with a background delivery worker pool"""
+
+    COLLECTION = "email_outbox"
+
+    def __init__(self):
+        self._deliver: Optional[DeliverFunc] = None
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    async def enqueue(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> str:
+        """Persist a message for delivery and wake a worker. Returns the message id."""
+        now = datetime.utcnow()
+        result = await get_database()[self.COLLECTION].insert_one({
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "text_content": text_content,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+        self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def enqueue_many(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Persist many messages with one insert (bulk mailings).
+        Each message needs to_email, subject and html_content.
+        """
+        if not messages:
+            return 0
+        now = datetime.utcnow()
+        result = await get_database()[self.COLLECTION].insert_many(
+            [
+                {
+                    "to_email": message["to_email"],
+                    "subject": message["subject"],
+                    "html_content": message["html_content"],
+                    "text_content": message.get("text_content"),
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                    "created_at": now
+                }
+                for message in messages
+            ],
+            ordered=False
+        )
+        self._wakeup.set()
+        return len(result.inserted_ids)
+
+    def start(self, deliver: DeliverFunc) -> None:
+        """Start EMAIL_OUTBOX_WORKERS delivery workers"""
+        if self._workers or settings.EMAIL_OUTBOX_WORKERS <= 0:
+            return
+        self._deliver = deliver
+        self._workers = [
+            asyncio.create_task(self._run_worker(index))
+            for index in range(settings.EMAIL_OUTBOX_WORKERS)
+        ]
+        logger.info(f"Email outbox started with {len(self._workers)} workers")
+
+    async def stop(self) -> None:
+        """Stop workers; claimed messages are retried after their lease expires"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_worker(self, index: int) -> None:
+        while True:
+            try:
+                message = await self._claim()
+                if message is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._process(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker {index} error: {e}")
+                await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_INTERVAL)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically lease the next due message (or one whose lease expired)"""
+        now = datetime.utcnow()
+        return await get_database()[self.COLLECTION].find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "locked_until": {"$lte": now}}
+            ]},
+            {
+                "$set": {
+                    "status": "sending",
+                    "locked_until": now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _process(self, message: Dict[str, Any]) -> None:
+        error = None
+        try:
+            sent = await self._deliver(
+                message["to_email"],
+                message["subject"],
+                message["html_content"],
+                message.get("text_content")
+            )
+        except Exception as e:
+            sent, error = False, str(e)
+
+        now = datetime.utcnow()
+        collection = get_database()[self.COLLECTION]
+
+        if sent:
+            await collection.update_one(
+                {"_id": message["_id"]},
+                {
+                    "$set": {
+                        "status": "sent",
+                        "sent_at": now,
+                        "expires_at": now + timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+                    },
+                    "$unset": {"locked_until": "", "html_content": "", "text_content": ""}
+                }
+            )
+            return
+
+        attempts = message.get("attempts", 1)
+        if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Email to {message['to_email']} failed after {attempts} attempts: {error}")
+            await collection.update_one(
+                {"_id": message["_id"]},
+                {
+                    "$set": {
+                        "status": "failed",
+                        "last_error": error,
+                        "expires_at": now + timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+                    },
+                    "$unset": {"locked_until": ""}
+                }
+            )
+            return
+
+        delay = min(
+            settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+            settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS
+        )
+        await collection.update_one(
+            {"_id": message["_id"]},
+            {
+                "$set": {
+                    "status": "pending",
+                    "next_attempt_at": now + timedelta(seconds=delay),
+                    "last_error": error
+                },
+                "$unset": {"locked_until": ""}
+            }
+        )
+
+
+# Global outbox instance
+email_outbox = EmailOutbox()
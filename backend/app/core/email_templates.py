@@ -0,0 +1,300 @@
+"""
+Email template engine.
+The shared layout and its partials (context box, CTA button) are compiled
+once at import into literal chunks and placeholders, so rendering is a single
+join. Templates can be partially applied: shared values are baked in once and
+only per-recipient fields are filled for each message (see `compile_message`).
+"""
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_formatter = Formatter()
+
+
+class CompiledTemplate:
+    """
+    Template with `{name}` placeholders parsed once into parts.
+    `{{` and `}}` are literal braces, as in str.format.
+    """
+
+    def __init__(self, source: str = "", parts: Optional[List[Any]] = None):
+        if parts is None:
+            parts = []
+            for literal, field, format_spec, conversion in _formatter.parse(source):
+                if literal:
+                    parts.append(literal)
+                if field is not None:
+                    if format_spec or conversion or not field.isidentifier():
+                        raise ValueError(f"Unsupported template placeholder: {{{field}}}")
+                    parts.append(_Field(field))
+        self._parts = _merge_literals(parts)
+
+    @property
+    def fields(self) -> List[str]:
+        """Placeholders still to be filled"""
+        return [part.name for part in self._parts if isinstance(part, _Field)]
+
+    def partial(self, **values: Union[str, "CompiledTemplate"]) -> "CompiledTemplate":
+        """
+        Bake some placeholders in. String values are inserted verbatim;
+        CompiledTemplate values are spliced so their own placeholders stay open.
+        """
+        parts: List[Any] = []
+        for part in self._parts:
+            if isinstance(part, _Field) and part.name in values:
+                value = values[part.name]
+                if isinstance(value, CompiledTemplate):
+                    parts.extend(value._parts)
+                else:
+                    parts.append(str(value))
+            else:
+                parts.append(part)
+        return CompiledTemplate(parts=parts)
+
+    def render(self, **values: Any) -> str:
+        """Fill all placeholders (values are inserted verbatim)"""
+        return "".join(
+            str(values[part.name]) if isinstance(part, _Field) else part
+            for part in self._parts
+        )
+
+
+class _Field:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+def _merge_literals(parts: List[Any]) -> List[Any]:
+    merged: List[Any] = []
+    for part in parts:
+        if isinstance(part, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += part
+        elif not isinstance(part, str) or part:
+            merged.append(part)
+    return merged
+
+
+# Context box colours by type
+CONTEXT_BOX_STYLES = {
+    "success": {"box_bg": "#f0fdf4", "border_color": "#10b981"},
+    "warning": {"box_bg": "#fef3c7", "border_color": "#f59e0b"},
+    "info": {"box_bg": "#f8fafc", "border_color": "hsl(221, 83%, 53%)"}
+}
+
+CONTEXT_BOX_SOURCE = """
+            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="background-color: {box_bg}; border-left: 3px solid {border_color}; border-radius: 6px; margin: 24px 0 32px 0;">
+                <tr>
+                    <td style="padding: 20px 24px;">
+                        {context_content}
+                    </td>
+                </tr>
+            </table>
+            """
+
+BUTTON_SOURCE = """
+            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="margin: 24px 0 32px 0;">
+                <tr>
+                    <td align="center">
+                        <a href="{button_url}" class="email-button"
+                           style="background: linear-gradient(135deg, hsl(221, 83%, 53%) 0%, hsl(221, 83%, 40%) 100%);
+                                  color: #ffffff;
+                                  padding: 14px 28px;
+                                  border-radius: 6px;
+                                  text-decoration: none;
+                                  display: inline-block;
+                                  font-weight: 500;
+                                  font-size: 16px;
+                                  box-shadow: 0 2px 8px rgba(59, 130, 246, 0.3);
+                                  letter-spacing: 0.2px;">
+                            {button_text}
+                        </a>
+                    </td>
+                </tr>
+            </table>
+            """
+
+LAYOUT_SOURCE = """
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <meta http-equiv="X-UA-Compatible" content="IE=edge">
+            <title>{title} - HEART HT</title>
+            <style>
+                @media only screen and (max-width: 600px) {{
+                    .email-wrapper {{ padding: 0 !important; }}
+                    .email-title {{ font-size: 20px !important; }}
+                    .email-content {{ font-size: 15px !important; }}
+                    .email-button {{ font-size: 15px !important; }}
+                    .email-secondary {{ font-size: 14px !important; }}
+                    .email-footer {{ font-size: 13px !important; }}
+                    .email-footer-links {{ font-size: 12px !important; }}
+                }}
+            </style>
+        </head>
+        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif; background-color: #f8fafc;">
+
+            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" class="email-wrapper" style="background-color: #f8fafc; padding: 20px 0;">
+                <tr>
+                    <td align="center">
+                        <table role="presentation" cellpadding="0" cellspacing="0" width="580" style="background-color: #ffffff; box-shadow: 0 1px 3px rgba(0,0,0,0.08);">
+
+                            <!-- HEADER -->
+                            <tr>
+                                <td style="background: linear-gradient(135deg, hsl(221, 83%, 53%) 0%, hsl(221, 83%, 40%) 100%); padding: 16px 35px;">
+                                    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
+                                        <tr>
+                                            <td style="vertical-align: middle;">
+                                                <img src="{frontend_url}/images/logo/heartht-logo-192x192.png"
+                                                     alt="HEART HT"
+                                                     style="height: 40px; vertical-align: middle; margin-right: 12px;"
+                                                     onerror="this.style.display='none';">
+                                                <span style="color: #ffffff; font-size: 18px; font-weight: 600; letter-spacing: 0.3px; vertical-align: middle;">
+                                                    HEART HT
+                                                </span>
+                                            </td>
+                                        </tr>
+                                    </table>
+                                </td>
+                            </tr>
+
+                            <!-- CONTENT -->
+                            <tr>
+                                <td style="padding: 40px 35px;">
+                                    <h1 class="email-title" style="color: #1e293b; font-size: 24px; font-weight: 600; margin: 0 0 24px 0; line-height: 1.3;">
+                                        {title}
+                                    </h1>
+
+                                    <div class="email-content" style="color: #475569; font-size: 16px; line-height: 1.6;">
+                                        {content}
+                                    </div>
+
+                                    {context_html}
+
+                                    {button_html}
+                                </td>
+                            </tr>
+
+                            <!-- FOOTER -->
+                            <tr>
+                                <td style="background-color: #f8fafc; padding: 16px 35px; text-align: center; border-top: 1px solid #e2e8f0;">
+                                    <p class="email-footer" style="color: #64748b; font-size: 14px; margin: 0 0 8px 0;">
+                                        © 2026 HEART HT AI E-Learning Platform
+                                    </p>
+                                    <p style="margin: 0;">
+                                        <a href="{frontend_url}/privacy" class="email-footer-links" style="color: hsl(221, 83%, 53%); font-size: 13px; text-decoration: none; margin: 0 6px;">Privacy</a>
+                                        <span class="email-footer-links" style="color: #cbd5e1; font-size: 13px;">•</span>
+                                        <a href="{frontend_url}/terms" class="email-footer-links" style="color: hsl(221, 83%, 53%); font-size: 13px; text-decoration: none; margin: 0 6px;">Terms</a>
+                                        <span class="email-footer-links" style="color: #cbd5e1; font-size: 13px;">•</span>
+                                        <a href="{frontend_url}/support" class="email-footer-links" style="color: hsl(221, 83%, 53%); font-size: 13px; text-decoration: none; margin: 0 6px;">Support</a>
+                                    </p>
+                                </td>
+                            </tr>
+                        </table>
+                    </td>
+                </tr>
+            </table>
+        </body>
+        </html>
+        """
+
+
+class EmailTemplateEngine:
+    """Compiled email layout and partials"""
+
+    def __init__(self):
+        self.layout = CompiledTemplate(LAYOUT_SOURCE).partial(frontend_url=settings.FRONTEND_URL)
+        self.context_box = CompiledTemplate(CONTEXT_BOX_SOURCE)
+        self.button = CompiledTemplate(BUTTON_SOURCE)
+
+    @staticmethod
+    def _context_style(context_box: Dict[str, Any]) -> Dict[str, str]:
+        return CONTEXT_BOX_STYLES.get(context_box.get("type", "info"), CONTEXT_BOX_STYLES["info"])
+
+    @lru_cache(maxsize=256)
+    def render_button(self, button_text: str, button_url: str) -> str:
+        return self.button.render(button_text=button_text, button_url=button_url)
+
+    def render_context_box(self, context_box: Optional[Dict[str, Any]]) -> str:
+        if not context_box:
+            return ""
+        return self.context_box.render(
+            context_content=context_box.get("content", ""),
+            **self._context_style(context_box)
+        )
+
+    def render(
+        self,
+        title: str,
+        content: str,
+        button_text: Optional[str] = None,
+        button_url: Optional[str] = None,
+        context_box: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Render one message; values are inserted verbatim"""
+        return self.layout.render(
+            title=title,
+            content=content,
+            context_html=self.render_context_box(context_box),
+            button_html=self.render_button(button_text, button_url) if button_text and button_url else ""
+        )
+
+    def compile_message(
+        self,
+        title: str,
+        content: str,
+        button_text: Optional[str] = None,
+        button_url: Optional[str] = None,
+        context_box: Optional[Dict[str, Any]] = None
+    ) -> CompiledTemplate:
+        """
+        Compile a message whose arguments contain per-recipient `{placeholders}`
+        (literal braces doubled). The layout is applied once; the result only
+        needs the recipient fields filled.
+        """
+        context_html: Union[str, CompiledTemplate] = ""
+        if context_box:
+            context_html = self.context_box.partial(
+                context_content=CompiledTemplate(context_box.get("content", "")),
+                **self._context_style(context_box)
+            )
+
+        button_html: Union[str, CompiledTemplate] = ""
+        if button_text and button_url:
+            button_html = self.button.partial(
+                button_text=CompiledTemplate(button_text),
+                button_url=CompiledTemplate(button_url)
+            )
+
+        return self.layout.partial(
+            title=CompiledTemplate(title),
+            content=CompiledTemplate(content),
+            context_html=context_html,
+            button_html=button_html
+        )
+
+    def render_batch(
+        self,
+        recipients: List[Dict[str, Any]],
+        title: str,
+        content: str,
+        button_text: Optional[str] = None,
+        button_url: Optional[str] = None,
+        context_box: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """Render one message per recipient dict from a single template pass"""
+        template = self.compile_message(title, content, button_text, button_url, context_box)
+        return [template.render(**recipient) for recipient in recipients]
+
+
+# Compiled once at import
+email_templates = EmailTemplateEngine()
@@ -0,0 +1,55 @@
+"""
+Principal resolution for authenticated requests.
+Decodes the JWT once per request (claims kept in request.state) and serves
+users from a short-TTL, size-bounded snapshot cache keyed by user id.
+"""
+from typing import Optional, Dict, Any
+import logging
+
+from beanie import PydanticObjectId
+from fastapi import Request
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.security import decode_token_payload
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Per-process user snapshots; role/premium/status changes invalidate explicitly
+user_cache = LRUCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+
+def get_token_claims(request: Optional[Request], token: str) -> Optional[Dict[str, Any]]:
+    """Decode token once per request and keep the claims in request.state"""
+    if request is not None and getattr(request.state, "token", None) == token:
+        return request.state.token_claims
+
+    claims = decode_token_payload(token)
+
+    if request is not None:
+        request.state.token = token
+        request.state.token_claims = claims
+
+    return claims
+
+
+async def load_user(user_id: str) -> Optional[User]:
+    """
+    Get user by id from the snapshot cache, falling back to MongoDB.
+    Returns a private copy so request handlers can modify/save it safely.
+    """
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached.model_copy(deep=True)
+
+    user = await User.get(PydanticObjectId(user_id))
+    if user:
+        user_cache.set(user_id, user.model_copy(deep=True))
+
+    return user
+
+
+def invalidate_user_cache(user_id: Any) -> None:
+    """Drop cached snapshot after a user document changes"""
+    user_cache.delete(str(user_id))
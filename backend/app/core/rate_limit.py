@@ -1,11 +1,16 @@
 """
-Rate limiting with MongoDB sliding window.
+Rate limiting with a pluggable sliding window backend.
+In-process for single-node deployments, MongoDB for shared limits.
 Protects auth endpoints from brute force attacks.
 """
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 from functools import wraps
 from fastapi import HTTPException, Request, status
+from pymongo import ReturnDocument
+from app.core.cache import LRUCache
+from app.core.config import settings
 from app.core.database import get_database
 import logging
 
@@ -70,6 +75,174 @@ def get_client_ip(request: Request) -> str:
     return "unknown"
 
 
+class RateLimitDecision:
+    """Outcome of a single rate limit check"""
+
+    def __init__(self, allowed: bool, reason: Optional[str] = None, retry_after: int = 0):
+        self.allowed = allowed
+        self.reason = reason  # "locked", "lockout_started" or "limited"
+        self.retry_after = retry_after
+
+
+class MemoryRateLimitBackend:
+    """
+    In-process sliding window log for single-node deployments.
+    Keeps at most `limit` timestamps per key; no awaits, so checks are atomic
+    within the event loop without locks.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.windows = LRUCache(maxsize=max_keys)
+        self.lockouts = LRUCache(maxsize=max_keys)
+
+    async def hit(
+        self,
+        key: str,
+        limit: int,
+        window_seconds: int,
+        lockout_seconds: Optional[int],
+        now: datetime
+    ) -> RateLimitDecision:
+        locked_until = self.lockouts.get(key)
+        if locked_until and locked_until > now:
+            return RateLimitDecision(False, "locked", int((locked_until - now).total_seconds()))
+
+        window_start = now - timedelta(seconds=window_seconds)
+        hits = self.windows.get(key) or deque(maxlen=limit)
+        while hits and hits[0] < window_start:
+            hits.popleft()
+
+        if len(hits) >= limit:
+            if lockout_seconds:
+                self.lockouts.set(key, now + timedelta(seconds=lockout_seconds), ttl=lockout_seconds)
+                return RateLimitDecision(False, "lockout_started", lockout_seconds)
+            retry_after = int((hits[0] - window_start).total_seconds())
+            return RateLimitDecision(False, "limited", retry_after)
+
+        # Record this attempt
+        hits.append(now)
+        self.windows.set(key, hits, ttl=window_seconds)
+        return RateLimitDecision(True)
+
+    async def reset(self, key: str) -> None:
+        self.windows.delete(key)
+        self.lockouts.delete(key)
+
+
+class MongoRateLimitBackend:
+    """
+    Shared sliding window stored as one document per key in MongoDB.
+    Each check is a single atomic pipeline update; active lockouts are also
+    remembered in process so attack traffic against a locked key costs no I/O.
+    """
+
+    def __init__(self, collection_name: str = "rate_limits", max_keys: int = 100000):
+        self.collection_name = collection_name
+        self.local_lockouts = LRUCache(maxsize=max_keys)
+
+    async def hit(
+        self,
+        key: str,
+        limit: int,
+        window_seconds: int,
+        lockout_seconds: Optional[int],
+        now: datetime
+    ) -> RateLimitDecision:
+        locked_until = self.local_lockouts.get(key)
+        if locked_until and locked_until > now:
+            return RateLimitDecision(False, "locked", int((locked_until - now).total_seconds()))
+
+        window_start = now - timedelta(seconds=window_seconds)
+        new_lockout = now + timedelta(seconds=lockout_seconds) if lockout_seconds else None
+        is_locked = {"$gt": [{"$ifNull": ["$locked_until", None]}, now]}
+        is_full = {"$gte": [{"$size": "$hits"}, limit]}
+
+        db = get_database()
+        doc = await db[self.collection_name].find_one_and_update(
+            {"_id": key},
+            [
+                # Drop attempts outside the window
+                {"$set": {"hits": {"$filter": {
+                    "input": {"$ifNull": ["$hits", []]},
+                    "cond": {"$gte": ["$$this", window_start]}
+                }}}},
+                {"$set": {
+                    "was_locked": is_locked,
+                    "denied": {"$or": [is_locked, is_full]}
+                }},
+                {"$set": {
+                    "hits": {"$cond": ["$denied", "$hits", {"$concatArrays": ["$hits", [now]]}]},
+                    "locked_until": {"$cond": [
+                        {"$and": ["$denied", {"$not": ["$was_locked"]}, new_lockout is not None]},
+                        new_lockout,
+                        {"$ifNull": ["$locked_until", None]}
+                    ]}
+                }},
+                # Keep the document until both the window and any lockout have passed
+                {"$set": {"expires_at": {"$max": [
+                    now + timedelta(seconds=window_seconds),
+                    {"$ifNull": ["$locked_until", now]}
+                ]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+        if not doc.get("denied"):
+            return RateLimitDecision(True)
+
+        if doc.get("was_locked"):
+            locked_until = doc["locked_until"]
+            self.local_lockouts.set(key, locked_until, ttl=(locked_until - now).total_seconds())
+            return RateLimitDecision(False, "locked", int((locked_until - now).total_seconds()))
+
+        if lockout_seconds:
+            self.local_lockouts.set(key, new_lockout, ttl=lockout_seconds)
+            return RateLimitDecision(False, "lockout_started", lockout_seconds)
+
+        retry_after = int((doc["hits"][0] - window_start).total_seconds()) if doc.get("hits") else window_seconds
+        return RateLimitDecision(False, "limited", retry_after)
+
+    async def reset(self, key: str) -> None:
+        self.local_lockouts.delete(key)
+        db = get_database()
+        await db[self.collection_name].delete_one({"_id": key})
+
+
+class RateLimitStats:
+    """Hit/deny counters per endpoint, readable without querying MongoDB"""
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, decision: RateLimitDecision) -> None:
+        counter = self.counters.setdefault(
+            endpoint, {"hits": 0, "allowed": 0, "denied": 0, "lockouts": 0}
+        )
+        counter["hits"] += 1
+        if decision.allowed:
+            counter["allowed"] += 1
+        else:
+            counter["denied"] += 1
+            if decision.reason == "lockout_started":
+                counter["lockouts"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {endpoint: dict(counter) for endpoint, counter in self.counters.items()}
+
+
+def get_rate_limit_backend():
+    """Get configured rate limit backend"""
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    return MongoRateLimitBackend()
+
+
+# Global rate limit backend and counters
+rate_limit_backend = get_rate_limit_backend()
+rate_limit_stats = RateLimitStats()
+
+
 async def check_rate_limit(ip: str, endpoint: str) -> None:
     """
     Check if request is within rate limit using sliding window.
@@ -79,78 +252,42 @@ async def check_rate_limit(ip: str, endpoint: str) -> None:
     if not config:
         return  # No rate limit for this endpoint
 
-    limit = config["limit"]
-    window_seconds = config["window"]
-    lockout_seconds = config.get("lockout")
-
-    db = get_database()
-    now = datetime.utcnow()
-    key = f"{ip}:{endpoint}"
-
-    # Check lockout first
-    if lockout_seconds:
-        lockout = await db.rate_limit_lockouts.find_one({"key": key})
-        if lockout and lockout["locked_until"] > now:
-            remaining = int((lockout["locked_until"] - now).total_seconds())
-            minutes = remaining // 60
-            seconds = remaining % 60
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Too many attempts. Try again in {minutes}m {seconds}s"
-            )
-        elif lockout and lockout["locked_until"] <= now:
-            # Lockout expired, remove it
-            await db.rate_limit_lockouts.delete_one({"key": key})
-
-    # Sliding window: Count requests in the last N seconds
-    window_start = now - timedelta(seconds=window_seconds)
-    count = await db.rate_limits.count_documents({
-        "key": key,
-        "timestamp": {"$gte": window_start}
-    })
-
-    if count >= limit:
-        # Rate limit exceeded
-        if lockout_seconds:
-            # Create lockout
-            await db.rate_limit_lockouts.update_one(
-                {"key": key},
-                {
-                    "$set": {
-                        "key": key,
-                        "locked_until": now + timedelta(seconds=lockout_seconds),
-                        "created_at": now
-                    }
-                },
-                upsert=True
-            )
-            minutes = lockout_seconds // 60
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Too many attempts. Locked for {minutes} minutes"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many requests. Please slow down"
-            )
+    decision = await rate_limit_backend.hit(
+        key=f"{ip}:{endpoint}",
+        limit=config["limit"],
+        window_seconds=config["window"],
+        lockout_seconds=config.get("lockout"),
+        now=datetime.utcnow()
+    )
+    rate_limit_stats.record(endpoint, decision)
+
+    if decision.allowed:
+        return
+
+    if decision.reason == "locked":
+        minutes = decision.retry_after // 60
+        seconds = decision.retry_after % 60
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many attempts. Try again in {minutes}m {seconds}s"
+        )
 
-    # Record this attempt
-    await db.rate_limits.insert_one({
-        "key": key,
-        "timestamp": now,
-        "expires_at": now + timedelta(seconds=window_seconds)
-    })
+    if decision.reason == "lockout_started":
+        minutes = decision.retry_after // 60
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many attempts. Locked for {minutes} minutes"
+        )
+
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests. Please slow down"
+    )
 
 
 async def reset_rate_limit(ip: str, endpoint: str) -> None:
     """Reset rate limit for successful actions (e.g., successful login)."""
-    db = get_database()
-    key = f"{ip}:{endpoint}"
-
-    # Delete all rate limit records and lockout
-    await db.rate_limits.delete_many({"key": key})
-    await db.rate_limit_lockouts.delete_one({"key": key})
+    await rate_limit_backend.reset(f"{ip}:{endpoint}")
 
 
 def rate_limit(endpoint: str):
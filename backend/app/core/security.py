@@ -48,6 +48,7 @@ def create_access_token(
     
     to_encode = {
         "exp": expire,
+        "iat": datetime.utcnow(),
         "sub": str(subject),
         "type": "access"
     }
@@ -86,6 +87,7 @@ def create_refresh_token(
     
     to_encode = {
         "exp": expire,
+        "iat": datetime.utcnow(),
         "sub": str(subject),
         "type": "refresh"
     }
@@ -98,27 +100,25 @@ def create_refresh_token(
     return encoded_jwt
 
 
-def decode_token(token: str) -> Optional[str]:
+def decode_token_payload(token: str) -> Optional[dict]:
     """
-    Decode JWT token and return subject.
+    Decode JWT token and return all claims.
     
     Args:
         token: JWT token to decode
     
     Returns:
-        Subject (user ID) if valid, None otherwise
+        Claims dict if valid, None otherwise
     """
     import logging
     logger = logging.getLogger(__name__)
     
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token, 
             settings.JWT_SECRET, 
             algorithms=[settings.JWT_ALGORITHM]
         )
-        
-        return payload.get("sub")
     except JWTError as e:
         logger.error(f"JWT decode error: {e}")
         logger.error(f"Error type: {type(e).__name__}")
@@ -128,6 +128,20 @@ def decode_token(token: str) -> Optional[str]:
         return None
 
 
+def decode_token(token: str) -> Optional[str]:
+    """
+    Decode JWT token and return subject.
+    
+    Args:
+        token: JWT token to decode
+    
+    Returns:
+        Subject (user ID) if valid, None otherwise
+    """
+    payload = decode_token_payload(token)
+    return payload.get("sub") if payload else None
+
+
 def generate_verification_token() -> str:
     """Generate a secure random token for email verification."""
     import secrets
@@ -23,6 +23,15 @@ from app.middleware.security_headers import SecurityHeadersMiddleware
 from app.middleware.token_blacklist import TokenBlacklistMiddleware
 from app.services.db_optimization import db_optimizer
 from app.services.security_monitoring import security_monitor
+from app.services.dashboard_snapshot_service import dashboard_snapshot_service
+from app.services.analytics_rollup_service import analytics_rollup_service
+from app.services.progress_heartbeat_service import progress_heartbeat_service
+from app.services.course_counter_service import course_counter_service
+from app.services.faq_telemetry_service import faq_telemetry_service
+from app.services.faq_category_service import faq_category_service
+from app.core.email import email_service
+from app.core.email_outbox import email_outbox
+from app.services.webhook_queue_service import webhook_queue_service
 
 # Configure logging based on environment
 log_level = logging.INFO if settings.DEBUG else logging.INFO
@@ -72,6 +81,28 @@ async def lifespan(app: FastAPI):
         # Initialize database optimizer
         await db_optimizer.init_db(db_client)
         # Database optimizer initialized
+        
+        # Periodic admin dashboard snapshot (if enabled)
+        dashboard_snapshot_service.start()
+        
+        # Background email delivery
+        email_outbox.start(email_service.deliver)
+        
+        # Background Stripe webhook processing
+        webhook_queue_service.start()
+        
+        # Periodic write of buffered analytics rollup counters
+        analytics_rollup_service.start()
+        
+        # Periodic write of buffered video progress heartbeats
+        progress_heartbeat_service.start()
+        
+        # Periodic repair of course like/review counters
+        course_counter_service.start()
+        
+        # FAQ category totals, then periodic write of buffered FAQ views/votes
+        await faq_category_service.refresh_stats()
+        faq_telemetry_service.start()
     except Exception as e:
         logger.error(f"MongoDB connection failed: {e}")
         # Không chạy in-memory mode, bắt buộc phải có MongoDB
@@ -81,6 +112,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down...")
+    await dashboard_snapshot_service.stop()
+    await progress_heartbeat_service.stop()
+    await course_counter_service.stop()
+    await faq_telemetry_service.stop()
+    await analytics_rollup_service.stop()
+    await webhook_queue_service.stop()
+    await email_outbox.stop()
+    await email_service.close()
     await close_mongo_connection()
 
 
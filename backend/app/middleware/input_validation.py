@@ -6,11 +6,21 @@ Implements smart validation to prevent XSS, SQL injection while avoiding false p
 from fastapi import Request, HTTPException
 import re
 import json
+import time
 import nh3
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.parse import unquote
 import logging
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+from app.core.config import settings
+from app.core.performance import performance_monitor
+
 logger = logging.getLogger(__name__)
 
 class InputValidator:
@@ -65,61 +75,85 @@ class InputValidator:
             r"%252e%252e",
         ]
         
-        # Compile patterns for efficiency
-        self.sql_regex = [re.compile(pattern, re.IGNORECASE) for pattern in self.dangerous_sql_patterns]
-        self.xss_regex = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in self.dangerous_xss_patterns]
-        self.path_regex = [re.compile(pattern, re.IGNORECASE) for pattern in self.path_traversal_patterns]
+        # Compile each category into one alternation so a string is scanned once per category
+        self.sql_regex = self._combine(self.dangerous_sql_patterns, re.IGNORECASE)
+        self.xss_regex = self._combine(self.dangerous_xss_patterns, re.IGNORECASE | re.DOTALL)
+        self.path_regex = self._combine(self.path_traversal_patterns, re.IGNORECASE)
+        
+        # Characters nh3 would rewrite; strings without them come back unchanged
+        self.html_sensitive_regex = re.compile(r"[<>&\r\x00\xa0]")
+        
+        self.plain_tags: Set[str] = set()
+        self.formatting_tags: Set[str] = {"b", "i", "u", "em", "strong", "p", "br", "ul", "ol", "li"}
     
-    def is_dangerous_sql(self, value: str) -> bool:
+    @staticmethod
+    def _combine(patterns: List[str], flags: int) -> "re.Pattern":
+        """Compile patterns into a single alternation"""
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+    
+    @staticmethod
+    def _decode(value: str) -> str:
+        """URL-decode only when the value contains escapes"""
+        return unquote(value) if "%" in value else value
+    
+    def is_dangerous_sql(self, value: str, decoded_value: Optional[str] = None) -> bool:
         """Check if input contains ACTUAL SQL injection attempts"""
-        decoded_value = unquote(value)
+        if decoded_value is None:
+            decoded_value = self._decode(value)
         
         # Skip validation for very long text (course descriptions, etc)
         if len(decoded_value) > 10000:
             return False
-            
-        for pattern in self.sql_regex:
-            if pattern.search(decoded_value):
-                logger.warning(f"SQL injection attempt detected: {decoded_value[:100]}...")
-                return True
+        
+        if self.sql_regex.search(decoded_value):
+            logger.warning(f"SQL injection attempt detected: {decoded_value[:100]}...")
+            return True
         return False
     
-    def is_dangerous_xss(self, value: str) -> bool:
+    def is_dangerous_xss(self, value: str, decoded_value: Optional[str] = None) -> bool:
         """Check if input contains dangerous XSS patterns"""
-        decoded_value = unquote(value)
+        if decoded_value is None:
+            decoded_value = self._decode(value)
+        
+        # Every XSS pattern needs one of these characters
+        if "<" not in decoded_value and ":" not in decoded_value and "=" not in decoded_value:
+            return False
         
-        for pattern in self.xss_regex:
-            if pattern.search(decoded_value):
-                logger.warning(f"XSS attempt detected: {decoded_value[:100]}...")
-                return True
+        if self.xss_regex.search(decoded_value):
+            logger.warning(f"XSS attempt detected: {decoded_value[:100]}...")
+            return True
         return False
     
-    def is_path_traversal(self, value: str) -> bool:
+    def is_path_traversal(self, value: str, decoded_value: Optional[str] = None) -> bool:
         """Check if input contains path traversal patterns"""
-        decoded_value = unquote(value)
+        if decoded_value is None:
+            decoded_value = self._decode(value)
         
-        for pattern in self.path_regex:
-            if pattern.search(decoded_value):
-                logger.warning(f"Path traversal attempt detected: {decoded_value[:100]}...")
-                return True
+        if self.path_regex.search(decoded_value):
+            logger.warning(f"Path traversal attempt detected: {decoded_value[:100]}...")
+            return True
         return False
     
     def sanitize_html(self, value: str, field_name: str = None) -> str:
         """Sanitize HTML content based on field type"""
+        # Fast path: nothing nh3 would change
+        if not self.html_sensitive_regex.search(value):
+            return value
+        
         if field_name in ['title', 'name', 'slug']:
             # Strip ALL HTML from titles
-            return nh3.clean(value, tags=set())
+            return nh3.clean(value, tags=self.plain_tags)
         elif field_name in ['description', 'content', 'bio']:
             # Allow safe formatting tags
             return nh3.clean(
                 value,
-                tags={"b", "i", "u", "em", "strong", "p", "br", "ul", "ol", "li"},
+                tags=self.formatting_tags,
                 attributes={},
                 link_rel=None
             )
         else:
             # Default: strip all HTML
-            return nh3.clean(value, tags=set())
+            return nh3.clean(value, tags=self.plain_tags)
     
     def validate_field(self, field_name: str, value: Any) -> Any:
         """Field-aware validation strategy"""
@@ -131,18 +165,21 @@ class InputValidator:
             # Only sanitize, no strict validation for content fields
             return self.sanitize_html(value, field_name)
         
+        # Decode once for all pattern checks
+        decoded_value = self._decode(value)
+        
         # Layer 2: Check for dangerous patterns
-        if self.is_dangerous_sql(value):
+        if self.is_dangerous_sql(value, decoded_value):
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid input in field '{field_name}': SQL injection detected"
             )
         
-        if self.is_dangerous_xss(value):
+        if self.is_dangerous_xss(value, decoded_value):
             # Don't block, just sanitize
             return self.sanitize_html(value, field_name)
         
-        if field_name in self.strict_fields and self.is_path_traversal(value):
+        if field_name in self.strict_fields and self.is_path_traversal(value, decoded_value):
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid input in field '{field_name}': Path traversal detected"
@@ -153,25 +190,67 @@ class InputValidator:
     
     def validate_input(self, value: Any, parent_key: str = "") -> Any:
         """Recursively validate and sanitize input"""
+        return self.validate_document(value, parent_key)[0]
+    
+    def validate_document(self, value: Any, parent_key: str = "") -> Tuple[Any, bool]:
+        """
+        Single-pass validation of a parsed JSON document.
+        Returns the sanitized value and whether anything changed, so callers
+        can forward the original bytes untouched in the common case.
+        """
         if isinstance(value, str):
-            return self.validate_field(parent_key, value)
+            validated = self.validate_field(parent_key, value)
+            return validated, validated != value
         
         elif isinstance(value, dict):
             # Recursively validate dict values with field context
-            return {k: self.validate_input(v, k) for k, v in value.items()}
+            changed = False
+            result = {}
+            for k, v in value.items():
+                result[k], item_changed = self.validate_document(v, k)
+                changed = changed or item_changed
+            return result, changed
         
         elif isinstance(value, list):
             # Recursively validate list items
-            return [self.validate_input(item, parent_key) for item in value]
+            changed = False
+            result = []
+            for item in value:
+                validated, item_changed = self.validate_document(item, parent_key)
+                result.append(validated)
+                changed = changed or item_changed
+            return result, changed
         
-        return value
+        return value, False
+
+
+def json_loads(body: bytes) -> Any:
+    """Parse JSON with orjson when available, falling back to the stdlib"""
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass  # e.g. integers beyond 64 bits - let the stdlib decide
+    return json.loads(body.decode())
+
+
+def json_dumps(value: Any) -> bytes:
+    """Serialize JSON with orjson when available"""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass
+    return json.dumps(value).encode()
+
 
 class InputValidationMiddleware:
     """Middleware to validate all incoming requests with smart field handling"""
     
-    def __init__(self, app):
+    def __init__(self, app, max_body_size: Optional[int] = None):
         self.app = app
         self.validator = InputValidator()
+        self.max_body_size = max_body_size or settings.MAX_JSON_BODY_SIZE
         # Paths that should be skipped
         self.skip_paths = [
             "/api/v1/auth/login",
@@ -226,38 +305,62 @@ class InputValidationMiddleware:
                 
                 # For JSON requests, validate body
                 if request.method in ["POST", "PUT", "PATCH"] and "application/json" in content_type:
-                    body_data = b""
+                    content_length = request.headers.get("content-length")
+                    if content_length and content_length.isdigit() and int(content_length) > self.max_body_size:
+                        raise HTTPException(status_code=413, detail="Request body too large")
+                    
+                    chunks: List[bytes] = []
+                    body_size = 0
+                    body_sent = False
                     
                     async def wrapped_receive():
-                        nonlocal body_data
+                        nonlocal body_size, body_sent
                         
-                        message = await receive()
+                        if body_sent:
+                            return await receive()
                         
-                        if message["type"] == "http.request":
-                            body_chunk = message.get("body", b"")
-                            body_data += body_chunk
+                        # Buffer every chunk and hand the app one validated body
+                        while True:
+                            message = await receive()
+                            if message["type"] != "http.request":
+                                return message
+                            
+                            chunk = message.get("body", b"")
+                            body_size += len(chunk)
+                            if body_size > self.max_body_size:
+                                raise HTTPException(status_code=413, detail="Request body too large")
+                            chunks.append(chunk)
                             
-                            # If this is the last chunk, validate the complete body
                             if not message.get("more_body", False):
-                                if body_data:
-                                    try:
-                                        # Parse and validate JSON with field context
-                                        json_body = json.loads(body_data.decode())
-                                        validated_body = self.validator.validate_input(json_body)
-                                        
-                                        # Return the validated body
-                                        validated_body_bytes = json.dumps(validated_body).encode()
-                                        
-                                        return {
-                                            "type": "http.request",
-                                            "body": validated_body_bytes,
-                                            "more_body": False
-                                        }
-                                    except json.JSONDecodeError:
-                                        # If not valid JSON, pass through
-                                        pass
+                                break
+                        
+                        body_sent = True
+                        body_data = b"".join(chunks)
+                        
+                        if body_data:
+                            start_time = time.perf_counter()
+                            try:
+                                # Parse and validate JSON with field context
+                                json_body = json_loads(body_data)
+                                validated_body, changed = self.validator.validate_document(json_body)
+                                
+                                # Re-serialize only when sanitization changed something
+                                if changed:
+                                    body_data = json_dumps(validated_body)
+                            except (json.JSONDecodeError, UnicodeDecodeError):
+                                # If not valid JSON, pass through
+                                pass
+                            finally:
+                                performance_monitor.track_execution_time(
+                                    "middleware.input_validation",
+                                    time.perf_counter() - start_time
+                                )
                         
-                        return message
+                        return {
+                            "type": "http.request",
+                            "body": body_data,
+                            "more_body": False
+                        }
                     
                     await self.app(scope, wrapped_receive, send)
                 else:
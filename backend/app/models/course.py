@@ -47,6 +47,7 @@ class CourseStats(BaseModel):
     completion_rate: float = 0
     average_rating: float = 0
     total_reviews: int = 0
+    rating_sum: float = 0  # sum of approved review ratings (average_rating = rating_sum / total_reviews)
     total_revenue: float = 0
     total_likes: int = 0
     total_dislikes: int = 0
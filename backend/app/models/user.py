@@ -5,7 +5,7 @@ Based on CLAUDE.md specifications.
 from typing import Optional, List, Dict
 from datetime import datetime
 from pydantic import EmailStr, Field, BaseModel
-from beanie import Document, Indexed
+from beanie import Document, Indexed, after_event, Save, Replace, Update, SaveChanges, Delete
 from enum import Enum
 
 
@@ -172,6 +172,12 @@ class User(Document):
     original_email: Optional[str] = None  # Backup for admin tracking
     original_name: Optional[str] = None  # Backup for admin tracking
 
+    @after_event(Save, Replace, Update, SaveChanges, Delete)
+    def invalidate_cached_snapshot(self):
+        """Drop the principal cache entry whenever this user document changes"""
+        from app.core.principal import invalidate_user_cache
+        invalidate_user_cache(self.id)
+
     class Settings:
         name = "users"
         indexes = [
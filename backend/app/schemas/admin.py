@@ -62,6 +62,10 @@ class AdminDashboardStats(BaseModel):
     recent_registrations: List[Dict[str, Any]]
     recent_course_submissions: List[Dict[str, Any]]
     recent_enrollments: List[Dict[str, Any]]
+    
+    # Snapshot freshness
+    snapshot_computed_at: Optional[datetime] = None
+    snapshot_age_seconds: Optional[float] = None
 
 
 class PendingReviewResponse(BaseModel):
@@ -151,6 +151,8 @@ class AIUsageStats(BaseModel):
     total_messages: int
     messages_today: int
     messages_this_hour: int
+    input_tokens: int = 0
+    output_tokens: int = 0
     last_interaction: Optional[datetime] = None
     favorite_topics: List[str] = Field(default_factory=list)
     
@@ -103,6 +103,7 @@ class CourseListResponse(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None  # Opaque token for keyset paging (None on last page)
 
 
 class CourseCreateResponse(BaseModel):
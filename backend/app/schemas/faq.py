@@ -91,6 +91,7 @@ class FAQSearchQuery(BaseModel):
     per_page: int = Field(20, ge=1, le=100)
     sort_by: str = Field("priority", pattern="^(priority|view_count|created_at)$")
     sort_order: str = Field("desc", pattern="^(asc|desc)$")
+    cursor: Optional[str] = Field(None, description="next_cursor from a previous page (overrides page)")
 
 
 class FAQVoteRequest(BaseModel):
@@ -72,6 +72,7 @@ class ReviewSearchQuery(BaseModel):
     sort_order: str = Field("desc", pattern="^(asc|desc)$")
     page: int = Field(1, ge=1)
     per_page: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = Field(None, description="next_cursor from a previous page (overrides page)")
 
 
 # Response schemas
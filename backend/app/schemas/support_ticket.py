@@ -53,6 +53,7 @@ class TicketSearchQuery(BaseModel):
     per_page: int = Field(20, ge=1, le=100)
     sort_by: str = Field("created_at", pattern="^(created_at|updated_at|priority|status)$")
     sort_order: str = Field("desc", pattern="^(asc|desc)$")
+    cursor: Optional[str] = Field(None, description="next_cursor from a previous page (overrides page)")
 
 
 
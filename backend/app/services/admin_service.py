@@ -1,12 +1,13 @@
 """
 Admin service for course approval and platform management.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from beanie import PydanticObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_database
+from app.core.principal import invalidate_user_cache
 from app.models.course import Course, CourseStatus
 from app.models.user import User, UserRole, UserStatus
 from app.core.exceptions import NotFoundException, ForbiddenException
@@ -19,6 +20,11 @@ from app.schemas.admin import (
 )
 from app.core.email import EmailService as email_service
 from app.services.token_blacklist_service import token_blacklist_service
+from app.services.dashboard_snapshot_service import dashboard_snapshot_service
+from app.services.analytics_rollup_service import analytics_rollup_service
+from app.core.config import settings
+from app.utils.search import SearchBuilder
+from app.utils.pagination import keyset_sort, apply_cursor, paginate_results, count_documents
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,195 +34,40 @@ class AdminService:
     """Service for admin operations."""
     
     @staticmethod
-    async def get_dashboard_stats() -> Dict[str, Any]:
-        """Get comprehensive admin dashboard statistics."""
+    async def get_dashboard_stats(refresh: bool = False) -> Dict[str, Any]:
+        """
+        Get comprehensive admin dashboard statistics.
+        Served from the precomputed snapshot; refresh=True recomputes it first.
+        """
         try:
-            # Get database instance
-            db = get_database()
-            
-            # Get current time for date comparisons
-            now = datetime.now(timezone.utc)
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            week_start = now - timedelta(days=now.weekday())
-            month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # User statistics
-            total_users = await db.users.count_documents({})
-            total_students = await db.users.count_documents({"role": UserRole.STUDENT})
-            total_creators = await db.users.count_documents({"role": UserRole.CREATOR})
-            total_admins = await db.users.count_documents({"role": UserRole.ADMIN})
-            new_users_today = await db.users.count_documents({
-                "created_at": {"$gte": today_start}
-            })
-            new_users_this_week = await db.users.count_documents({
-                "created_at": {"$gte": week_start}
-            })
-            
-            # Course statistics
-            total_courses = await db.courses.count_documents({})
-            published_courses = await db.courses.count_documents({"status": CourseStatus.PUBLISHED})
-            draft_courses = await db.courses.count_documents({"status": CourseStatus.DRAFT})
-            pending_review_courses = await db.courses.count_documents({"status": CourseStatus.REVIEW})
-            archived_courses = await db.courses.count_documents({"status": CourseStatus.ARCHIVED})
-            coming_soon_courses = await db.courses.count_documents({"status": CourseStatus.COMING_SOON})
-            
-            # Enrollment statistics
-            total_enrollments = await db.enrollments.count_documents({})
-            active_enrollments = await db.enrollments.count_documents({"is_active": True})
-            completed_courses = await db.enrollments.count_documents({
-                "progress.is_completed": True
-            })
-            
-            # Revenue statistics (aggregate from payments collection)
-            revenue_pipeline = [
-                {"$match": {"status": "completed", "type": {"$ne": "refund"}}},
-                {"$group": {
-                    "_id": None,
-                    "total": {"$sum": "$amount"}
-                }}
-            ]
-            total_revenue_result = await db.payments.aggregate(revenue_pipeline).to_list(1)
-            total_revenue = total_revenue_result[0]["total"] if total_revenue_result else 0.0
-            
-            # Revenue this month
-            month_revenue_pipeline = [
-                {"$match": {
-                    "status": "completed",
-                    "type": {"$ne": "refund"},
-                    "created_at": {"$gte": month_start}
-                }},
-                {"$group": {
-                    "_id": None,
-                    "total": {"$sum": "$amount"}
-                }}
-            ]
-            month_revenue_result = await db.payments.aggregate(month_revenue_pipeline).to_list(1)
-            revenue_this_month = month_revenue_result[0]["total"] if month_revenue_result else 0.0
-            
-            # Revenue today
-            today_revenue_pipeline = [
-                {"$match": {
-                    "status": "completed",
-                    "type": {"$ne": "refund"},
-                    "created_at": {"$gte": today_start}
-                }},
-                {"$group": {
-                    "_id": None,
-                    "total": {"$sum": "$amount"}
-                }}
-            ]
-            today_revenue_result = await db.payments.aggregate(today_revenue_pipeline).to_list(1)
-            revenue_today = today_revenue_result[0]["total"] if today_revenue_result else 0.0
-            
-            # Average course price
-            avg_price_pipeline = [
-                {"$match": {"pricing.is_free": False, "status": CourseStatus.PUBLISHED}},
-                {"$group": {
-                    "_id": None,
-                    "avg_price": {"$avg": "$pricing.price"}
-                }}
-            ]
-            avg_price_result = await db.courses.aggregate(avg_price_pipeline).to_list(1)
-            average_course_price = avg_price_result[0]["avg_price"] if avg_price_result else 0.0
-            
-            # Activity statistics
-            active_users_today = await db.users.count_documents({
-                "stats.last_active": {"$gte": today_start}
-            })
-            active_users_this_week = await db.users.count_documents({
-                "stats.last_active": {"$gte": week_start}
-            })
-            
-            # Lessons completed today
-            lessons_completed_today = await db.progress.count_documents({
-                "video_progress.completed_at": {"$gte": today_start}
-            })
-            
-            # Recent activity (last 5 of each)
-            recent_registrations = await db.users.find(
-                {},
-                {"name": 1, "email": 1, "created_at": 1, "role": 1}
-            ).sort("created_at", -1).limit(5).to_list(5)
-            
-            recent_course_submissions = await db.courses.find(
-                {"status": CourseStatus.REVIEW},
-                {"title": 1, "creator_name": 1, "created_at": 1}
-            ).sort("created_at", -1).limit(5).to_list(5)
-            
-            recent_enrollments = await db.enrollments.aggregate([
-                {"$sort": {"enrolled_at": -1}},
-                {"$limit": 5},
-                {"$lookup": {
-                    "from": "users",
-                    "localField": "user_id",
-                    "foreignField": "_id",
-                    "as": "user"
-                }},
-                {"$lookup": {
-                    "from": "courses",
-                    "localField": "course_id",
-                    "foreignField": "_id",
-                    "as": "course"
-                }},
-                {"$project": {
-                    "user_name": {"$arrayElemAt": ["$user.name", 0]},
-                    "course_title": {"$arrayElemAt": ["$course.title", 0]},
-                    "enrolled_at": 1
-                }}
-            ]).to_list(5)
-            
-            # Convert ObjectIds to strings - Fixed conversion
-            for reg in recent_registrations:
-                reg["id"] = str(reg["_id"])
-                reg.pop("_id", None)  # Remove _id after conversion
-            for course in recent_course_submissions:
-                course["id"] = str(course["_id"])
-                course.pop("_id", None)  # Remove _id after conversion
-            for enr in recent_enrollments:
-                enr["id"] = str(enr["_id"])
-                enr.pop("_id", None)  # Remove _id after conversion
-            
+            snapshot = await dashboard_snapshot_service.get_snapshot(refresh=refresh)
             return {
-                "total_users": total_users,
-                "total_students": total_students,
-                "total_creators": total_creators,
-                "total_admins": total_admins,
-                "new_users_today": new_users_today,
-                "new_users_this_week": new_users_this_week,
-                "total_courses": total_courses,
-                "published_courses": published_courses,
-                "draft_courses": draft_courses,
-                "pending_review_courses": pending_review_courses,
-                "archived_courses": archived_courses,
-                "coming_soon_courses": coming_soon_courses,
-                "total_enrollments": total_enrollments,
-                "active_enrollments": active_enrollments,
-                "completed_courses": completed_courses,
-                "total_revenue": total_revenue,
-                "revenue_this_month": revenue_this_month,
-                "revenue_today": revenue_today,
-                "average_course_price": average_course_price,
-                "active_users_today": active_users_today,
-                "active_users_this_week": active_users_this_week,
-                "lessons_completed_today": lessons_completed_today,
-                "recent_registrations": recent_registrations,
-                "recent_course_submissions": recent_course_submissions,
-                "recent_enrollments": recent_enrollments
+                **snapshot["data"]["dashboard"],
+                "snapshot_computed_at": snapshot["computed_at"],
+                "snapshot_age_seconds": snapshot["age_seconds"]
             }
         except Exception as e:
             logger.error(f"Error getting dashboard stats: {str(e)}")
             raise
     
     @staticmethod
-    async def get_pending_review_courses(page: int, per_page: int) -> List[PendingReviewResponse]:
-        """Get courses pending review."""
+    async def get_pending_review_courses(
+        page: int,
+        per_page: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[PendingReviewResponse], Optional[str]]:
+        """Get courses pending review and the cursor for the next page."""
         try:
             db = get_database()
-            skip = (page - 1) * per_page
+            sort = keyset_sort([("created_at", -1)])
             
-            courses = await db.courses.find(
-                {"status": CourseStatus.REVIEW}
-            ).sort("created_at", -1).skip(skip).limit(per_page).to_list(per_page)
+            query = db.courses.find(
+                apply_cursor({"status": CourseStatus.REVIEW}, sort, cursor)
+            ).sort(sort)
+            if not cursor:
+                query = query.skip((page - 1) * per_page)
+            courses = await query.limit(per_page + 1).to_list(per_page + 1)
+            courses, next_cursor = paginate_results(courses, per_page, sort)
             
             result = []
             for course in courses:
@@ -237,7 +88,7 @@ class AdminService:
                     preview_url=f"/courses/{course['_id']}"
                 ))
             
-            return result
+            return result, next_cursor
         except Exception as e:
             logger.error(f"Error getting pending courses: {str(e)}")
             raise
@@ -279,6 +130,9 @@ class AdminService:
             if result.modified_count == 0:
                 raise Exception("Failed to update course status")
             
+            # Course status counters changed
+            await dashboard_snapshot_service.invalidate()
+            
             # Send notification email to creator
             creator = await db.users.find_one({"_id": course["creator_id"]})
             if creator:
@@ -342,6 +196,9 @@ class AdminService:
             if result.modified_count == 0:
                 raise Exception("Failed to update course status")
             
+            # Course status counters changed
+            await dashboard_snapshot_service.invalidate()
+            
             # Send notification email to creator
             creator = await db.users.find_one({"_id": course["creator_id"]})
             if creator:
@@ -399,6 +256,9 @@ class AdminService:
                     "message": "No changes made"
                 }
             
+            # Course status counters changed
+            await dashboard_snapshot_service.invalidate()
+            
             return {
                 "success": True,
                 "message": f"Course status updated to {status}",
@@ -446,6 +306,9 @@ class AdminService:
                     "message": "No changes made"
                 }
             
+            # Free/paid course counters changed
+            await dashboard_snapshot_service.invalidate()
+            
             return {
                 "success": True,
                 "message": "Course pricing updated",
@@ -576,30 +439,50 @@ class AdminService:
         per_page: int = 20,
         role: Optional[str] = None,
         premium_only: Optional[bool] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """List users with filters and pagination."""
+        """List users with filters and pagination (page number or keyset cursor)."""
         try:
-            skip = (page - 1) * per_page
-            
             # Build query
             query = {}
             if role:
                 query["role"] = role
             if premium_only is not None:
                 query["premium_status"] = premium_only
-            if search:
-                query["$or"] = [
-                    {"name": {"$regex": search, "$options": "i"}},
-                    {"email": {"$regex": search, "$options": "i"}}
-                ]
-            
-            # Get total count
             db = get_database()
-            total_count = await db.users.count_documents(query)
-            
-            # Get users
-            users = await db.users.find(query).sort("created_at", -1).skip(skip).limit(per_page).to_list(per_page)
+            uses_text_index = False
+            if search:
+                search_filter, uses_text_index = await SearchBuilder.build_search_filter(
+                    db.users,
+                    search,
+                    SearchBuilder.get_users_search_config(),
+                    base_filter=query,
+                    allow_fallback=settings.SEARCH_REGEX_FALLBACK
+                )
+                query.update(search_filter)
+            
+            # Get total count (cached across cursor pages)
+            sort = keyset_sort([("created_at", -1)])
+            if uses_text_index:
+                cursor = None
+            total_count = await count_documents(db.users, query, cached=bool(cursor))
+            
+            # Get users (most relevant first when searching)
+            users_query = db.users.find(apply_cursor(query, sort, cursor))
+            if uses_text_index:
+                users_query = users_query.sort([("score", {"$meta": "textScore"}), ("created_at", -1)])
+            else:
+                users_query = users_query.sort(sort)
+            if not cursor:
+                users_query = users_query.skip((page - 1) * per_page)
+            users = await users_query.limit(per_page + 1).to_list(per_page + 1)
+            
+            next_cursor = None
+            if uses_text_index:
+                users = users[:per_page]
+            else:
+                users, next_cursor = paginate_results(users, per_page, sort)
             
             # Format response with Smart Backend logic
             formatted_users = []
@@ -635,7 +518,8 @@ class AdminService:
                 "total_count": total_count,
                 "page": page,
                 "per_page": per_page,
-                "total_pages": (total_count + per_page - 1) // per_page
+                "total_pages": (total_count + per_page - 1) // per_page,
+                "next_cursor": next_cursor
             }
         except Exception as e:
             logger.error(f"Error listing users: {str(e)}")
@@ -665,6 +549,7 @@ class AdminService:
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
+            invalidate_user_cache(user_id)
             
             if result.modified_count == 0:
                 return {
@@ -672,6 +557,9 @@ class AdminService:
                     "message": "No changes made"
                 }
             
+            # User role/premium counters changed
+            await dashboard_snapshot_service.invalidate()
+            
             # Send notification
             try:
                 await email_service.send_premium_status_change(
@@ -717,6 +605,7 @@ class AdminService:
                     }
                 }
             )
+            invalidate_user_cache(user_id)
             
             if result.modified_count == 0:
                 return {
@@ -724,6 +613,9 @@ class AdminService:
                     "message": "No changes made"
                 }
             
+            # User role/premium counters changed
+            await dashboard_snapshot_service.invalidate()
+            
             # Log role change
             logger.info(f"User {user_id} role changed from {old_role} to {new_role} by {admin.id}")
             
@@ -795,6 +687,7 @@ class AdminService:
                         "updated_at": datetime.now(timezone.utc)
                     }}
                 )
+                invalidate_user_cache(user_id)
 
                 if result.modified_count == 0:
                     return {
@@ -842,6 +735,7 @@ class AdminService:
 
             # 6. Delete the user account itself
             result = await db.users.delete_one({"_id": ObjectId(user_id)})
+            invalidate_user_cache(user_id)
 
             if result.deleted_count == 0:
                 return {
@@ -986,6 +880,7 @@ class AdminService:
                                 {"_id": ObjectId(user_id)},
                                 {"$set": {"status": UserStatus.DEACTIVATED.value, "updated_at": datetime.now(timezone.utc)}}
                             )
+                            invalidate_user_cache(user_id)
 
                             # Blacklist all tokens for deactivated user
                             await token_blacklist_service.blacklist_all_user_tokens(str(user_id))
@@ -1030,6 +925,7 @@ class AdminService:
                                         "original_name": ""
                                     }}
                                 )
+                                invalidate_user_cache(user_id)
                                 logger.info(f"✅ Restored user {user_id}: {original_email}")
                             else:
                                 # Regular reactivation (just change status)
@@ -1037,13 +933,11 @@ class AdminService:
                                     {"_id": ObjectId(user_id)},
                                     {"$set": {"status": UserStatus.ACTIVE.value, "updated_at": datetime.now(timezone.utc)}}
                                 )
+                                invalidate_user_cache(user_id)
 
                             # Clear blacklist entries for reactivated user
-                            result = await db.blacklisted_tokens.delete_many({
-                                "user_id": str(user_id),
-                                "all_tokens": True
-                            })
-                            logger.info(f"🔓 Removed {result.deleted_count} blacklist entries for reactivated user: {user_id}")
+                            cleared_count = await token_blacklist_service.clear_user_blacklist(str(user_id))
+                            logger.info(f"🔓 Removed {cleared_count} blacklist entries for reactivated user: {user_id}")
 
                             successful.append(user_id)
                         else:
@@ -1147,6 +1041,10 @@ class AdminService:
                 total_processed = len(deleted) + len(archived)
                 has_failures = len(failed) > 0
 
+                if total_processed:
+                    # Course status counters changed
+                    await dashboard_snapshot_service.invalidate()
+
                 if total_processed == 0 and has_failures:
                     # All operations failed
                     return {
@@ -1193,12 +1091,13 @@ class AdminService:
         status: Optional[str] = None,
         user_id: Optional[str] = None,
         date_from: Optional[str] = None,
-        date_to: Optional[str] = None
+        date_to: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """List payments with filters."""
+        """List payments with filters (page number or keyset cursor)."""
         try:
             db = get_database()
-            skip = (page - 1) * per_page
+            sort = keyset_sort([("created_at", -1)])
             
             # Build query
             query = {}
@@ -1214,11 +1113,15 @@ class AdminService:
                     date_query["$lte"] = datetime.fromisoformat(date_to)
                 query["created_at"] = date_query
             
-            # Get total count
-            total_count = await db.payments.count_documents(query)
+            # Get total count (cached across cursor pages)
+            total_count = await count_documents(db.payments, query, cached=bool(cursor))
             
             # Get payments
-            payments = await db.payments.find(query).sort("created_at", -1).skip(skip).limit(per_page).to_list(per_page)
+            payments_query = db.payments.find(apply_cursor(query, sort, cursor)).sort(sort)
+            if not cursor:
+                payments_query = payments_query.skip((page - 1) * per_page)
+            payments = await payments_query.limit(per_page + 1).to_list(per_page + 1)
+            payments, next_cursor = paginate_results(payments, per_page, sort)
             
             return {
                 "payments": [
@@ -1239,7 +1142,8 @@ class AdminService:
                 "total_count": total_count,
                 "page": page,
                 "per_page": per_page,
-                "total_pages": (total_count + per_page - 1) // per_page
+                "total_pages": (total_count + per_page - 1) // per_page,
+                "next_cursor": next_cursor
             }
         except Exception as e:
             logger.error(f"Error listing payments: {str(e)}")
@@ -1284,6 +1188,12 @@ class AdminService:
                     "message": "Failed to process refund"
                 }
             
+            # Refunded payments no longer count towards daily revenue
+            if payment.get("course_id") and payment.get("status") == "completed":
+                await analytics_rollup_service.record(
+                    payment["course_id"], payment["created_at"], revenue=-payment["amount"]
+                )
+            
             # Update enrollment status if this was a course purchase
             if payment.get("course_id"):
                 await db.enrollments.update_one(
@@ -1435,51 +1345,10 @@ class AdminService:
     
     @staticmethod
     async def get_user_analytics() -> Dict[str, Any]:
-        """Get user analytics."""
+        """Get user analytics (from the dashboard snapshot)."""
         try:
-            db = get_database()
-            # User stats by role
-            role_pipeline = [
-                {"$group": {
-                    "_id": "$role",
-                    "count": {"$sum": 1}
-                }}
-            ]
-            users_by_role = await db.users.aggregate(role_pipeline).to_list(10)
-            
-            # User growth over time (last 30 days)
-            thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-            growth_pipeline = [
-                {"$match": {"created_at": {"$gte": thirty_days_ago}}},
-                {"$group": {
-                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                    "count": {"$sum": 1}
-                }},
-                {"$sort": {"_id": 1}}
-            ]
-            user_growth = await db.users.aggregate(growth_pipeline).to_list(30)
-            
-            # Active users (last 7 days)
-            seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-            active_users = await db.users.count_documents({
-                "stats.last_active": {"$gte": seven_days_ago}
-            })
-            
-            # Premium users
-            premium_users = await db.users.count_documents({"premium_status": True})
-            pro_subscribers = await db.users.count_documents({
-                "subscription.status": "active",
-                "subscription.type": "pro"
-            })
-            
-            return {
-                "total_users": await db.users.count_documents({}),
-                "users_by_role": users_by_role,
-                "user_growth": user_growth,
-                "active_users_7d": active_users,
-                "premium_users": premium_users,
-                "pro_subscribers": pro_subscribers
-            }
+            data = await dashboard_snapshot_service.get_data()
+            return data["user_analytics"]
         except Exception as e:
             logger.error(f"Error getting user analytics: {str(e)}")
             raise
@@ -1555,12 +1424,13 @@ class AdminService:
         search: Optional[str] = None,
         category: Optional[str] = None,
         level: Optional[str] = None,
-        creator_id: Optional[str] = None
+        creator_id: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """List all courses for admin management with comprehensive filtering."""
         try:
             db = get_database()
-            skip = (page - 1) * per_page
+            sort = keyset_sort([("created_at", -1)])
             
             # Build query
             query = {}
@@ -1569,14 +1439,6 @@ class AdminService:
             if status:
                 query["status"] = status
             
-            # Search filter (title, description)
-            if search:
-                query["$or"] = [
-                    {"title": {"$regex": search, "$options": "i"}},
-                    {"description": {"$regex": search, "$options": "i"}},
-                    {"creator_name": {"$regex": search, "$options": "i"}}
-                ]
-            
             # Category filter
             if category:
                 query["category"] = category
@@ -1589,12 +1451,32 @@ class AdminService:
             if creator_id:
                 query["creator_id"] = ObjectId(creator_id)
             
-            # Get total count
-            total_count = await db.courses.count_documents(query)
+            # Search filter (title, description, creator, category)
+            uses_text_index = False
+            if search:
+                search_filter, uses_text_index = await SearchBuilder.build_search_filter(
+                    db.courses,
+                    search,
+                    SearchBuilder.get_courses_search_config(),
+                    base_filter=query,
+                    allow_fallback=settings.SEARCH_REGEX_FALLBACK
+                )
+                query.update(search_filter)
             
-            # Get courses with creator info
+            # Get total count (cached across cursor pages)
+            if uses_text_index:
+                cursor = None
+            total_count = await count_documents(db.courses, query, cached=bool(cursor))
+            
+            # Page first, then join creator/enrollment data for that page only
             courses_pipeline = [
-                {"$match": query},
+                {"$match": apply_cursor(query, sort, cursor)},
+                {"$sort": (
+                    {"score": {"$meta": "textScore"}, "created_at": -1}
+                    if uses_text_index else dict(sort)
+                )},
+                *([] if cursor else [{"$skip": (page - 1) * per_page}]),
+                {"$limit": per_page + 1},
                 {"$lookup": {
                     "from": "users",
                     "localField": "creator_id", 
@@ -1620,16 +1502,19 @@ class AdminService:
                         }
                     }
                 }},
-                {"$sort": {"created_at": -1}},
-                {"$skip": skip},
-                {"$limit": per_page},
                 {"$project": {
                     "creator_info": 0,
                     "enrollments": 0
                 }}
             ]
             
-            courses = await db.courses.aggregate(courses_pipeline).to_list(per_page)
+            courses = await db.courses.aggregate(courses_pipeline).to_list(per_page + 1)
+            
+            next_cursor = None
+            if uses_text_index:
+                courses = courses[:per_page]
+            else:
+                courses, next_cursor = paginate_results(courses, per_page, sort)
             
             # Format course data for admin view
             formatted_courses = []
@@ -1773,6 +1658,7 @@ class AdminService:
                 "page": page,
                 "per_page": per_page,
                 "total_pages": (total_count + per_page - 1) // per_page,
+                "next_cursor": next_cursor,
                 "summary": {
                     "total_courses": total_count,
                     "status_breakdown": {
@@ -1811,16 +1697,14 @@ class AdminService:
             except Exception:
                 db_status = "unhealthy"
             
-            # Calculate system metrics
-            total_users = await db.users.count_documents({})
-            total_courses = await db.courses.count_documents({})
-            total_enrollments = await db.enrollments.count_documents({})
+            # Calculate system metrics (from the dashboard snapshot)
+            system = (await dashboard_snapshot_service.get_data())["system"]
+            total_users = system["total_users"]
+            total_courses = system["total_courses"]
+            total_enrollments = system["total_enrollments"]
             
             # Active sessions (users active in last hour)
-            one_hour_ago = now - timedelta(hours=1)
-            active_sessions = await db.users.count_documents({
-                "stats.last_active": {"$gte": one_hour_ago}
-            })
+            active_sessions = system["active_sessions"]
             
             # Recent errors (if we had an errors collection)
             # For now, we'll return mock data
@@ -1892,22 +1776,9 @@ class AdminService:
     async def get_course_statistics() -> Dict[str, Any]:
         """Get course statistics for dashboard Quick Stats (independent from pagination)."""
         try:
-            db = get_database()
-            
-            # Get total counts from database - NOT from current page
-            total_courses = await db.courses.count_documents({})
-            pending_review = await db.courses.count_documents({"status": "review"})
-            published = await db.courses.count_documents({"status": "published"})
-            rejected = await db.courses.count_documents({"status": "rejected"})
-            free_courses = await db.courses.count_documents({"pricing.is_free": True})
-            
-            return {
-                "total_courses": total_courses,
-                "pending_review": pending_review,
-                "published": published,
-                "rejected": rejected,
-                "free_courses": free_courses
-            }
+            # Totals from the dashboard snapshot - NOT from current page
+            data = await dashboard_snapshot_service.get_data()
+            return data["course_statistics"]
         except Exception as e:
             logger.error(f"Error getting course statistics: {str(e)}")
             raise
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+AI response cache.
+LLM calls are slow and paid, so generated responses are cached in a bounded
+in-process LRU backed by the persistent MongoDB cache collection (shared by
+all workers and kept across restarts). Keys combine the kind of request, the
+normalised input and the version of any course/lesson context it used, so
+editing a course or lesson naturally stops serving stale answers.
+"""
+from typing import Any, Dict, Iterable, Optional
+from collections import defaultdict
+import hashlib
+import logging
+
+from app.core.cache import MongoCacheBackend, TieredCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case/whitespace-insensitive form of free text"""
+    return " ".join(str(text or "").lower().split())
+
+
+class AIResponseCache:
+    """Tiered cache for generated AI responses with hit/miss/latency-saved metrics"""
+
+    def __init__(self):
+        self.cache = TieredCache(
+            namespace="ai",
+            maxsize=settings.AI_CACHE_SIZE,
+            local_ttl=settings.AI_CACHE_TTL,
+            shared_ttl=settings.AI_CACHE_TTL,
+            shared=MongoCacheBackend() if settings.AI_CACHE_PERSISTENT else None
+        )
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "stores": 0, "seconds_saved": 0.0}
+        )
+
+    @staticmethod
+    def make_key(kind: str, parts: Iterable[Any]) -> str:
+        """Hash of request kind, provider/model and normalised key parts"""
+        raw = "\x1f".join([
+            kind, settings.AI_PROVIDER, settings.anthropic_model,
+            *(normalize_text(part) for part in parts)
+        ])
+        return f"{kind}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    async def get(self, kind: str, key: str) -> Optional[Any]:
+        """Cached value for the key, or None (counted as a miss)"""
+        try:
+            entry = await self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"AI cache get failed: {e}")
+            entry = None
+
+        stats = self._stats[kind]
+        if entry is None:
+            stats["misses"] += 1
+            return None
+
+        stats["hits"] += 1
+        stats["seconds_saved"] += entry.get("generation_seconds", 0)
+        return entry["value"]
+
+    async def set(self, kind: str, key: str, value: Any, generation_seconds: float) -> None:
+        """Store a generated value (must be BSON serialisable)"""
+        try:
+            await self.cache.set(key, {
+                "value": value,
+                "generation_seconds": round(generation_seconds, 3)
+            })
+            self._stats[kind]["stores"] += 1
+        except Exception as e:
+            logger.warning(f"AI cache set failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        kinds = {}
+        for kind, stats in self._stats.items():
+            total = stats["hits"] + stats["misses"]
+            kinds[kind] = {
+                **stats,
+                "seconds_saved": round(stats["seconds_saved"], 1),
+                "hit_rate": round(stats["hits"] / total * 100, 1) if total else 0.0
+            }
+        return {"local": self.cache.get_stats(), "by_kind": kinds}
+
+
+# Global AI cache instance
+ai_response_cache = AIResponseCache()
@@ -0,0 +1,171 @@
+"""
+AI conversation history, rate windows and usage accounting.
+Stored in MongoDB so every worker sees the same state:
+- ai_conversations: one document per user with the last AI_HISTORY_LIMIT
+  exchanges (capped with $push/$slice, removed by TTL after inactivity)
+- ai_rate_limits: one counter per user per hour window (atomic $inc)
+- ai_usage_daily: request/token counters per user, course and day
+Recent history is served from an in-process read-through LRU.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class AIConversationService:
+    """Shared conversation history and usage counters for the AI Study Buddy"""
+
+    CONVERSATIONS = "ai_conversations"
+    RATE_LIMITS = "ai_rate_limits"
+    USAGE = "ai_usage_daily"
+
+    def __init__(self):
+        self._history_cache = LRUCache(
+            maxsize=settings.AI_HISTORY_CACHE_SIZE,
+            ttl=settings.AI_HISTORY_CACHE_TTL
+        )
+
+    async def check_rate_limit(self, user_id: str) -> bool:
+        """
+        Count one message in the user's current hour window.
+        Returns False (without counting) once AI_RATE_LIMIT_PER_HOUR is reached.
+        """
+        window = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        try:
+            # At the limit the filter misses and the upsert collides with the existing window
+            await get_database()[self.RATE_LIMITS].update_one(
+                {"_id": f"{user_id}:{window:%Y%m%d%H}", "count": {"$lt": settings.AI_RATE_LIMIT_PER_HOUR}},
+                {
+                    "$inc": {"count": 1},
+                    "$setOnInsert": {
+                        "user_id": user_id,
+                        "window_start": window,
+                        "expires_at": window + timedelta(hours=2)
+                    }
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            # Fail open - a storage hiccup should not block learning
+            logger.warning(f"AI rate limit check failed for {user_id}: {e}")
+        return True
+
+    async def add_exchange(
+        self,
+        user_id: str,
+        question: str,
+        answer: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Append a question/answer pair, keeping only the latest AI_HISTORY_LIMIT"""
+        now = datetime.utcnow()
+        entry = {
+            "timestamp": now,
+            "question": question,
+            "answer": answer,
+            "context": context
+        }
+        await get_database()[self.CONVERSATIONS].update_one(
+            {"_id": user_id},
+            {
+                "$push": {"entries": {"$each": [entry], "$slice": -settings.AI_HISTORY_LIMIT}},
+                "$set": {
+                    "updated_at": now,
+                    "expires_at": now + timedelta(days=settings.AI_HISTORY_RETENTION_DAYS)
+                }
+            },
+            upsert=True
+        )
+
+        # Keep this worker's cached copy current
+        cached = self._history_cache.get(user_id)
+        if cached is not None:
+            self._history_cache.set(user_id, (cached + [entry])[-settings.AI_HISTORY_LIMIT:])
+
+    async def get_history(self, user_id: str) -> List[Dict[str, Any]]:
+        """Recent exchanges, oldest first"""
+        history = self._history_cache.get(user_id)
+        if history is None:
+            doc = await get_database()[self.CONVERSATIONS].find_one({"_id": user_id}, {"entries": 1})
+            history = doc.get("entries", []) if doc else []
+            self._history_cache.set(user_id, history)
+        return history
+
+    async def clear_history(self, user_id: str) -> None:
+        await get_database()[self.CONVERSATIONS].delete_one({"_id": user_id})
+        self._history_cache.delete(user_id)
+
+    async def record_usage(
+        self,
+        user_id: str,
+        course_id: Optional[str] = None,
+        from_cache: bool = False,
+        input_tokens: int = 0,
+        output_tokens: int = 0
+    ) -> None:
+        """Add one AI request (and its token counts) to the user's daily counters"""
+        now = datetime.utcnow()
+        date = now.strftime("%Y-%m-%d")
+        try:
+            await get_database()[self.USAGE].update_one(
+                {"_id": f"{user_id}:{course_id or '-'}:{date}"},
+                {
+                    "$inc": {
+                        "requests": 1,
+                        "cached_requests": 1 if from_cache else 0,
+                        "input_tokens": input_tokens,
+                        "output_tokens": output_tokens
+                    },
+                    "$set": {"last_interaction": now},
+                    "$setOnInsert": {"user_id": user_id, "course_id": course_id, "date": date}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record AI usage for {user_id}: {e}")
+
+    async def get_usage_stats(self, user_id: str) -> Dict[str, Any]:
+        """Totals for the user: all time, today and the current rate window"""
+        db = get_database()
+        now = datetime.utcnow()
+        today = now.strftime("%Y-%m-%d")
+
+        rows = await db[self.USAGE].aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {
+                "_id": None,
+                "total_messages": {"$sum": "$requests"},
+                "messages_today": {"$sum": {"$cond": [{"$eq": ["$date", today]}, "$requests", 0]}},
+                "input_tokens": {"$sum": "$input_tokens"},
+                "output_tokens": {"$sum": "$output_tokens"},
+                "last_interaction": {"$max": "$last_interaction"}
+            }}
+        ]).to_list(1)
+        totals = rows[0] if rows else {}
+
+        window = now.replace(minute=0, second=0, microsecond=0)
+        rate_doc = await db[self.RATE_LIMITS].find_one({"_id": f"{user_id}:{window:%Y%m%d%H}"})
+
+        return {
+            "user_id": user_id,
+            "total_messages": totals.get("total_messages", 0),
+            "messages_today": totals.get("messages_today", 0),
+            "messages_this_hour": rate_doc["count"] if rate_doc else 0,
+            "input_tokens": totals.get("input_tokens", 0),
+            "output_tokens": totals.get("output_tokens", 0),
+            "last_interaction": totals.get("last_interaction")
+        }
+
+
+# Global conversation service instance
+ai_conversation_service = AIConversationService()
@@ -7,8 +7,10 @@ import asyncio
 import json
 import logging
 import os
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import re
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 # Third-party imports
 from anthropic import Anthropic
@@ -17,10 +19,13 @@ from pydantic_ai.models.anthropic import AnthropicModel
 
 # Local application imports
 from app.core.config import get_settings
+from app.core.performance import performance_monitor
 from app.models.course import Course
 from app.models.lesson import Lesson
 from app.models.user import User
 from app.schemas.ai import GeneratedQuizQuestion, QuestionDifficulty, QuizOption
+from app.services.ai_cache import ai_response_cache
+from app.services.ai_conversation_service import ai_conversation_service
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -37,13 +42,20 @@ class AIService:
         self.agent = None
         self.gemini_model = None
         self.use_gemini = False  # Flag to track which AI to use
-        self.rate_limits = {}  # Track usage per user
-        self.conversation_history = {}  # Store conversation context
-        self.response_cache = {}  # Cache for common responses
         self._initialize_ai()
     
     def _initialize_ai(self):
         """Initialize AI service with Anthropic first, Gemini fallback"""
+        if self.settings.AI_PROVIDER == "fake":
+            # Canned, locally generated responses for tests and load tests
+            from pydantic_ai.models.test import TestModel
+            self.agent = Agent(
+                model=TestModel(),
+                system_prompt=self._get_system_prompt()
+            )
+            logger.warning("Using fake AI model - responses are not generated by an LLM")
+            return
+        
         try:
             # Try Anthropic first
             api_key = self.settings.anthropic_api_key
@@ -134,86 +146,241 @@ class AIService:
             Dict containing AI response and metadata
         """
         try:
-            # Check rate limits
-            if not await self._check_rate_limit(user_id):
-                return {
-                    "error": "Rate limit exceeded. Please wait before sending another message.",
-                    "retry_after": 60
-                }
-            
-            # Prepare context-aware prompt
-            contextual_prompt = await self._prepare_contextual_prompt(message, context)
-            
-            # Check cache first
-            cached_response = await self._get_cached_response(contextual_prompt)
-            if cached_response:
-                # Store conversation in history
-                await self._store_conversation(user_id, message, cached_response["response"], context)
-                # Track usage
-                await self._track_usage(user_id)
-                return cached_response
+            ready_response, contextual_prompt, cache_key = await self._start_chat(user_id, message, context)
+            if ready_response is not None:
+                return ready_response
             
+            started = time.perf_counter()
             # Get AI response using appropriate service
             if self.use_gemini:
                 # Gemini response
                 response = self.gemini_model.generate_content(contextual_prompt)
                 result_data = response.text
+                usage = self._extract_usage(response)
             else:
                 # Anthropic response - fallback to Gemini on auth error
                 try:
                     result = await self.agent.run(contextual_prompt)
                     result_data = result.data
+                    usage = self._extract_usage(result)
                 except Exception as anthropic_err:
-                    err_str = str(anthropic_err)
-                    if "401" in err_str or "authentication_error" in err_str or "invalid x-api-key" in err_str:
-                        logger.warning("Anthropic key invalid, falling back to Gemini")
-                        # Init Gemini if not yet done
-                        if not self.gemini_model:
-                            gemini_key = self.settings.gemini_api_key
-                            if gemini_key:
-                                import google.generativeai as genai
-                                genai.configure(api_key=gemini_key)
-                                self.gemini_model = genai.GenerativeModel(self.settings.gemini_model)
-                        if self.gemini_model:
-                            self.use_gemini = True
-                            response = self.gemini_model.generate_content(contextual_prompt)
-                            result_data = response.text
-                        else:
-                            raise anthropic_err
+                    if self._is_auth_error(anthropic_err) and self._enable_gemini_fallback():
+                        response = self.gemini_model.generate_content(contextual_prompt)
+                        result_data = response.text
+                        usage = self._extract_usage(response)
                     else:
                         raise anthropic_err
             
-            # Store conversation in history
-            await self._store_conversation(user_id, message, result_data, context)
-            
-            # Track usage
-            await self._track_usage(user_id)
+            return await self._finish_chat(user_id, message, context, cache_key, result_data, started, usage)
             
-            response_data = {
-                "response": result_data,
-                "context": context,
-                "timestamp": datetime.utcnow().isoformat(),
-                "model": self.settings.gemini_model if self.use_gemini else self.settings.anthropic_model
+        except Exception as e:
+            logger.error(f"AI chat error: {str(e)}")
+            return {
+                "error": "I'm having trouble processing your request. Please try again.",
+                "details": str(e) if self.settings.debug else None
             }
+    
+    async def chat_stream(
+        self,
+        user_id: str,
+        message: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process chat message, yielding the answer as it is generated
+        
+        Yields events:
+            {"event": "delta", "data": {"text": ...}} for each chunk, then
+            {"event": "done", "data": <same dict as chat()>} or
+            {"event": "error", "data": {"error": ..., ...}}
+        
+        The full answer is stored in history and the response cache once complete.
+        """
+        try:
+            ready_response, contextual_prompt, cache_key = await self._start_chat(user_id, message, context)
+            if ready_response is not None:
+                if "error" in ready_response:
+                    yield {"event": "error", "data": ready_response}
+                else:
+                    yield {"event": "delta", "data": {"text": ready_response["response"]}}
+                    yield {"event": "done", "data": ready_response}
+                return
             
-            # Cache common responses
-            await self._cache_response(contextual_prompt, response_data)
+            started = time.perf_counter()
+            chunks: List[str] = []
+            usage: Dict[str, int] = {}
+            async for text in self._stream_completion(contextual_prompt, usage):
+                if not chunks:
+                    performance_monitor.track_execution_time("ai.chat.first_token", time.perf_counter() - started)
+                chunks.append(text)
+                yield {"event": "delta", "data": {"text": text}}
             
-            return response_data
+            response_data = await self._finish_chat(
+                user_id, message, context, cache_key, "".join(chunks), started, usage
+            )
+            yield {"event": "done", "data": response_data}
             
         except Exception as e:
-            logger.error(f"AI chat error: {str(e)}")
-            return {
+            logger.error(f"AI chat stream error: {str(e)}")
+            yield {"event": "error", "data": {
                 "error": "I'm having trouble processing your request. Please try again.",
                 "details": str(e) if self.settings.debug else None
+            }}
+    
+    async def _start_chat(
+        self,
+        user_id: str,
+        message: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], str, str]:
+        """
+        Rate limit, prompt and cache lookup shared by chat() and chat_stream().
+        Returns (ready_response, contextual_prompt, cache_key); ready_response is
+        an error or a cached answer, otherwise None and the model must be called.
+        """
+        # Check rate limits
+        if not await self._check_rate_limit(user_id):
+            return {
+                "error": "Rate limit exceeded. Please wait before sending another message.",
+                "retry_after": 60
+            }, "", ""
+        
+        # Prepare context-aware prompt
+        context_versions: Dict[str, str] = {}
+        contextual_prompt = await self._prepare_contextual_prompt(message, context, context_versions)
+        
+        # Check cache first (same question in the same course/lesson version)
+        cache_key = ai_response_cache.make_key("chat", [
+            message,
+            (context or {}).get("user_level"),
+            context_versions.get("course"),
+            context_versions.get("lesson")
+        ])
+        cached = await ai_response_cache.get("chat", cache_key)
+        if cached:
+            cached_response = {
+                **cached,
+                "context": context,
+                "timestamp": datetime.utcnow().isoformat(),
+                "from_cache": True
+            }
+            # Store conversation in history
+            await self._store_conversation(user_id, message, cached_response["response"], context)
+            # Track usage
+            await self._track_usage(user_id, context, from_cache=True)
+            return cached_response, contextual_prompt, cache_key
+        
+        return None, contextual_prompt, cache_key
+    
+    async def _finish_chat(
+        self,
+        user_id: str,
+        message: str,
+        context: Optional[Dict[str, Any]],
+        cache_key: str,
+        result_data: str,
+        started: float,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """Store, track and cache a generated answer; returns the chat response"""
+        # Store conversation in history
+        await self._store_conversation(user_id, message, result_data, context)
+        
+        # Track usage
+        await self._track_usage(user_id, context, usage=usage)
+        
+        response_data = {
+            "response": result_data,
+            "context": context,
+            "timestamp": datetime.utcnow().isoformat(),
+            "model": self._model_name()
+        }
+        
+        # Cache common responses
+        await ai_response_cache.set(
+            "chat",
+            cache_key,
+            {"response": result_data, "model": response_data["model"]},
+            time.perf_counter() - started
+        )
+        
+        return response_data
+    
+    async def _stream_completion(self, prompt: str, usage: Dict[str, int]) -> AsyncIterator[str]:
+        """Yield text chunks from the active model as they arrive; fills `usage` at the end"""
+        if not self.use_gemini:
+            emitted = False
+            try:
+                async with self.agent.run_stream(prompt) as result:
+                    async for text in result.stream_text(delta=True):
+                        emitted = True
+                        yield text
+                    usage.update(self._extract_usage(result))
+                return
+            except Exception as anthropic_err:
+                # Fallback to Gemini only if nothing was sent yet
+                if emitted or not self._is_auth_error(anthropic_err) or not self._enable_gemini_fallback():
+                    raise
+        
+        response = await self.gemini_model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        usage.update(self._extract_usage(response))
+    
+    @staticmethod
+    def _extract_usage(result: Any) -> Dict[str, int]:
+        """Token counts from a pydantic-ai run result or a Gemini response"""
+        try:
+            metadata = getattr(result, "usage_metadata", None)
+            if metadata is not None:
+                return {
+                    "input_tokens": metadata.prompt_token_count or 0,
+                    "output_tokens": metadata.candidates_token_count or 0
+                }
+            run_usage = result.usage()
+            return {
+                "input_tokens": getattr(run_usage, "input_tokens", None) or getattr(run_usage, "request_tokens", None) or 0,
+                "output_tokens": getattr(run_usage, "output_tokens", None) or getattr(run_usage, "response_tokens", None) or 0
             }
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def _is_auth_error(error: Exception) -> bool:
+        err_str = str(error)
+        return "401" in err_str or "authentication_error" in err_str or "invalid x-api-key" in err_str
+    
+    def _enable_gemini_fallback(self) -> bool:
+        """Switch to Gemini after an Anthropic auth failure. Returns False if unavailable."""
+        logger.warning("Anthropic key invalid, falling back to Gemini")
+        # Init Gemini if not yet done
+        if not self.gemini_model:
+            gemini_key = self.settings.gemini_api_key
+            if gemini_key:
+                import google.generativeai as genai
+                genai.configure(api_key=gemini_key)
+                self.gemini_model = genai.GenerativeModel(self.settings.gemini_model)
+        if self.gemini_model:
+            self.use_gemini = True
+            return True
+        return False
+    
+    def _model_name(self) -> str:
+        if self.settings.AI_PROVIDER == "fake":
+            return "fake"
+        return self.settings.gemini_model if self.use_gemini else self.settings.anthropic_model
     
     async def _prepare_contextual_prompt(
         self,
         message: str,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        versions: Optional[Dict[str, str]] = None
     ) -> str:
-        """Prepare a context-aware prompt for the AI"""
+        """
+        Prepare a context-aware prompt for the AI.
+        If `versions` is given, it receives the course/lesson versions used (for cache keys).
+        """
         
         if not context:
             return f"Student question: {message}"
@@ -225,6 +392,8 @@ class AIService:
         if context.get("course_id"):
             course_context = await self._get_course_context(context["course_id"])
             if course_context:
+                if versions is not None:
+                    versions["course"] = course_context["version"]
                 context_parts.append(f"""
                 COURSE CONTEXT:
                 - Course: "{course_context['title']}"
@@ -237,6 +406,8 @@ class AIService:
         if context.get("lesson_id"):
             lesson_context = await self._get_lesson_context(context["lesson_id"])
             if lesson_context:
+                if versions is not None:
+                    versions["lesson"] = lesson_context["version"]
                 lesson_info = f"""
                 CURRENT LESSON CONTEXT:
                 - Lesson: "{lesson_context['title']}"
@@ -303,7 +474,8 @@ class AIService:
                     "title": course.title,
                     "description": course.description,
                     "level": course.level,
-                    "category": course.category
+                    "category": course.category,
+                    "version": f"{course.id}@{course.updated_at.isoformat()}"
                 }
         except Exception as e:
             logger.error(f"Error getting course context: {str(e)}")
@@ -323,7 +495,8 @@ class AIService:
                     "video_transcript": lesson.video.transcript if lesson.video else None,
                     "video_duration": lesson.video.duration if lesson.video else None,
                     "has_quiz": lesson.has_quiz if hasattr(lesson, 'has_quiz') else False,
-                    "order": lesson.order
+                    "order": lesson.order,
+                    "version": f"{lesson.id}@{lesson.updated_at.isoformat()}"
                 }
 
                 # Get chapter context
@@ -343,29 +516,25 @@ class AIService:
         return None
     
     async def _check_rate_limit(self, user_id: str) -> bool:
-        """Check if user has exceeded rate limits"""
-        now = datetime.utcnow()
-        user_limits = self.rate_limits.get(user_id, {"count": 0, "window_start": now})
-        
-        # Reset if window expired (1 hour window)
-        if now - user_limits["window_start"] > timedelta(hours=1):
-            user_limits = {"count": 0, "window_start": now}
-        
-        # Check limit (50 messages per hour for free users)
-        if user_limits["count"] >= 50:
-            return False
-        
-        # Update limits
-        user_limits["count"] += 1
-        self.rate_limits[user_id] = user_limits
-        
-        return True
+        """Check if user has exceeded rate limits (shared hourly window)"""
+        return await ai_conversation_service.check_rate_limit(user_id)
     
-    async def _track_usage(self, user_id: str):
+    async def _track_usage(
+        self,
+        user_id: str,
+        context: Optional[Dict[str, Any]] = None,
+        from_cache: bool = False,
+        usage: Optional[Dict[str, int]] = None
+    ):
         """Track AI usage for analytics and billing"""
-        # This could store usage in database for analytics
-        # For now, just log the usage
-        # AI usage tracked
+        usage = usage or {}
+        await ai_conversation_service.record_usage(
+            user_id,
+            course_id=(context or {}).get("course_id"),
+            from_cache=from_cache,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0)
+        )
     
     async def _store_conversation(
         self,
@@ -375,94 +544,18 @@ class AIService:
         context: Optional[Dict[str, Any]] = None
     ):
         """Store conversation history for context continuity"""
-        if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = []
-        
-        conversation_entry = {
-            "timestamp": datetime.utcnow(),
-            "question": question,
-            "answer": answer,
-            "context": context
-        }
-        
-        # Keep only last 10 conversations per user
-        self.conversation_history[user_id].append(conversation_entry)
-        if len(self.conversation_history[user_id]) > 10:
-            self.conversation_history[user_id].pop(0)
+        try:
+            await ai_conversation_service.add_exchange(user_id, question, answer, context)
+        except Exception as e:
+            logger.warning(f"Failed to store AI conversation for {user_id}: {e}")
     
     async def get_conversation_history(self, user_id: str) -> List[Dict[str, Any]]:
         """Get conversation history for a user"""
-        return self.conversation_history.get(user_id, [])
+        return await ai_conversation_service.get_history(user_id)
     
     async def clear_conversation_history(self, user_id: str):
         """Clear conversation history for a user"""
-        if user_id in self.conversation_history:
-            del self.conversation_history[user_id]
-    
-    async def _cache_response(self, prompt: str, response_data: Dict[str, Any]):
-        """Cache AI response for common queries"""
-        try:
-            # Create a cache key from the prompt (simplified version)
-            cache_key = self._create_cache_key(prompt)
-            
-            # Store in cache with timestamp
-            self.response_cache[cache_key] = {
-                "response": response_data,
-                "cached_at": datetime.utcnow(),
-                "hits": 0
-            }
-            
-            # Limit cache size to 100 entries
-            if len(self.response_cache) > 100:
-                # Remove oldest entry
-                oldest_key = min(self.response_cache.keys(), 
-                               key=lambda k: self.response_cache[k]["cached_at"])
-                del self.response_cache[oldest_key]
-                
-        except Exception as e:
-            logger.error(f"Error caching response: {str(e)}")
-    
-    def _create_cache_key(self, prompt: str) -> str:
-        """Create a cache key from prompt"""
-        import hashlib
-        
-        # Normalize prompt for better cache hits
-        normalized = prompt.lower().strip()
-        
-        # Remove user-specific information for better cache hits
-        normalized = normalized.replace("student question:", "").strip()
-        
-        # Create hash for cache key
-        return hashlib.md5(normalized.encode()).hexdigest()
-    
-    async def _get_cached_response(self, prompt: str) -> Optional[Dict[str, Any]]:
-        """Get cached response if available and not expired"""
-        try:
-            cache_key = self._create_cache_key(prompt)
-            
-            if cache_key in self.response_cache:
-                cached_entry = self.response_cache[cache_key]
-                
-                # Check if cache is still valid (24 hours)
-                cache_age = datetime.utcnow() - cached_entry["cached_at"]
-                if cache_age.total_seconds() < 86400:  # 24 hours
-                    # Increment hit counter
-                    cached_entry["hits"] += 1
-                    
-                    # Return cached response with updated timestamp
-                    cached_response = cached_entry["response"].copy()
-                    cached_response["timestamp"] = datetime.utcnow().isoformat()
-                    cached_response["from_cache"] = True
-                    
-                    return cached_response
-                else:
-                    # Remove expired cache entry
-                    del self.response_cache[cache_key]
-                    
-        except Exception as e:
-            logger.error(f"Error retrieving cached response: {str(e)}")
-        
-        return None
+        await ai_conversation_service.clear_history(user_id)
     
     async def generate_quiz_questions(
         self,
@@ -484,6 +577,15 @@ class AIService:
             List of generated quiz questions (MC and T/F)
         """
         try:
+            cache_key = ai_response_cache.make_key(
+                "quiz", [lesson_content, difficulty, num_questions, include_true_false]
+            )
+            cached = await ai_response_cache.get("quiz", cache_key)
+            if cached:
+                return [GeneratedQuizQuestion(**question) for question in cached]
+            
+            started = time.perf_counter()
+            
             # Adaptive vs Fixed mode
             if num_questions is None:
                 # ADAPTIVE MODE - AI decides based on content
@@ -583,6 +685,15 @@ class AIService:
             # Parse the AI response and format as quiz questions
             questions = self._parse_quiz_response(result_data)
             
+            # Only cache real AI output (not parser fallbacks)
+            if questions and re.search(r'\[.*\]', result_data or "", re.DOTALL):
+                await ai_response_cache.set(
+                    "quiz",
+                    cache_key,
+                    [question.model_dump(mode="json") for question in questions],
+                    time.perf_counter() - started
+                )
+            
             return questions
             
         except Exception as e:
@@ -693,6 +804,13 @@ class AIService:
             List of generated FAQ objects with question and answer
         """
         try:
+            cache_key = ai_response_cache.make_key("faq", [category_name, platform_context, num_faqs])
+            cached = await ai_response_cache.get("faq", cache_key)
+            if cached:
+                return cached
+            
+            started = time.perf_counter()
+            
             # Adaptive vs Fixed mode (following quiz pattern)
             if num_faqs is None:
                 # ADAPTIVE MODE - AI decides based on category complexity
@@ -794,6 +912,10 @@ class AIService:
             # Parse the AI response and format as FAQ objects
             faqs = self._parse_faq_response(result_data, category_name)
 
+            # Only cache real AI output (not parser fallbacks)
+            if faqs and re.search(r'\[.*\]', result_data or "", re.DOTALL):
+                await ai_response_cache.set("faq", cache_key, faqs, time.perf_counter() - started)
+
             return faqs
 
         except Exception as e:
@@ -871,19 +993,31 @@ class AIService:
         try:
             # Build context for suggestions
             context_info = []
+            versions: Dict[str, str] = {}
             
             if course_id:
                 course_context = await self._get_course_context(course_id)
                 if course_context:
+                    versions["course"] = course_context["version"]
                     context_info.append(f"Course: {course_context['title']} ({course_context['level']} level)")
             
             if lesson_id:
                 lesson_context = await self._get_lesson_context(lesson_id)
                 if lesson_context:
+                    versions["lesson"] = lesson_context["version"]
                     context_info.append(f"Current lesson: {lesson_context['title']}")
                     if lesson_context.get('description'):
                         context_info.append(f"Lesson focus: {lesson_context['description']}")
             
+            cache_key = ai_response_cache.make_key(
+                "suggestions", [versions.get("course"), versions.get("lesson"), user_level]
+            )
+            cached = await ai_response_cache.get("suggestions", cache_key)
+            if cached:
+                return cached
+            
+            started = time.perf_counter()
+            
             # Create prompt for generating suggestions
             context_str = "\n".join(context_info) if context_info else "General programming/AI learning"
             user_level_str = user_level or "intermediate"
@@ -937,9 +1071,11 @@ class AIService:
             
             # Fallback to default suggestions if AI fails
             if not suggestions:
-                suggestions = self._get_default_suggestions(course_id, lesson_id, user_level)
+                return self._get_default_suggestions(course_id, lesson_id, user_level)
             
-            return suggestions[:4]  # Return max 4 suggestions
+            suggestions = suggestions[:4]  # Return max 4 suggestions
+            await ai_response_cache.set("suggestions", cache_key, suggestions, time.perf_counter() - started)
+            return suggestions
             
         except Exception as e:
             logger.error(f"Error generating contextual suggestions: {str(e)}")
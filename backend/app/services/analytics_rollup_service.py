@@ -0,0 +1,277 @@
+"""
+Analytics rollup service.
+Keeps pre-aggregated per-course, per-day counters (enrollments, completions,
+revenue, watch time, quiz attempts) so analytics charts read one small range
+scan instead of querying raw collections day by day.
+
+Counters are maintained incrementally from the enrollment, progress, quiz and
+payment write paths (buffered in process, flushed with one bulk write) and can
+be rebuilt from the raw collections with `rebuild`.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import asyncio
+import time
+import logging
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = (
+    "enrollments",
+    "completions",
+    "revenue",
+    "watch_time_seconds",
+    "lessons_completed",
+    "quiz_attempts",
+    "quizzes_passed"
+)
+
+
+def _day_start(value: datetime) -> datetime:
+    """UTC midnight of the given timestamp (naive values are treated as UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class AnalyticsRollupService:
+    """Service for per-course daily analytics counters"""
+
+    COLLECTION = "analytics_daily_rollups"
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, datetime], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._last_flush = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+    async def record(self, course_id: Any, when: Optional[datetime] = None, **increments: float) -> None:
+        """
+        Add increments to a course's bucket for the day of `when`.
+        Never raises - analytics must not break the write path.
+        """
+        try:
+            unknown = set(increments) - set(ROLLUP_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown rollup fields: {unknown}")
+
+            bucket = self._pending[(str(course_id), _day_start(when or datetime.now(timezone.utc)))]
+            for field, amount in increments.items():
+                bucket[field] += amount
+
+            if time.monotonic() - self._last_flush >= settings.ANALYTICS_ROLLUP_FLUSH_INTERVAL:
+                self._schedule_flush()
+        except Exception as e:
+            logger.error(f"Failed to record analytics rollup for course {course_id}: {e}")
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Write buffered increments with one bulk upsert. Returns buckets written."""
+        async with self._flush_lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(float))
+            try:
+                await self._apply_increments(pending)
+            except Exception as e:
+                # Put increments back so the next flush retries them
+                for key, bucket in pending.items():
+                    for field, amount in bucket.items():
+                        self._pending[key][field] += amount
+                logger.error(f"Analytics rollup flush failed: {e}")
+                return 0
+
+            return len(pending)
+
+    def start(self) -> None:
+        """Start periodic flushing, so quiet workers don't hold increments"""
+        if self._scheduler_task is None:
+            self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write what is left"""
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+        await self.flush()
+
+    async def _run_scheduler(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ANALYTICS_ROLLUP_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Analytics rollup flush error: {e}")
+
+    async def _apply_increments(self, buckets: Dict[Tuple[str, datetime], Dict[str, float]]) -> None:
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"_id": f"{course_id}:{day.strftime('%Y-%m-%d')}"},
+                {
+                    "$inc": dict(bucket),
+                    "$setOnInsert": {"course_id": course_id, "date": day},
+                    "$set": {"updated_at": now}
+                },
+                upsert=True
+            )
+            for (course_id, day), bucket in buckets.items()
+            if bucket
+        ]
+        if operations:
+            db = get_database()
+            await db[self.COLLECTION].bulk_write(operations, ordered=False)
+
+    async def get_daily_series(
+        self,
+        course_ids: Iterable[Any],
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Dict[str, Any]]:
+        """Per-day totals across the given courses, one entry per day (zeros filled)"""
+        await self.flush()
+
+        first_day = _day_start(start_date)
+        last_day = _day_start(end_date)
+
+        db = get_database()
+        rows = await db[self.COLLECTION].aggregate([
+            {"$match": {
+                "course_id": {"$in": [str(course_id) for course_id in course_ids]},
+                "date": {"$gte": first_day, "$lte": last_day}
+            }},
+            {"$group": {
+                "_id": "$date",
+                **{field: {"$sum": f"${field}"} for field in ROLLUP_FIELDS}
+            }}
+        ]).to_list(None)
+        by_day = {row["_id"]: row for row in rows}
+
+        series = []
+        day = first_day
+        while day <= last_day:
+            row = by_day.get(day, {})
+            series.append({"date": day, **{field: row.get(field, 0) for field in ROLLUP_FIELDS}})
+            day += timedelta(days=1)
+        return series
+
+    async def rebuild(
+        self,
+        course_ids: Optional[List[str]] = None,
+        since: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Rebuild rollups from raw collections (backfill / repair).
+        Optionally limited to some courses and to days from `since`.
+
+        Watch time is only rebuilt by full rebuilds: progress records keep a
+        lifetime total, which can't be split by day, so partial rebuilds leave
+        watch_time_seconds as counted live.
+        """
+        await self.flush()
+        db = get_database()
+
+        since_day = _day_start(since) if since else None
+        course_filter = [str(course_id) for course_id in course_ids] if course_ids else None
+
+        def match(date_field: str, extra: Optional[Dict] = None) -> Dict:
+            condition: Dict[str, Any] = {date_field: {"$gte": since_day} if since_day else {"$type": "date"}}
+            if course_filter:
+                condition["$expr"] = {"$in": [{"$toString": "$course_id"}, course_filter]}
+            return {"$match": {**condition, **(extra or {})}}
+
+        def group(date_field: str, values: Dict[str, Any]) -> Dict:
+            return {"$group": {
+                "_id": {
+                    "course_id": {"$toString": "$course_id"},
+                    "day": {"$dateFromString": {"dateString": {
+                        "$dateToString": {"format": "%Y-%m-%d", "date": f"${date_field}"}
+                    }}}
+                },
+                **values
+            }}
+
+        sources = [
+            (db.enrollments, [
+                match("enrolled_at"),
+                group("enrolled_at", {"enrollments": {"$sum": 1}})
+            ]),
+            (db.enrollments, [
+                match("progress.completed_at"),
+                group("progress.completed_at", {"completions": {"$sum": 1}})
+            ]),
+            (db.payments, [
+                match("created_at", {"status": "completed", "course_id": {"$ne": None}}),
+                group("created_at", {"revenue": {"$sum": "$amount"}})
+            ]),
+            (db.progress, [
+                match("video_progress.completed_at"),
+                group("video_progress.completed_at", {"lessons_completed": {"$sum": 1}})
+            ]),
+            (db.quiz_progress, [
+                match("completed_at", {"is_completed": True}),
+                group("completed_at", {
+                    "quiz_attempts": {"$sum": 1},
+                    "quizzes_passed": {"$sum": {"$cond": ["$passed", 1, 0]}}
+                })
+            ])
+        ]
+        if not since_day:
+            # Lifetime watch time lands on the last access day
+            sources.append((db.progress, [
+                match("last_accessed"),
+                group("last_accessed", {"watch_time_seconds": {"$sum": "$video_progress.total_watch_time"}})
+            ]))
+
+        buckets: Dict[Tuple[str, datetime], Dict[str, float]] = defaultdict(dict)
+        for collection, pipeline in sources:
+            async for row in collection.aggregate(pipeline):
+                key = (row["_id"]["course_id"], row["_id"]["day"])
+                for field, value in row.items():
+                    if field != "_id":
+                        buckets[key][field] = value
+
+        # Replace existing buckets in the rebuilt range
+        delete_filter: Dict[str, Any] = {}
+        if since_day:
+            delete_filter["date"] = {"$gte": since_day}
+        if course_filter:
+            delete_filter["course_id"] = {"$in": course_filter}
+        if since_day:
+            # Reset everything but the live watch time counter
+            reset = await db[self.COLLECTION].update_many(delete_filter, {"$set": {
+                field: 0 for field in ROLLUP_FIELDS if field != "watch_time_seconds"
+            }})
+            replaced = reset.modified_count
+        else:
+            deleted = await db[self.COLLECTION].delete_many(delete_filter)
+            replaced = deleted.deleted_count
+
+        await self._apply_increments(buckets)
+
+        logger.info(
+            f"Analytics rollups rebuilt: {len(buckets)} buckets written, "
+            f"{replaced} replaced"
+        )
+        return {"buckets": len(buckets), "replaced": replaced}
+
+
+# Create service instance
+analytics_rollup_service = AnalyticsRollupService()
@@ -1,12 +1,13 @@
 """
 Analytics service for course and creator metrics.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from app.core.database import db
+from app.core.database import db, get_database
 from app.models.course import CourseStatus
+from app.services.analytics_rollup_service import analytics_rollup_service
 from app.schemas.analytics import (
     CreatorAnalytics,
     CourseAnalytics,
@@ -17,6 +18,14 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Roster sort keys exposed to the API (field in the grouped roster document)
+ROSTER_SORT_FIELDS = {
+    "progress": "average_progress",
+    "last_activity": "last_activity",
+    "courses": "courses_enrolled",
+    "completed": "courses_completed"
+}
+
 
 class AnalyticsService:
     """Service for analytics operations."""
@@ -37,6 +46,145 @@ class AnalyticsService:
             
         return start_date, end_date
     
+    @staticmethod
+    def _roster_pipeline(course_ids: List[str]) -> List[Dict[str, Any]]:
+        """Enrollments of the given courses grouped into one document per student"""
+        return [
+            {"$match": {"course_id": {"$in": course_ids}}},
+            {"$group": {
+                "_id": "$user_id",
+                "courses_enrolled": {"$sum": 1},
+                "courses_completed": {"$sum": {"$cond": ["$progress.is_completed", 1, 0]}},
+                "average_progress": {"$avg": {"$ifNull": ["$progress.completion_percentage", 0]}},
+                "last_activity": {"$max": {"$ifNull": ["$progress.last_accessed", "$enrolled_at"]}},
+                "courses": {"$push": {
+                    "course_id": "$course_id",
+                    "progress": {"$ifNull": ["$progress.completion_percentage", 0]},
+                    "enrolled_at": "$enrolled_at"
+                }}
+            }}
+        ]
+    
+    @staticmethod
+    def _student_lookup() -> List[Dict[str, Any]]:
+        """Join the student's user document (user_id is stored as a string)"""
+        return [
+            {"$addFields": {"user_oid": {"$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}}}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "user_oid",
+                "foreignField": "_id",
+                "as": "student"
+            }},
+            {"$unwind": "$student"},
+            {"$project": {
+                "courses_enrolled": 1,
+                "courses_completed": 1,
+                "average_progress": 1,
+                "last_activity": 1,
+                "courses": 1,
+                "student.name": 1,
+                "student.email": 1,
+                "student.created_at": 1
+            }}
+        ]
+    
+    @staticmethod
+    def _format_roster_entry(row: Dict[str, Any], course_titles: Dict[str, str]) -> Dict[str, Any]:
+        student = row["student"]
+        joined_date = student.get("created_at") or datetime.utcnow()
+        last_activity = row.get("last_activity")
+        return {
+            "student": {
+                "id": row["_id"],
+                "name": student.get("name", "Unknown"),
+                "email": student.get("email", ""),
+                "joined_date": joined_date.isoformat()
+            },
+            "metrics": {
+                "courses_enrolled": row["courses_enrolled"],
+                "courses_completed": row["courses_completed"],
+                "average_progress": round(row.get("average_progress") or 0, 1),
+                "last_activity": last_activity.isoformat() if last_activity else None
+            },
+            "courses": [
+                {
+                    "course_id": course["course_id"],
+                    "course_title": course_titles.get(course["course_id"], "Unknown"),
+                    "progress": course["progress"],
+                    "enrolled_at": course["enrolled_at"].isoformat() if course.get("enrolled_at") else None
+                }
+                for course in row["courses"]
+            ]
+        }
+    
+    @staticmethod
+    async def _creator_course_titles(creator_id: str) -> Dict[str, str]:
+        courses = await get_database().courses.find(
+            {"creator_id": ObjectId(creator_id)},
+            {"title": 1}
+        ).to_list(None)
+        return {str(course["_id"]): course.get("title", "Unknown") for course in courses}
+    
+    @staticmethod
+    async def get_creator_student_roster(
+        creator_id: str,
+        limit: int = 20,
+        offset: int = 0,
+        sort_by: str = "progress"
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        One page of a creator's students with per-student progress metrics.
+        Grouping, sorting and pagination run in MongoDB; only the page is joined
+        with user documents. Returns (students, total distinct students).
+        """
+        course_titles = await AnalyticsService._creator_course_titles(creator_id)
+        if not course_titles:
+            return [], 0
+        
+        sort_field = ROSTER_SORT_FIELDS.get(sort_by, ROSTER_SORT_FIELDS["progress"])
+        pipeline = AnalyticsService._roster_pipeline(list(course_titles)) + [
+            {"$facet": {
+                "students": [
+                    {"$sort": {sort_field: -1, "_id": 1}},
+                    {"$skip": offset},
+                    {"$limit": limit},
+                    *AnalyticsService._student_lookup()
+                ],
+                "total": [{"$count": "count"}]
+            }}
+        ]
+        
+        results = await get_database().enrollments.aggregate(pipeline, allowDiskUse=True).to_list(1)
+        result = results[0] if results else {}
+        total = result["total"][0]["count"] if result.get("total") else 0
+        
+        students = [
+            AnalyticsService._format_roster_entry(row, course_titles)
+            for row in result.get("students", [])
+        ]
+        return students, total
+    
+    @staticmethod
+    async def iter_creator_student_roster(
+        creator_id: str,
+        sort_by: str = "progress"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the full roster from a cursor (CSV export) without buffering it"""
+        course_titles = await AnalyticsService._creator_course_titles(creator_id)
+        if not course_titles:
+            return
+        
+        sort_field = ROSTER_SORT_FIELDS.get(sort_by, ROSTER_SORT_FIELDS["progress"])
+        pipeline = AnalyticsService._roster_pipeline(list(course_titles)) + [
+            {"$sort": {sort_field: -1, "_id": 1}},
+            *AnalyticsService._student_lookup()
+        ]
+        
+        cursor = get_database().enrollments.aggregate(pipeline, allowDiskUse=True, batchSize=500)
+        async for row in cursor:
+            yield AnalyticsService._format_roster_entry(row, course_titles)
+    
     @staticmethod
     async def get_creator_analytics(creator_id: str, time_range: str) -> CreatorAnalytics:
         """Get comprehensive analytics for a content creator."""
@@ -149,45 +297,19 @@ class AnalyticsService:
             ]).to_list(1)
             quizzes_passed = quiz_stats[0]["quizzes_passed"] if quiz_stats else 0
             
-            # Daily stats for charts
-            daily_stats = []
-            current_date = start_date
-            while current_date <= end_date:
-                next_date = current_date + timedelta(days=1)
-                
-                # Get stats for this day
-                day_enrollments = await db.enrollments.count_documents({
-                    "course_id": {"$in": course_ids},
-                    "enrolled_at": {"$gte": current_date, "$lt": next_date}
-                })
-                
-                day_completions = await db.enrollments.count_documents({
-                    "course_id": {"$in": course_ids},
-                    "progress.completed_at": {"$gte": current_date, "$lt": next_date}
-                })
-                
-                day_revenue_result = await db.payments.aggregate([
-                    {
-                        "$match": {
-                            "course_id": {"$in": course_ids},
-                            "status": "completed",
-                            "created_at": {"$gte": current_date, "$lt": next_date}
-                        }
-                    },
-                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-                ]).to_list(1)
-                day_revenue = day_revenue_result[0]["total"] if day_revenue_result else 0
-                
-                daily_stats.append(DailyStats(
-                    date=current_date,
-                    enrollments=day_enrollments,
-                    completions=day_completions,
-                    revenue=day_revenue,
-                    watch_time_minutes=0,  # Could be calculated if needed
-                    active_students=0  # Could be calculated if needed
-                ))
-                
-                current_date = next_date
+            # Daily stats for charts (served from the daily rollup store)
+            series = await analytics_rollup_service.get_daily_series(course_ids, start_date, end_date)
+            daily_stats = [
+                DailyStats(
+                    date=day["date"],
+                    enrollments=int(day["enrollments"]),
+                    completions=int(day["completions"]),
+                    revenue=day["revenue"],
+                    watch_time_minutes=int(day["watch_time_seconds"] // 60),
+                    active_students=0
+                )
+                for day in series
+            ]
             
             return CreatorAnalytics(
                 total_courses=len(courses),
@@ -333,44 +455,19 @@ class AnalyticsService:
                         "average_score": stats["avg_score"] or 0
                     })
             
-            # Daily stats
-            daily_stats = []
-            current_date = start_date
-            while current_date <= end_date:
-                next_date = current_date + timedelta(days=1)
-                
-                day_enrollments = await db.enrollments.count_documents({
-                    "course_id": course_oid,
-                    "enrolled_at": {"$gte": current_date, "$lt": next_date}
-                })
-                
-                day_completions = await db.enrollments.count_documents({
-                    "course_id": course_oid,
-                    "progress.completed_at": {"$gte": current_date, "$lt": next_date}
-                })
-                
-                day_revenue_result = await db.payments.aggregate([
-                    {
-                        "$match": {
-                            "course_id": course_oid,
-                            "status": "completed",
-                            "created_at": {"$gte": current_date, "$lt": next_date}
-                        }
-                    },
-                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-                ]).to_list(1)
-                day_revenue = day_revenue_result[0]["total"] if day_revenue_result else 0
-                
-                daily_stats.append(DailyStats(
-                    date=current_date,
-                    enrollments=day_enrollments,
-                    completions=day_completions,
-                    revenue=day_revenue,
-                    watch_time_minutes=0,
+            # Daily stats (served from the daily rollup store)
+            series = await analytics_rollup_service.get_daily_series([course_id], start_date, end_date)
+            daily_stats = [
+                DailyStats(
+                    date=day["date"],
+                    enrollments=int(day["enrollments"]),
+                    completions=int(day["completions"]),
+                    revenue=day["revenue"],
+                    watch_time_minutes=int(day["watch_time_seconds"] // 60),
                     active_students=0
-                ))
-                
-                current_date = next_date
+                )
+                for day in series
+            ]
             
             return CourseAnalytics(
                 course_id=course_id,
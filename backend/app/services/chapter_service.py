@@ -9,6 +9,7 @@ from app.models.chapter import Chapter
 from app.models.course import Course
 from app.models.lesson import Lesson
 from app.schemas.chapter import ChapterCreate, ChapterUpdate, ChapterReorder
+from app.services.course_manifest_service import course_manifest_service
 
 
 class ChapterService:
@@ -54,6 +55,7 @@ class ChapterService:
         )
         
         await chapter.insert()
+        await course_manifest_service.invalidate(course_id)
         
         # Update course chapter count
         course.total_chapters += 1
@@ -144,6 +146,7 @@ class ChapterService:
             setattr(chapter, field, value)
         
         await chapter.save()
+        await course_manifest_service.invalidate(chapter.course_id)
         return chapter
     
     @staticmethod
@@ -190,6 +193,8 @@ class ChapterService:
             ch.order -= 1
             await ch.save()
         
+        await course_manifest_service.invalidate(chapter.course_id)
+        
         return {"message": "Chapter deleted successfully"}
     
     @staticmethod
@@ -220,6 +225,8 @@ class ChapterService:
                 chapter.order = item["order"]
                 await chapter.save()
         
+        await course_manifest_service.invalidate(course_id)
+        
         # Return updated chapters
         chapters = await Chapter.find(
             Chapter.course_id == PydanticObjectId(course_id)
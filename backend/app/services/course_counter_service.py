@@ -0,0 +1,162 @@
+"""
+Course counter service.
+Like/dislike and review counters live on the course document (`stats`) and
+are kept current with $inc from the write paths, so reads never count the
+reaction or review collections. A periodic reconciliation recomputes the
+true counts and repairs any drift (crashed requests, legacy data).
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from collections import defaultdict
+import asyncio
+import logging
+
+from app.core.atomic import AtomicUpdate, bulk_update, find_one_and_update, id_filter, update_one
+from app.core.config import settings
+from app.models.course import Course
+from app.models.course_like import CourseReaction
+from app.models.review import Review, ReviewStatus
+
+logger = logging.getLogger(__name__)
+
+# Counters owned by this service, as stored under Course.stats
+COUNTER_FIELDS = ("total_likes", "total_dislikes", "total_reviews", "rating_sum")
+
+REACTION_PROJECTION = {"stats.total_likes": 1, "stats.total_dislikes": 1}
+
+
+def _average_rating(total_reviews: int, rating_sum: float) -> float:
+    return round(rating_sum / total_reviews, 1) if total_reviews > 0 else 0
+
+
+class CourseCounterService:
+    """Incremental course like/dislike/review counters with periodic reconciliation"""
+
+    def __init__(self):
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _reaction_counts(course: Dict[str, Any]) -> Dict[str, int]:
+        stats = course.get("stats") or {}
+        return {
+            "like_count": max(0, stats.get("total_likes", 0)),
+            "dislike_count": max(0, stats.get("total_dislikes", 0))
+        }
+
+    async def apply_reaction_delta(
+        self,
+        course_id: str,
+        likes: int = 0,
+        dislikes: int = 0
+    ) -> Optional[Dict[str, int]]:
+        """Adjust like/dislike counters. Returns the new counts, or None if the course does not exist."""
+        course = await find_one_and_update(
+            Course,
+            id_filter(course_id),
+            AtomicUpdate().inc("stats.total_likes", likes).inc("stats.total_dislikes", dislikes),
+            projection=REACTION_PROJECTION
+        )
+        return self._reaction_counts(course) if course else None
+
+    async def get_reaction_counts(self, course_id: str) -> Dict[str, int]:
+        """Stored like/dislike counts"""
+        course = await Course.get_motor_collection().find_one(id_filter(course_id), REACTION_PROJECTION)
+        return self._reaction_counts(course or {})
+
+    async def apply_review_delta(self, course_id: str, reviews: int, rating: float) -> None:
+        """Adjust review count and rating sum, then the average rating derived from them"""
+        course = await find_one_and_update(
+            Course,
+            id_filter(course_id),
+            AtomicUpdate().inc("stats.total_reviews", reviews).inc("stats.rating_sum", rating),
+            projection={"stats.total_reviews": 1, "stats.rating_sum": 1}
+        )
+        if not course:
+            return
+
+        stats = course.get("stats") or {}
+        total_reviews = stats.get("total_reviews", 0)
+        rating_sum = stats.get("rating_sum", 0)
+        # Only if nobody changed the counters since - otherwise their update sets it
+        await update_one(
+            Course,
+            {"_id": course["_id"], "stats.total_reviews": total_reviews, "stats.rating_sum": rating_sum},
+            AtomicUpdate().set("stats.average_rating", _average_rating(total_reviews, rating_sum))
+        )
+
+    async def reconcile(self, course_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Recompute counters from reactions and approved reviews; repair courses that drifted"""
+        course_ids = [str(course_id) for course_id in course_ids] if course_ids is not None else None
+        match: Dict[str, Any] = {"course_id": {"$in": course_ids}} if course_ids is not None else {}
+
+        truth: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        reactions = await CourseReaction.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {"course_id": "$course_id", "reaction_type": "$reaction_type"},
+                "count": {"$sum": 1}
+            }}
+        ]).to_list(None)
+        for row in reactions:
+            field = "total_likes" if row["_id"]["reaction_type"] == "like" else "total_dislikes"
+            truth[row["_id"]["course_id"]][field] = row["count"]
+
+        reviews = await Review.aggregate([
+            {"$match": {**match, "status": ReviewStatus.APPROVED}},
+            {"$group": {"_id": "$course_id", "count": {"$sum": 1}, "rating_sum": {"$sum": "$rating"}}}
+        ]).to_list(None)
+        for row in reviews:
+            truth[row["_id"]]["total_reviews"] = row["count"]
+            truth[row["_id"]]["rating_sum"] = row["rating_sum"]
+
+        course_filter = {"_id": {"$in": [id_filter(course_id)["_id"] for course_id in course_ids]}} if course_ids is not None else {}
+        operations: List[Any] = []
+        checked = 0
+        async for course in Course.get_motor_collection().find(
+            course_filter,
+            {f"stats.{field}": 1 for field in (*COUNTER_FIELDS, "average_rating")}
+        ):
+            checked += 1
+            stats = course.get("stats") or {}
+            expected = truth.get(str(course["_id"])) or dict.fromkeys(COUNTER_FIELDS, 0)
+            average = _average_rating(expected["total_reviews"], expected["rating_sum"])
+            if all(stats.get(field) == expected[field] for field in COUNTER_FIELDS) and stats.get("average_rating") == average:
+                continue
+            operations.append(
+                AtomicUpdate()
+                .set_many({f"stats.{field}": value for field, value in expected.items()})
+                .set("stats.average_rating", average)
+                .as_operation({"_id": course["_id"]})
+            )
+
+        repaired = await bulk_update(Course, operations)
+        if repaired:
+            logger.info(f"Course counter reconciliation repaired {repaired} of {checked} courses")
+        return {"checked": checked, "repaired": repaired}
+
+    def start(self) -> None:
+        """Start periodic reconciliation (first run right away)"""
+        if settings.COURSE_COUNTER_RECONCILE_INTERVAL > 0 and self._scheduler_task is None:
+            self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self) -> None:
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+
+    async def _run_scheduler(self) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Course counter reconciliation failed: {e}")
+            await asyncio.sleep(settings.COURSE_COUNTER_RECONCILE_INTERVAL)
+
+
+# Global counter service instance
+course_counter_service = CourseCounterService()
@@ -4,9 +4,13 @@ Course Reaction service for like/dislike business logic (YouTube-style)
 from typing import Optional, Dict, Literal
 from datetime import datetime
 
-from app.models.course_like import CourseReaction
+from pymongo.errors import DuplicateKeyError
+
+from app.core.atomic import AtomicUpdate, id_filter, update_one
 from app.models.course import Course
+from app.models.course_like import CourseReaction
 from app.models.user import User
+from app.services.course_counter_service import course_counter_service
 
 
 class CourseReactionService:
@@ -19,35 +23,39 @@ class CourseReactionService:
         """Toggle reaction (like/dislike) for a course - YouTube style behavior"""
         user_id = str(user.id)
 
-        # Check if course exists
-        course = await Course.find_one({"_id": course_id})
-        if not course:
-            from beanie import PydanticObjectId
-            course = await Course.get(PydanticObjectId(course_id))
-
-        if not course:
-            raise ValueError("Course not found")
-
         # Check if user already has a reaction
         existing_reaction = await CourseReaction.find_one({
             "course_id": course_id,
             "user_id": user_id
         })
 
+        # Course counters only move once the guarded reaction write succeeded,
+        # so a double-click can't count the same change twice
+        deltas = {"like": 0, "dislike": 0}
         if existing_reaction:
             if existing_reaction.reaction_type == reaction_type:
                 # Same reaction - toggle off (remove)
-                await existing_reaction.delete()
+                result = await CourseReaction.get_motor_collection().delete_one({"_id": existing_reaction.id})
+                if result.deleted_count:
+                    deltas[reaction_type] -= 1
                 user_reaction = None
                 message = f"Reaction removed"
             else:
                 # Different reaction - switch
-                existing_reaction.reaction_type = reaction_type
-                existing_reaction.created_at = datetime.utcnow()
-                await existing_reaction.save()
+                switched = await update_one(
+                    CourseReaction,
+                    {"_id": existing_reaction.id, "reaction_type": existing_reaction.reaction_type},
+                    AtomicUpdate().set("reaction_type", reaction_type).set("created_at", datetime.utcnow())
+                )
+                if switched:
+                    deltas[existing_reaction.reaction_type] -= 1
+                    deltas[reaction_type] += 1
                 user_reaction = reaction_type
                 message = f"Changed to {reaction_type}"
         else:
+            if not await Course.get_motor_collection().find_one(id_filter(course_id), {"_id": 1}):
+                raise ValueError("Course not found")
+            
             # No existing reaction - create new
             new_reaction = CourseReaction(
                 course_id=course_id,
@@ -55,21 +63,27 @@ class CourseReactionService:
                 reaction_type=reaction_type,
                 created_at=datetime.utcnow()
             )
-            await new_reaction.insert()
+            try:
+                await new_reaction.insert()
+                deltas[reaction_type] += 1
+            except DuplicateKeyError:
+                pass  # A concurrent request created it and counted it
             user_reaction = reaction_type
             message = f"Course {reaction_type}d"
 
-        # Update course stats
-        await self._update_course_stats(course_id)
-
-        # Get updated counts
-        like_count = await self.get_reaction_count(course_id, "like")
-        dislike_count = await self.get_reaction_count(course_id, "dislike")
+        # Update course stats (also checks the course exists)
+        if deltas["like"] or deltas["dislike"]:
+            counts = await course_counter_service.apply_reaction_delta(
+                course_id, likes=deltas["like"], dislikes=deltas["dislike"]
+            )
+        else:
+            counts = await course_counter_service.get_reaction_counts(course_id)
+        if counts is None:
+            raise ValueError("Course not found")
 
         return {
             "user_reaction": user_reaction,
-            "like_count": like_count,
-            "dislike_count": dislike_count,
+            **counts,
             "message": message
         }
 
@@ -89,13 +103,12 @@ class CourseReactionService:
             if existing_reaction:
                 user_reaction = existing_reaction.reaction_type
 
-        like_count = await self.get_reaction_count(course_id, "like")
-        dislike_count = await self.get_reaction_count(course_id, "dislike")
+        # Stored counters (kept by toggle_reaction, reconciled periodically)
+        counts = await course_counter_service.get_reaction_counts(course_id)
 
         return {
             "user_reaction": user_reaction,
-            "like_count": like_count,
-            "dislike_count": dislike_count
+            **counts
         }
 
     async def get_reaction_count(
@@ -109,29 +122,6 @@ class CourseReactionService:
             "reaction_type": reaction_type
         }).count()
 
-    async def _update_course_stats(self, course_id: str) -> None:
-        """Update course stats with current like/dislike counts"""
-        from beanie import PydanticObjectId
-
-        like_count = await self.get_reaction_count(course_id, "like")
-        dislike_count = await self.get_reaction_count(course_id, "dislike")
-
-        course = await Course.find_one({"_id": course_id})
-        if not course:
-            try:
-                course = await Course.get(PydanticObjectId(course_id))
-            except:
-                pass
-
-        if course:
-            if course.stats is None:
-                from app.models.course import CourseStats
-                course.stats = CourseStats()
-
-            course.stats.total_likes = like_count
-            course.stats.total_dislikes = dislike_count
-            await course.save()
-
 
 # Singleton instance
 course_reaction_service = CourseReactionService()
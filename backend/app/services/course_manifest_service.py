@@ -0,0 +1,171 @@
+"""
+Course manifest service.
+Caches the chapter/lesson ordering of a course (ids, order, status, prev/next
+pointers) so learn/progress flows don't re-read course structure on every request.
+Invalidated by the chapter/lesson create, update, reorder and delete paths.
+"""
+from typing import Optional, List, Dict, Any, Iterable
+import time
+import logging
+
+from beanie import PydanticObjectId
+
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.models.chapter import Chapter
+from app.models.lesson import Lesson
+
+logger = logging.getLogger(__name__)
+
+# Without a shared backend other workers' invalidations are never seen,
+# so local copies may only be this stale
+UNSHARED_LOCAL_TTL = 5
+
+
+class CourseManifestService:
+    """Service for cached course structure lookups"""
+
+    def __init__(self):
+        local_ttl = settings.COURSE_MANIFEST_CACHE_TTL
+        if settings.CACHE_BACKEND != "mongo":
+            local_ttl = min(local_ttl, UNSHARED_LOCAL_TTL)
+        self.cache = TieredCache(
+            namespace="course_manifest",
+            maxsize=settings.COURSE_MANIFEST_CACHE_SIZE,
+            local_ttl=local_ttl,
+            shared_ttl=24 * 3600
+        )
+
+    async def get_manifest(self, course_id: str) -> Dict[str, Any]:
+        """Get manifest for a single course"""
+        manifests = await self.get_manifests([str(course_id)])
+        return manifests[str(course_id)]
+
+    async def get_manifests(self, course_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get manifests for many courses.
+        Local copies are checked against the shared manifest version, so a
+        structure change invalidated on any worker is picked up here too.
+        Cache misses are built together with one chapter and one lesson query.
+        """
+        course_ids = list(dict.fromkeys(str(course_id) for course_id in course_ids))
+        result = await self.cache.get_many_versioned(course_ids)
+        missing = [course_id for course_id in course_ids if course_id not in result]
+
+        if missing:
+            built = await self._build_manifests(missing)
+            for course_id, manifest in built.items():
+                await self.cache.set(course_id, manifest)
+            result.update(built)
+
+        return result
+
+    async def invalidate(self, course_id: Any) -> None:
+        """Drop cached manifest after a structure change"""
+        await self.cache.delete(str(course_id))
+        logger.debug(f"Course manifest invalidated for course {course_id}")
+
+    async def _build_manifests(self, course_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Build manifests from MongoDB (projection only, no lesson content)"""
+        course_obj_ids = []
+        for course_id in course_ids:
+            try:
+                course_obj_ids.append(PydanticObjectId(course_id))
+            except Exception:
+                continue
+
+        chapters = await Chapter.get_motor_collection().find(
+            {"course_id": {"$in": course_obj_ids}},
+            {"course_id": 1, "order": 1, "status": 1}
+        ).sort([("course_id", 1), ("order", 1)]).to_list(None)
+
+        lessons = await Lesson.get_motor_collection().find(
+            {"course_id": {"$in": course_obj_ids}},
+            {"chapter_id": 1, "order": 1, "status": 1}
+        ).sort([("chapter_id", 1), ("order", 1)]).to_list(None)
+
+        lessons_by_chapter: Dict[str, List[dict]] = {}
+        for lesson in lessons:
+            lessons_by_chapter.setdefault(str(lesson["chapter_id"]), []).append(lesson)
+
+        version = int(time.time() * 1000)
+        manifests = {
+            course_id: {"course_id": course_id, "version": version, "chapters": [], "lessons": {}}
+            for course_id in course_ids
+        }
+
+        for chapter in chapters:
+            manifest = manifests[str(chapter["course_id"])]
+            chapter_id = str(chapter["_id"])
+            chapter_lessons = lessons_by_chapter.get(chapter_id, [])
+
+            manifest["chapters"].append({
+                "id": chapter_id,
+                "order": chapter["order"],
+                "status": chapter.get("status", "draft"),
+                "lesson_ids": [str(lesson["_id"]) for lesson in chapter_lessons]
+            })
+            for lesson in chapter_lessons:
+                manifest["lessons"][str(lesson["_id"])] = {
+                    "chapter_id": chapter_id,
+                    "order": lesson["order"],
+                    "status": lesson.get("status", "draft")
+                }
+
+        # Link prev/next pointers across chapter boundaries
+        for manifest in manifests.values():
+            ordered = [
+                lesson_id
+                for chapter in manifest["chapters"]
+                for lesson_id in chapter["lesson_ids"]
+            ]
+            for index, lesson_id in enumerate(ordered):
+                manifest["lessons"][lesson_id]["prev_id"] = ordered[index - 1] if index > 0 else None
+                manifest["lessons"][lesson_id]["next_id"] = ordered[index + 1] if index + 1 < len(ordered) else None
+
+        return manifests
+
+    @staticmethod
+    def get_published_chapters(manifest: Dict[str, Any]) -> List[List[str]]:
+        """Ordered published lesson ids for each published chapter"""
+        return [
+            [
+                lesson_id for lesson_id in chapter["lesson_ids"]
+                if manifest["lessons"][lesson_id]["status"] == "published"
+            ]
+            for chapter in manifest["chapters"]
+            if chapter["status"] == "published"
+        ]
+
+    @staticmethod
+    def get_published_lesson_ids(manifest: Dict[str, Any]) -> List[str]:
+        """Ordered published lessons from published chapters"""
+        return [
+            lesson_id
+            for chapter_lesson_ids in CourseManifestService.get_published_chapters(manifest)
+            for lesson_id in chapter_lesson_ids
+        ]
+
+    @staticmethod
+    def get_last_published_lesson_id(manifest: Dict[str, Any]) -> Optional[str]:
+        """Last published lesson of the last published chapter"""
+        published_chapters = CourseManifestService.get_published_chapters(manifest)
+        if published_chapters and published_chapters[-1]:
+            return published_chapters[-1][-1]
+        return None
+
+    @staticmethod
+    def get_next_lesson_id(manifest: Dict[str, Any], lesson_id: str) -> Optional[str]:
+        """Next lesson in course order (crosses chapter boundaries)"""
+        entry = manifest["lessons"].get(str(lesson_id))
+        return entry["next_id"] if entry else None
+
+    @staticmethod
+    def get_previous_lesson_id(manifest: Dict[str, Any], lesson_id: str) -> Optional[str]:
+        """Previous lesson in course order (crosses chapter boundaries)"""
+        entry = manifest["lessons"].get(str(lesson_id))
+        return entry["prev_id"] if entry else None
+
+
+# Create service instance
+course_manifest_service = CourseManifestService()
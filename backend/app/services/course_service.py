@@ -20,6 +20,9 @@ from app.core.exceptions import (
     ValidationException
 )
 from app.core.performance import measure_performance
+from app.core.config import settings
+from app.utils.search import SearchBuilder
+from app.utils.pagination import keyset_sort, apply_cursor, paginate_results, count_documents
 from app.services.learn_service import LearnService
 import logging
 
@@ -217,9 +220,14 @@ class CourseService:
         status: Optional[Union[CourseStatus, List[CourseStatus]]] = None,
         creator_id: Optional[str] = None,
         is_free: Optional[bool] = None,
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """List courses with filters and pagination"""
+        """
+        List courses with filters and pagination.
+        Pass `cursor` (next_cursor from a previous page) for keyset paging;
+        relevance-ranked search results only support page numbers.
+        """
         # Build query
         query_conditions = []
         
@@ -250,29 +258,42 @@ class CourseService:
         if language:
             query_conditions.append(Course.language == language)
 
-        # Text search
+        # Text search (weighted text index, regex only for partial words)
+        uses_text_index = False
         if search:
-            # MongoDB text search would be better, but for now use regex
-            query_conditions.append({
-                "$or": [
-                    {"title": {"$regex": search, "$options": "i"}},
-                    {"description": {"$regex": search, "$options": "i"}}
-                ]
-            })
+            search_filter, uses_text_index = await SearchBuilder.build_search_filter(
+                Course.get_motor_collection(),
+                search,
+                SearchBuilder.get_courses_search_config(),
+                base_filter=Course.find(*query_conditions).get_filter_query(),
+                allow_fallback=settings.SEARCH_REGEX_FALLBACK
+            )
+            query_conditions.append(search_filter)
         
         # Execute query with pagination
-        skip = (page - 1) * per_page
-        
-        if query_conditions:
-            query = Course.find(*query_conditions)
+        sort = keyset_sort([("created_at", -1)])
+        if uses_text_index:
+            cursor = None
+        
+        # Get total count (cached across cursor pages)
+        filter_query = Course.find(*query_conditions).get_filter_query()
+        total = await count_documents(Course.get_motor_collection(), filter_query, cached=bool(cursor))
+        
+        # Get paginated results (most relevant first when searching)
+        query = Course.find(apply_cursor(filter_query, sort, cursor))
+        if uses_text_index:
+            query = query.sort([("score", {"$meta": "textScore"}), ("created_at", -1)])
         else:
-            query = Course.find()
-        
-        # Get total count
-        total = await query.count()
-        
-        # Get paginated results
-        courses = await query.skip(skip).limit(per_page).sort("-created_at").to_list()
+            query = query.sort(sort)
+        if not cursor:
+            query = query.skip((page - 1) * per_page)
+        courses = await query.limit(per_page + 1).to_list()
+        
+        next_cursor = None
+        if uses_text_index:
+            courses = courses[:per_page]
+        else:
+            courses, next_cursor = paginate_results(courses, per_page, sort)
         
         # Calculate pagination info
         total_pages = (total + per_page - 1) // per_page
@@ -282,7 +303,8 @@ class CourseService:
             "total": total,
             "page": page,
             "per_page": per_page,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor
         }
     
     @staticmethod
@@ -386,29 +408,39 @@ class CourseService:
     async def batch_check_course_access(courses: List[Course], user: Optional[User] = None) -> Dict[str, Dict[str, Any]]:
         """
         Check access for multiple courses at once to avoid N+1 queries.
+        Uses one $in enrollment query plus LearnService.get_smart_continue_lesson_ids,
+        so the query count stays constant regardless of page size.
         Returns a dictionary mapping course_id to access info.
         """
         result = {}
         
-        for course in courses:
-            # If no user, return basic access info based on pricing
-            if not user:
+        # If no user, return basic access info based on pricing
+        if not user:
+            for course in courses:
                 result[str(course.id)] = {
                     "has_access": course.pricing.is_free,
                     "is_enrolled": False,
                     "progress_percentage": 0,
                     "continue_lesson_id": None
                 }
-                continue
+            return result
+        
+        user_id = str(user.id)
+        
+        # One query for all active enrollments on this page
+        enrollments = await Enrollment.find({
+            "user_id": user_id,
+            "course_id": {"$in": [str(course.id) for course in courses]},
+            "is_active": True
+        }).to_list() if courses else []
+        enrollment_map = {enrollment.course_id: enrollment for enrollment in enrollments}
+        
+        for course in courses:
+            enrollment = enrollment_map.get(str(course.id))
             
             # Check various access conditions
             if course.pricing.is_free:
                 # Free course - check actual enrollment
-                enrollment = await Enrollment.find_one({
-                    "user_id": str(user.id),
-                    "course_id": str(course.id),
-                    "is_active": True
-                })
                 access_info = {
                     "has_access": True,
                     "is_enrolled": enrollment is not None
@@ -416,7 +448,7 @@ class CourseService:
             elif user.premium_status:
                 # Premium user has access to all courses
                 access_info = {"has_access": True, "is_enrolled": True}
-            elif str(course.creator_id) == str(user.id):
+            elif str(course.creator_id) == user_id:
                 # Creator has access to their own course
                 access_info = {"has_access": True, "is_enrolled": True}
             elif user.role == "admin":
@@ -425,30 +457,32 @@ class CourseService:
             elif user.subscription and hasattr(user.subscription, 'type') and user.subscription.type == "pro":
                 # Pro subscription
                 access_info = {"has_access": True, "is_enrolled": True}
+            elif enrollment:
+                access_info = {"has_access": True, "is_enrolled": True}
             else:
-                # Check if user has enrollment for this course
-                enrollment = await Enrollment.find_one({
-                    "user_id": str(user.id),
-                    "course_id": str(course.id),
-                    "is_active": True
-                })
-                
-                if enrollment:
-                    access_info = {"has_access": True, "is_enrolled": True}
-                else:
-                    access_info = {"has_access": False, "is_enrolled": False}
+                access_info = {"has_access": False, "is_enrolled": False}
             
-            # Add progress info if enrolled
-            if access_info.get("is_enrolled"):
-                progress_info = await CourseService.get_course_progress_info(str(course.id), str(user.id))
-                access_info.update(progress_info)
+            result[str(course.id)] = access_info
+        
+        # Progress info only exists for courses with an actual enrollment
+        enrolled = [
+            enrollment for course_id, enrollment in enrollment_map.items()
+            if result.get(course_id, {}).get("is_enrolled")
+        ]
+        continue_lesson_ids = await LearnService.get_smart_continue_lesson_ids(enrolled, user_id)
+        
+        for course_id, access_info in result.items():
+            enrollment = enrollment_map.get(course_id)
+            if access_info.get("is_enrolled") and enrollment:
+                access_info.update({
+                    "progress_percentage": enrollment.progress.completion_percentage if enrollment.progress else 0,
+                    "continue_lesson_id": continue_lesson_ids.get(course_id)
+                })
             else:
                 access_info.update({
                     "progress_percentage": 0,
                     "continue_lesson_id": None
                 })
-            
-            result[str(course.id)] = access_info
         
         return result
     
@@ -515,6 +549,9 @@ class CourseService:
         
         # 5. Finally, delete the course itself
         await course.delete()
+        
+        from app.services.course_manifest_service import course_manifest_service
+        await course_manifest_service.invalidate(course.id)
         logger.info(f"✅ DELETE COURSE: Successfully deleted course {course_id} and all related data")
         
         return {"message": "Course and all related content deleted successfully"}
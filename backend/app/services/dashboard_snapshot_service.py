@@ -0,0 +1,371 @@
+"""
+Admin dashboard snapshot service.
+Computes platform counters with one $facet/$group pass per collection (run
+concurrently) and serves the last snapshot, so dashboard latency doesn't grow
+with collection size. Snapshots are shared across instances via MongoDB.
+"""
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.models.course import CourseStatus
+from app.models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSnapshotService:
+    """Service for precomputed admin dashboard counters"""
+
+    COLLECTION = "dashboard_snapshots"
+    SNAPSHOT_ID = "admin_dashboard"
+
+    def __init__(self):
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+    async def get_snapshot(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Get the latest snapshot as {"data", "computed_at", "age_seconds"}.
+        Stale snapshots are served while a background refresh runs;
+        refresh=True recomputes before returning.
+        """
+        if refresh:
+            return self._with_age(await self.refresh())
+
+        snapshot = self._snapshot
+        if snapshot is None or self._age(snapshot) > settings.DASHBOARD_SNAPSHOT_TTL:
+            shared = await self._load_shared()
+            if shared and (snapshot is None or shared["computed_at"] > snapshot["computed_at"]):
+                self._snapshot = snapshot = shared
+
+        if snapshot is None:
+            snapshot = await self.refresh()
+        elif self._age(snapshot) > settings.DASHBOARD_SNAPSHOT_TTL:
+            self._schedule_refresh()
+
+        return self._with_age(snapshot)
+
+    async def get_data(self, refresh: bool = False) -> Dict[str, Any]:
+        """Get snapshot data only"""
+        return (await self.get_snapshot(refresh))["data"]
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot (concurrent callers share one computation)"""
+        requested_at = datetime.now(timezone.utc)
+        async with self._lock:
+            if self._snapshot and self._snapshot["computed_at"] >= requested_at:
+                return self._snapshot
+
+            start_time = datetime.now(timezone.utc)
+            data = await self._compute()
+            snapshot = {"data": data, "computed_at": datetime.now(timezone.utc)}
+            self._snapshot = snapshot
+            await self._save_shared(snapshot)
+
+            logger.debug(
+                f"Dashboard snapshot refreshed in "
+                f"{(snapshot['computed_at'] - start_time).total_seconds():.2f}s"
+            )
+            return snapshot
+
+    async def invalidate(self) -> None:
+        """Force the next read to recompute (after admin course status changes)"""
+        self._snapshot = None
+        try:
+            db = get_database()
+            await db[self.COLLECTION].delete_one({"_id": self.SNAPSHOT_ID})
+        except Exception as e:
+            logger.warning(f"Failed to invalidate shared dashboard snapshot: {e}")
+
+    def start(self) -> None:
+        """Start periodic refresh when DASHBOARD_SNAPSHOT_REFRESH_INTERVAL is set"""
+        if settings.DASHBOARD_SNAPSHOT_REFRESH_INTERVAL > 0 and self._scheduler_task is None:
+            self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self) -> None:
+        """Stop periodic refresh"""
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+
+    async def _run_scheduler(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Scheduled dashboard snapshot refresh failed: {e}")
+            await asyncio.sleep(settings.DASHBOARD_SNAPSHOT_REFRESH_INTERVAL)
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task and not self._refresh_task.done():
+            return
+
+        async def _refresh():
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Background dashboard snapshot refresh failed: {e}")
+
+        self._refresh_task = asyncio.create_task(_refresh())
+
+    @staticmethod
+    def _age(snapshot: Dict[str, Any]) -> float:
+        return (datetime.now(timezone.utc) - snapshot["computed_at"]).total_seconds()
+
+    def _with_age(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        return {**snapshot, "age_seconds": round(self._age(snapshot), 1)}
+
+    async def _load_shared(self) -> Optional[Dict[str, Any]]:
+        try:
+            db = get_database()
+            doc = await db[self.COLLECTION].find_one({"_id": self.SNAPSHOT_ID})
+        except Exception as e:
+            logger.warning(f"Failed to load shared dashboard snapshot: {e}")
+            return None
+
+        if not doc:
+            return None
+
+        computed_at = doc["computed_at"]
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        return {"data": doc["data"], "computed_at": computed_at}
+
+    async def _save_shared(self, snapshot: Dict[str, Any]) -> None:
+        try:
+            db = get_database()
+            await db[self.COLLECTION].replace_one(
+                {"_id": self.SNAPSHOT_ID},
+                {"data": snapshot["data"], "computed_at": snapshot["computed_at"]},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store shared dashboard snapshot: {e}")
+
+    @staticmethod
+    def _count_since(field: str, since: datetime) -> Dict[str, Any]:
+        return {"$sum": {"$cond": [{"$gte": [field, since]}, 1, 0]}}
+
+    @staticmethod
+    def _count_if(condition: Dict[str, Any]) -> Dict[str, Any]:
+        return {"$sum": {"$cond": [condition, 1, 0]}}
+
+    async def _compute(self) -> Dict[str, Any]:
+        """Run one single-pass aggregation per collection, concurrently"""
+        db = get_database()
+
+        now = datetime.now(timezone.utc)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = now - timedelta(days=now.weekday())
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        one_hour_ago = now - timedelta(hours=1)
+        seven_days_ago = now - timedelta(days=7)
+        thirty_days_ago = now - timedelta(days=30)
+
+        users_pipeline = [
+            {"$facet": {
+                "by_role": [
+                    {"$group": {"_id": "$role", "count": {"$sum": 1}}}
+                ],
+                "counters": [
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "new_today": self._count_since("$created_at", today_start),
+                        "new_this_week": self._count_since("$created_at", week_start),
+                        "active_today": self._count_since("$stats.last_active", today_start),
+                        "active_this_week": self._count_since("$stats.last_active", week_start),
+                        "active_7d": self._count_since("$stats.last_active", seven_days_ago),
+                        "active_last_hour": self._count_since("$stats.last_active", one_hour_ago),
+                        "premium": self._count_if({"$eq": ["$premium_status", True]}),
+                        "pro_subscribers": self._count_if({"$and": [
+                            {"$eq": ["$subscription.status", "active"]},
+                            {"$eq": ["$subscription.type", "pro"]}
+                        ]})
+                    }}
+                ],
+                "growth_30d": [
+                    {"$match": {"created_at": {"$gte": thirty_days_ago}}},
+                    {"$group": {
+                        "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                        "count": {"$sum": 1}
+                    }},
+                    {"$sort": {"_id": 1}}
+                ]
+            }}
+        ]
+
+        courses_pipeline = [
+            {"$facet": {
+                "by_status": [
+                    {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                ],
+                "counters": [
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "free": self._count_if({"$eq": ["$pricing.is_free", True]}),
+                        "average_paid_price": {"$avg": {"$cond": [
+                            {"$and": [
+                                {"$eq": ["$pricing.is_free", False]},
+                                {"$eq": ["$status", CourseStatus.PUBLISHED]}
+                            ]},
+                            "$pricing.price",
+                            None
+                        ]}}
+                    }}
+                ]
+            }}
+        ]
+
+        enrollments_pipeline = [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "active": self._count_if({"$eq": ["$is_active", True]}),
+                "completed": self._count_if({"$eq": ["$progress.is_completed", True]})
+            }}
+        ]
+
+        revenue_pipeline = [
+            {"$match": {"status": "completed", "type": {"$ne": "refund"}}},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": "$amount"},
+                "this_month": {"$sum": {"$cond": [{"$gte": ["$created_at", month_start]}, "$amount", 0]}},
+                "today": {"$sum": {"$cond": [{"$gte": ["$created_at", today_start]}, "$amount", 0]}}
+            }}
+        ]
+
+        recent_enrollments_pipeline = [
+            {"$sort": {"enrolled_at": -1}},
+            {"$limit": 5},
+            {"$lookup": {
+                "from": "users",
+                "localField": "user_id",
+                "foreignField": "_id",
+                "as": "user"
+            }},
+            {"$lookup": {
+                "from": "courses",
+                "localField": "course_id",
+                "foreignField": "_id",
+                "as": "course"
+            }},
+            {"$project": {
+                "user_name": {"$arrayElemAt": ["$user.name", 0]},
+                "course_title": {"$arrayElemAt": ["$course.title", 0]},
+                "enrolled_at": 1
+            }}
+        ]
+
+        (
+            users_result,
+            courses_result,
+            enrollments_result,
+            revenue_result,
+            lessons_completed_today,
+            recent_registrations,
+            recent_course_submissions,
+            recent_enrollments
+        ) = await asyncio.gather(
+            db.users.aggregate(users_pipeline).to_list(1),
+            db.courses.aggregate(courses_pipeline).to_list(1),
+            db.enrollments.aggregate(enrollments_pipeline).to_list(1),
+            db.payments.aggregate(revenue_pipeline).to_list(1),
+            db.progress.count_documents({"video_progress.completed_at": {"$gte": today_start}}),
+            db.users.find(
+                {},
+                {"name": 1, "email": 1, "created_at": 1, "role": 1}
+            ).sort("created_at", -1).limit(5).to_list(5),
+            db.courses.find(
+                {"status": CourseStatus.REVIEW},
+                {"title": 1, "creator_name": 1, "created_at": 1}
+            ).sort("created_at", -1).limit(5).to_list(5),
+            db.enrollments.aggregate(recent_enrollments_pipeline).to_list(5)
+        )
+
+        users = users_result[0] if users_result else {}
+        user_counters = (users.get("counters") or [{}])[0]
+        users_by_role = users.get("by_role", [])
+        role_counts = {role["_id"]: role["count"] for role in users_by_role}
+
+        courses = courses_result[0] if courses_result else {}
+        course_counters = (courses.get("counters") or [{}])[0]
+        status_counts = {status["_id"]: status["count"] for status in courses.get("by_status", [])}
+
+        enrollments = enrollments_result[0] if enrollments_result else {}
+        revenue = revenue_result[0] if revenue_result else {}
+
+        # Convert ObjectIds to strings
+        for item in (*recent_registrations, *recent_course_submissions, *recent_enrollments):
+            item["id"] = str(item.pop("_id"))
+
+        total_users = user_counters.get("total", 0)
+        total_courses = course_counters.get("total", 0)
+        total_enrollments = enrollments.get("total", 0)
+
+        return {
+            "dashboard": {
+                "total_users": total_users,
+                "total_students": role_counts.get(UserRole.STUDENT, 0),
+                "total_creators": role_counts.get(UserRole.CREATOR, 0),
+                "total_admins": role_counts.get(UserRole.ADMIN, 0),
+                "new_users_today": user_counters.get("new_today", 0),
+                "new_users_this_week": user_counters.get("new_this_week", 0),
+                "total_courses": total_courses,
+                "published_courses": status_counts.get(CourseStatus.PUBLISHED, 0),
+                "draft_courses": status_counts.get(CourseStatus.DRAFT, 0),
+                "pending_review_courses": status_counts.get(CourseStatus.REVIEW, 0),
+                "archived_courses": status_counts.get(CourseStatus.ARCHIVED, 0),
+                "coming_soon_courses": status_counts.get(CourseStatus.COMING_SOON, 0),
+                "total_enrollments": total_enrollments,
+                "active_enrollments": enrollments.get("active", 0),
+                "completed_courses": enrollments.get("completed", 0),
+                "total_revenue": revenue.get("total", 0.0),
+                "revenue_this_month": revenue.get("this_month", 0.0),
+                "revenue_today": revenue.get("today", 0.0),
+                "average_course_price": course_counters.get("average_paid_price") or 0.0,
+                "active_users_today": user_counters.get("active_today", 0),
+                "active_users_this_week": user_counters.get("active_this_week", 0),
+                "lessons_completed_today": lessons_completed_today,
+                "recent_registrations": recent_registrations,
+                "recent_course_submissions": recent_course_submissions,
+                "recent_enrollments": recent_enrollments
+            },
+            "user_analytics": {
+                "total_users": total_users,
+                "users_by_role": users_by_role,
+                "user_growth": users.get("growth_30d", []),
+                "active_users_7d": user_counters.get("active_7d", 0),
+                "premium_users": user_counters.get("premium", 0),
+                "pro_subscribers": user_counters.get("pro_subscribers", 0)
+            },
+            "course_statistics": {
+                "total_courses": total_courses,
+                "pending_review": status_counts.get("review", 0),
+                "published": status_counts.get("published", 0),
+                "rejected": status_counts.get("rejected", 0),
+                "free_courses": course_counters.get("free", 0)
+            },
+            "system": {
+                "active_sessions": user_counters.get("active_last_hour", 0),
+                "total_users": total_users,
+                "total_courses": total_courses,
+                "total_enrollments": total_enrollments
+            }
+        }
+
+
+# Create service instance
+dashboard_snapshot_service = DashboardSnapshotService()
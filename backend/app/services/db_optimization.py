@@ -15,6 +15,7 @@ from app.models.course import Course
 from app.models.user import User
 from app.models.enrollment import Enrollment
 from app.models.progress import Progress
+from app.utils.search import SearchOptimizer
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +70,11 @@ class DatabaseOptimizer:
             {"collection": "enrollments", "index": [("user_id", 1), ("course_id", 1)], "options": {"unique": True}},
             {"collection": "enrollments", "index": [("enrolled_at", -1)], "options": {}},
             
+            # One reaction/vote per user (reversed key order: the models already
+            # declare non-unique (course_id|review_id, user_id) indexes)
+            {"collection": "course_reactions", "index": [("user_id", 1), ("course_id", 1)], "options": {"unique": True}},
+            {"collection": "review_votes", "index": [("user_id", 1), ("review_id", 1)], "options": {"unique": True}},
+            
             # Progress indexes
             {"collection": "progress", "index": [("user_id", 1)], "options": {}},
             {"collection": "progress", "index": [("course_id", 1)], "options": {}},
@@ -80,10 +86,12 @@ class DatabaseOptimizer:
             {"collection": "payments", "index": [("status", 1)], "options": {}},
             {"collection": "payments", "index": [("created_at", -1)], "options": {}},
             {"collection": "payments", "index": [("type", 1), ("status", 1)], "options": {}},
+            {"collection": "payments", "index": [("course_id", 1), ("created_at", -1)], "options": {}},
             
             # Quiz indexes
             {"collection": "quizzes", "index": [("lesson_id", 1)], "options": {}},
             {"collection": "quizzes", "index": [("course_id", 1)], "options": {}},
+            {"collection": "quiz_progress", "index": [("course_id", 1), ("quiz_id", 1)], "options": {}},
             
             # FAQ indexes
             {"collection": "faqs", "index": [("category", 1)], "options": {}},
@@ -95,6 +103,35 @@ class DatabaseOptimizer:
             {"collection": "blacklisted_tokens", "index": [("user_id", 1)], "options": {}},
             {"collection": "blacklisted_tokens", "index": [("expires_at", 1)], "options": {}},
             {"collection": "blacklisted_tokens", "index": [("blacklisted_at", -1)], "options": {}},
+            {"collection": "blacklisted_tokens", "index": [("updated_at", 1)], "options": {"sparse": True}},
+            
+            # Rate limit windows (TTL removes idle keys)
+            {"collection": "rate_limits", "index": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+            
+            # Email outbox (claim order; TTL removes delivered/failed messages)
+            {"collection": "email_outbox", "index": [("status", 1), ("next_attempt_at", 1)], "options": {}},
+            {"collection": "email_outbox", "index": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+            
+            # Stripe webhook queue (TTL removes processed events; locks expire with their lease)
+            {"collection": "webhook_events", "index": [("status", 1), ("next_attempt_at", 1)], "options": {}},
+            {"collection": "webhook_events", "index": [("ordering_key", 1), ("status", 1), ("event_created", 1)], "options": {}},
+            {"collection": "webhook_events", "index": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+            {"collection": "webhook_event_locks", "index": [("locked_until", 1)], "options": {"expireAfterSeconds": 0}},
+            
+            # AI Study Buddy history, rate windows and usage (TTL removes idle history/windows)
+            {"collection": "ai_conversations", "index": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+            {"collection": "ai_rate_limits", "index": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+            {"collection": "ai_usage_daily", "index": [("user_id", 1), ("date", 1)], "options": {}},
+            {"collection": "ai_usage_daily", "index": [("course_id", 1), ("date", 1)], "options": {}},
+            
+            # Analytics daily rollups
+            {"collection": "analytics_daily_rollups", "index": [("course_id", 1), ("date", 1)], "options": {}},
+            
+            # Shared cache indexes (TTL removes expired entries)
+            {"collection": "cache_entries", "index": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+            
+            # Weighted text indexes for search (courses, users, faqs, support tickets)
+            *SearchOptimizer.create_text_indexes(),
         ]
         
         created_count = 0
@@ -6,9 +6,11 @@ from app.models.course import Course
 from app.models.user import User
 from app.models.progress import Progress
 from app.models.lesson import Lesson
+from app.core.atomic import AtomicUpdate, id_filter, update_one
 from app.core.exceptions import NotFoundError, BadRequestError, ForbiddenError
 from app.core.performance import measure_performance
 from app.services.db_optimization import db_optimizer
+from app.services.analytics_rollup_service import analytics_rollup_service
 
 class EnrollmentService:
     
@@ -44,15 +46,15 @@ class EnrollmentService:
                 # Inactive enrollment → reactivate
                 existing_enrollment.is_active = True
                 existing_enrollment.enrolled_at = datetime.utcnow()
-                await existing_enrollment.save()
+                await update_one(
+                    Enrollment,
+                    {"_id": existing_enrollment.id},
+                    AtomicUpdate().set("is_active", True).set("enrolled_at", existing_enrollment.enrolled_at)
+                )
                 
                 # Restore statistics
-                course.stats.active_students += 1
-                await course.save()
-                
-                if user and user.stats:
-                    user.stats.courses_enrolled += 1
-                    await user.save()
+                await update_one(Course, {"_id": course.id}, AtomicUpdate().inc("stats.active_students"))
+                await update_one(User, {"_id": user.id}, AtomicUpdate().inc("stats.courses_enrolled"))
                 
                 return existing_enrollment
         
@@ -90,26 +92,20 @@ class EnrollmentService:
         )
         
         await enrollment.save()
+        await analytics_rollup_service.record(course_id, enrollment.enrolled_at, enrollments=1)
         
         # Create progress record for first lesson
         await self._create_first_lesson_progress(course_id, user_id)
         
         # Update course enrollment stats
-        course.stats.total_enrollments += 1
-        course.stats.active_students += 1
-        await course.save()
+        await update_one(
+            Course,
+            {"_id": course.id},
+            AtomicUpdate().inc("stats.total_enrollments").inc("stats.active_students")
+        )
         
         # Update user stats
-        user = await User.get(user_id)
-        if user:
-            # Ensure stats object exists
-            if not user.stats:
-                from app.models.user import Stats
-                user.stats = Stats()
-            
-            # Update courses_enrolled using proper object notation
-            user.stats.courses_enrolled = user.stats.courses_enrolled + 1
-            await user.save()
+        await update_one(User, id_filter(user_id), AtomicUpdate().inc("stats.courses_enrolled"))
         
         return enrollment
     
@@ -123,11 +119,9 @@ class EnrollmentService:
         # Recalculate progress for each enrollment to ensure it's up-to-date
         # (handles cases where course structure changed - lessons became draft/published)
         from app.services.progress_service import progress_service
-        for enrollment in enrollments:
-            await progress_service.calculate_course_completion(
-                enrollment.course_id, 
-                user_id
-            )
+        await progress_service.calculate_course_completions(
+            [(enrollment.course_id, user_id) for enrollment in enrollments]
+        )
         
         # Refresh enrollments to get updated progress
         enrollments = await Enrollment.find({
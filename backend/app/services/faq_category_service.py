@@ -12,6 +12,7 @@ from beanie import PydanticObjectId
 from fastapi import HTTPException
 
 # Local imports
+from app.core.atomic import AtomicUpdate, bulk_update
 from app.models.faq_category import FAQCategory
 from app.models.faq import FAQ
 from app.schemas.faq_category import FAQCategoryCreate, FAQCategoryUpdate
@@ -69,24 +70,9 @@ class FAQCategoryService:
             cat_dict = self._format_category(category)
             
             if include_stats:
-                # Smart backend: calculate statistics
-                faq_count = await FAQ.find({
-                    "category_id": str(category.id),
-                    "is_published": True
-                }).count()
-                
-                total_views = 0
-                if faq_count > 0:
-                    # Calculate total views across all FAQs in category
-                    faqs = await FAQ.find({
-                        "category_id": str(category.id),
-                        "is_published": True
-                    }).to_list()
-                    total_views = sum(faq.view_count for faq in faqs)
-                
-                cat_dict["faq_count"] = faq_count
-                cat_dict["total_views"] = total_views
-                cat_dict["has_faqs"] = faq_count > 0
+                # Stored statistics: faq_count refreshed on FAQ changes,
+                # total_views incremented by the FAQ telemetry flush
+                cat_dict["has_faqs"] = category.faq_count > 0
             
             formatted_categories.append(cat_dict)
         
@@ -216,6 +202,36 @@ class FAQCategoryService:
             "message": f"Updated order for {len(category_orders)} categories"
         }
     
+    async def refresh_stats(self) -> int:
+        """
+        Recompute stored faq_count/total_views (published FAQs) for every category
+        with one aggregation. Called after FAQ changes; returns categories updated.
+        """
+        rows = await FAQ.aggregate([
+            {"$match": {"is_published": True, "category_id": {"$ne": None}}},
+            {"$group": {
+                "_id": "$category_id",
+                "faq_count": {"$sum": 1},
+                "total_views": {"$sum": "$view_count"}
+            }}
+        ]).to_list(None)
+        stats = {row["_id"]: row for row in rows}
+        
+        categories = await FAQCategory.find({}).to_list()
+        operations = []
+        for category in categories:
+            row = stats.get(str(category.id), {})
+            faq_count = row.get("faq_count", 0)
+            total_views = row.get("total_views", 0)
+            if (category.faq_count, category.total_views) != (faq_count, total_views):
+                operations.append(
+                    AtomicUpdate()
+                    .set("faq_count", faq_count)
+                    .set("total_views", total_views)
+                    .as_operation({"_id": category.id})
+                )
+        return await bulk_update(FAQCategory, operations)
+    
     def _format_category(self, category: FAQCategory) -> Dict:
         """Smart backend: convert _id to id and format response"""
         return {
@@ -317,4 +333,7 @@ class FAQCategoryService:
             "message": message,
             "affected": affected,
             "errors": errors if errors else None
-        }
\ No newline at end of file
+        }
+
+# Global service instance
+faq_category_service = FAQCategoryService()
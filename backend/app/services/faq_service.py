@@ -14,6 +14,12 @@ from fastapi import HTTPException
 from app.models.faq import FAQ
 from app.models.faq_category import FAQCategory
 from app.schemas.faq import FAQCreate, FAQUpdate, FAQSearchQuery
+from app.core.atomic import id_filter
+from app.core.config import settings
+from app.services.faq_category_service import faq_category_service
+from app.services.faq_telemetry_service import faq_telemetry_service
+from app.utils.search import SearchBuilder
+from app.utils.pagination import keyset_sort, apply_cursor, paginate_results, count_documents
 
 
 class FAQService:
@@ -52,23 +58,24 @@ class FAQService:
         # Ensure pre_save is called to generate slug if needed
         await faq.pre_save()
         await faq.save()
+        await faq_category_service.refresh_stats()
         
         return self._format_faq(faq)
     
     async def get_faq(self, faq_id: str) -> dict:
         """Get FAQ by ID"""
-        faq = await FAQ.get(faq_id)
+        faq = await FAQ.find_one(id_filter(faq_id))
         if not faq:
             raise HTTPException(
                 status_code=404,
                 detail="FAQ not found"
             )
         
-        # Increment view count
-        faq.view_count += 1
-        await faq.save()
-        
-        return self._format_faq(faq)
+        # View is buffered and written with the next telemetry flush
+        counters = await faq_telemetry_service.record(faq, view_count=1)
+        faq_dict = self._format_faq(faq)
+        faq_dict.update(counters)
+        return faq_dict
     
     async def update_faq(self, faq_id: str, update_data: FAQUpdate) -> dict:
         """Update FAQ"""
@@ -95,6 +102,7 @@ class FAQService:
         
         faq.updated_at = datetime.utcnow()
         await faq.save()
+        await faq_category_service.refresh_stats()
         
         return self._format_faq(faq)
     
@@ -108,6 +116,7 @@ class FAQService:
             )
         
         await faq.delete()
+        await faq_category_service.refresh_stats()
         
         return {"message": "FAQ deleted successfully"}
     
@@ -116,21 +125,25 @@ class FAQService:
         # Build filter
         filter_dict = {}
         
-        if query.q:
-            # Search in question and answer
-            filter_dict["$or"] = [
-                {"question": {"$regex": query.q, "$options": "i"}},
-                {"answer": {"$regex": query.q, "$options": "i"}}
-            ]
-        
         if query.category:
             filter_dict["category_id"] = query.category
         
         if query.is_published is not None:
             filter_dict["is_published"] = query.is_published
         
-        # Count total
-        total = await FAQ.find(filter_dict).count()
+        if query.q:
+            # Search in question and answer (text index, regex only for partial words)
+            search_filter, _ = await SearchBuilder.build_search_filter(
+                FAQ.get_motor_collection(),
+                query.q,
+                SearchBuilder.get_faq_search_config(),
+                base_filter=filter_dict,
+                allow_fallback=settings.SEARCH_REGEX_FALLBACK
+            )
+            filter_dict.update(search_filter)
+        
+        # Count total (cached across cursor pages)
+        total = await count_documents(FAQ.get_motor_collection(), filter_dict, cached=bool(query.cursor))
         
         # Build sort
         sort_field = query.sort_by
@@ -142,10 +155,14 @@ class FAQService:
             ]
         else:
             sort = [(sort_field, -1 if query.sort_order == "desc" else 1)]
+        sort = keyset_sort(sort)
         
         # Fetch paginated results
-        skip = (query.page - 1) * query.per_page
-        faqs = await FAQ.find(filter_dict).sort(sort).skip(skip).limit(query.per_page).to_list()
+        faqs_query = FAQ.find(apply_cursor(filter_dict, sort, query.cursor)).sort(sort)
+        if not query.cursor:
+            faqs_query = faqs_query.skip((query.page - 1) * query.per_page)
+        faqs = await faqs_query.limit(query.per_page + 1).to_list()
+        faqs, next_cursor = paginate_results(faqs, query.per_page, sort)
         
         # Convert _id to id for frontend consistency (smart backend pattern)
         formatted_faqs = [self._format_faq(faq) for faq in faqs]
@@ -155,7 +172,8 @@ class FAQService:
             "total": total,
             "page": query.page,
             "per_page": query.per_page,
-            "total_pages": (total + query.per_page - 1) // query.per_page
+            "total_pages": (total + query.per_page - 1) // query.per_page,
+            "next_cursor": next_cursor
         }
     
     async def get_faqs_by_category(self, category_id: str) -> List[dict]:
@@ -168,25 +186,21 @@ class FAQService:
     
     async def vote_faq(self, faq_id: str, is_helpful: bool) -> Dict:
         """Vote on FAQ helpfulness"""
-        faq = await FAQ.get(faq_id)
+        faq = await FAQ.find_one(id_filter(faq_id))
         if not faq:
             raise HTTPException(
                 status_code=404,
                 detail="FAQ not found"
             )
         
-        if is_helpful:
-            faq.helpful_votes += 1
-        else:
-            faq.unhelpful_votes += 1
-        
-        await faq.save()
+        field = "helpful_votes" if is_helpful else "unhelpful_votes"
+        counters = await faq_telemetry_service.record(faq, **{field: 1})
         
         return {
             "success": True,
             "message": "Thank you for your feedback",
-            "helpful_votes": faq.helpful_votes,
-            "unhelpful_votes": faq.unhelpful_votes
+            "helpful_votes": counters["helpful_votes"],
+            "unhelpful_votes": counters["unhelpful_votes"]
         }
     
     async def get_related_faqs(self, faq_id: str) -> List[dict]:
@@ -243,6 +257,9 @@ class FAQService:
                         "error": str(e)
                     })
 
+            if created_faqs:
+                await faq_category_service.refresh_stats()
+
             return {
                 "success": True,
                 "message": f"Created {len(created_faqs)} FAQs successfully",
@@ -275,6 +292,8 @@ class FAQService:
                 detail="Invalid action"
             )
 
+        await faq_category_service.refresh_stats()
+
         return {
             "success": True,
             "message": f"{action.capitalize()} action performed on {len(faq_ids)} FAQs",
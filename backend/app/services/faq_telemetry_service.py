@@ -0,0 +1,113 @@
+"""
+FAQ telemetry buffer.
+FAQ views and helpful/unhelpful votes are counted in memory and flushed every
+FAQ_TELEMETRY_FLUSH_INTERVAL seconds as one bulk $inc over FAQs plus one over
+their categories (total_views), so public FAQ reads never write.
+"""
+from typing import Dict, Optional
+from collections import defaultdict
+import asyncio
+import logging
+
+from app.core.atomic import AtomicUpdate, bulk_update, id_filter
+from app.core.config import settings
+from app.models.faq import FAQ
+from app.models.faq_category import FAQCategory
+
+logger = logging.getLogger(__name__)
+
+FAQ_COUNTERS = ("view_count", "helpful_votes", "unhelpful_votes")
+
+
+class FAQTelemetryService:
+    """Buffers FAQ view/vote counters and writes them in batches"""
+
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(FAQ_COUNTERS, 0))
+        self._categories: Dict[str, Optional[str]] = {}  # faq_id -> category credited with its views
+        self._flush_lock = asyncio.Lock()
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+    async def record(self, faq: FAQ, **increments: int) -> Dict[str, int]:
+        """
+        Count increments for a FAQ. Returns its counters including everything
+        not yet flushed, for the response.
+        """
+        faq_id = str(faq.id)
+        pending = self._pending[faq_id]
+        for field, amount in increments.items():
+            pending[field] += amount
+        # Only published FAQs count towards category totals
+        self._categories[faq_id] = faq.category_id if faq.is_published else None
+
+        counters = {field: getattr(faq, field) + pending[field] for field in FAQ_COUNTERS}
+        if settings.FAQ_TELEMETRY_FLUSH_INTERVAL <= 0:
+            await self.flush()
+        return counters
+
+    async def flush(self) -> int:
+        """Write buffered counters. Returns FAQs updated."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(FAQ_COUNTERS, 0))
+            categories, self._categories = self._categories, {}
+            try:
+                await self._write(pending, categories)
+            except Exception as e:
+                # Put increments back so the next flush retries them
+                for faq_id, counters in pending.items():
+                    for field, amount in counters.items():
+                        self._pending[faq_id][field] += amount
+                    self._categories.setdefault(faq_id, categories.get(faq_id))
+                logger.error(f"FAQ telemetry flush failed: {e}")
+                return 0
+
+            return len(pending)
+
+    async def _write(self, pending: Dict[str, Dict[str, int]], categories: Dict[str, Optional[str]]) -> None:
+        faq_operations = []
+        category_views: Dict[str, int] = defaultdict(int)
+        for faq_id, counters in pending.items():
+            update = AtomicUpdate()
+            for field, amount in counters.items():
+                update.inc(field, amount)
+            if update:
+                faq_operations.append(update.as_operation(id_filter(faq_id)))
+            if categories.get(faq_id) and counters["view_count"]:
+                category_views[categories[faq_id]] += counters["view_count"]
+
+        await bulk_update(FAQ, faq_operations)
+        await bulk_update(FAQCategory, [
+            AtomicUpdate().inc("total_views", views).as_operation(id_filter(category_id))
+            for category_id, views in category_views.items()
+        ])
+
+    def start(self) -> None:
+        """Start periodic flushing"""
+        if settings.FAQ_TELEMETRY_FLUSH_INTERVAL > 0 and self._scheduler_task is None:
+            self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write what is left"""
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+        await self.flush()
+
+    async def _run_scheduler(self) -> None:
+        while True:
+            await asyncio.sleep(settings.FAQ_TELEMETRY_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"FAQ telemetry flush error: {e}")
+
+
+# Global telemetry buffer instance
+faq_telemetry_service = FAQTelemetryService()
@@ -3,6 +3,7 @@ Learn page service - Smart Backend implementation.
 Consolidates all learn page data fetching into single optimized service.
 """
 import asyncio
+import logging
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from fastapi import HTTPException, status
@@ -22,7 +23,9 @@ from app.schemas.learn import (
     ProgressUpdateResponse
 )
 from app.core.exceptions import NotFoundError, ForbiddenError
+from app.services.course_manifest_service import course_manifest_service
 
+logger = logging.getLogger(__name__)
 
 class LearnService:
     """
@@ -566,7 +569,7 @@ class LearnService:
             from app.services.progress_service import progress_service
             
             # Update progress using existing service
-            updated_progress = await progress_service.update_video_progress(
+            updated_progress, _ = await progress_service.update_video_progress(
                 lesson_id=progress_data.lesson_id,
                 user_id=user_id,
                 watch_percentage=progress_data.watch_percentage,
@@ -579,9 +582,14 @@ class LearnService:
                 updated_progress.video_progress.is_completed
             )
             
-            # Check if course was completed
-            course_completion = await progress_service.calculate_course_completion(course_id, user_id)
-            course_completed = course_completion['is_completed']
+            # Check if course was completed. update_video_progress already
+            # recomputed enrollment completion when it took the synchronous path
+            # (the only way a lesson completes), so read the stored result
+            enrollment = await Enrollment.get_motor_collection().find_one(
+                {"user_id": user_id, "course_id": course_id, "is_active": True},
+                {"progress.is_completed": 1}
+            )
+            course_completed = bool(((enrollment or {}).get("progress") or {}).get("is_completed"))
             
             # Find next unlocked lesson if current lesson was completed
             next_lesson_unlocked = None
@@ -622,8 +630,8 @@ class LearnService:
         if enrollment.progress.current_lesson_id:
             # First verify the lesson still exists in database
             try:
-                lesson_obj_id = PydanticObjectId(enrollment.progress.current_lesson_id)
-                lesson_exists = await Lesson.get(lesson_obj_id)
+                manifest = await course_manifest_service.get_manifest(course_id)
+                lesson_exists = enrollment.progress.current_lesson_id in manifest["lessons"]
                 
                 if lesson_exists:
                     # Lesson exists, check if it's completed
@@ -646,39 +654,23 @@ class LearnService:
     async def _find_first_incomplete_lesson(course_id: str, user_id: str) -> Optional[str]:
         """
         Find the first incomplete lesson in the course.
-        Properly handles multi-chapter courses by iterating through chapters in order.
+        Properly handles multi-chapter courses by walking the cached course manifest in order.
         """
-        # Convert course_id to ObjectId for MongoDB query
-        course_obj_id = PydanticObjectId(course_id) if isinstance(course_id, str) else course_id
-        
-        # Get all published chapters sorted by order
-        chapters = await Chapter.find({
-            "course_id": course_obj_id,
-            "status": "published"
-        }).sort([("order", 1)]).to_list()
+        manifest = await course_manifest_service.get_manifest(str(course_id))
+        published_chapters = course_manifest_service.get_published_chapters(manifest)
+        lesson_ids = [lesson_id for chapter in published_chapters for lesson_id in chapter]
         
-        # Iterate through each chapter in order
-        for chapter in chapters:
-            # Get all published lessons in this chapter sorted by order
-            lessons = await Lesson.find({
-                "chapter_id": chapter.id,
-                "status": "published"
-            }).sort([("order", 1)]).to_list()
-            
-            # Check each lesson in the chapter
-            for lesson in lessons:
-                # Check if this lesson has progress
-                progress = await Progress.find_one({
-                    "lesson_id": str(lesson.id),
-                    "user_id": user_id
-                })
-                
-                # Found an incomplete lesson - return it
-                if not progress or not progress.is_completed:
-                    return str(lesson.id)
+        completed_ids = set()
+        if lesson_ids:
+            completed = await Progress.find({
+                "user_id": user_id,
+                "lesson_id": {"$in": lesson_ids},
+                "is_completed": True
+            }).to_list()
+            completed_ids = {progress.lesson_id for progress in completed}
         
-        # All lessons completed - return last lesson for review
-        return await LearnService._find_last_lesson_in_course(course_id)
+        # First incomplete lesson, or last lesson for review when all are completed
+        return LearnService._pick_continue_lesson_id(published_chapters, completed_ids)
     
     @staticmethod
     async def _find_last_lesson_in_course(course_id: str) -> Optional[str]:
@@ -686,29 +678,94 @@ class LearnService:
         Find the last lesson in the course for review purposes.
         Returns the lesson with the highest order in the last chapter.
         """
-        # Convert course_id to ObjectId for MongoDB query
-        course_obj_id = PydanticObjectId(course_id) if isinstance(course_id, str) else course_id
+        manifest = await course_manifest_service.get_manifest(str(course_id))
+        return course_manifest_service.get_last_published_lesson_id(manifest)
+
+    @staticmethod
+    async def get_smart_continue_lesson_ids(
+        enrollments: List[Enrollment],
+        user_id: str
+    ) -> Dict[str, Optional[str]]:
+        """
+        Bulk version of _get_smart_continue_lesson_id for course listings.
+        Resolves continue lessons for many enrollments from cached course manifests
+        plus a single progress aggregation, joined in memory.
+        Returns a dictionary mapping course_id to continue_lesson_id.
+        """
+        if not enrollments:
+            return {}
+        
+        # 1. Cached course structure for every enrolled course
+        manifests = await course_manifest_service.get_manifests(
+            str(enrollment.course_id) for enrollment in enrollments
+        )
+        chapters_by_course = {
+            course_id: course_manifest_service.get_published_chapters(manifest)
+            for course_id, manifest in manifests.items()
+        }
         
-        # Get last published chapter (highest order)
-        chapters = await Chapter.find({
-            "course_id": course_obj_id,
-            "status": "published"
-        }).sort([("order", -1)]).limit(1).to_list()
+        # 2. Which current lessons still exist in their course
+        existing_current_ids = {
+            enrollment.progress.current_lesson_id
+            for enrollment in enrollments
+            if enrollment.progress.current_lesson_id
+            and enrollment.progress.current_lesson_id in manifests[str(enrollment.course_id)]["lessons"]
+        }
         
-        if not chapters:
-            return None
+        # 3. Completed lessons for this user across every candidate lesson
+        candidate_ids = {
+            lesson_id
+            for chapters in chapters_by_course.values()
+            for chapter in chapters
+            for lesson_id in chapter
+        } | existing_current_ids
+        completed_ids = set()
+        if candidate_ids:
+            completed = await Progress.aggregate([
+                {"$match": {
+                    "user_id": user_id,
+                    "lesson_id": {"$in": list(candidate_ids)},
+                    "is_completed": True
+                }},
+                {"$group": {"_id": "$lesson_id"}}
+            ]).to_list(None)
+            completed_ids = {doc["_id"] for doc in completed}
+        
+        result = {}
+        for enrollment in enrollments:
+            current_lesson_id = enrollment.progress.current_lesson_id
+            if (
+                current_lesson_id
+                and current_lesson_id in existing_current_ids
+                and current_lesson_id not in completed_ids
+            ):
+                result[str(enrollment.course_id)] = current_lesson_id
+                continue
             
-        last_chapter = chapters[0]
+            course_chapters = chapters_by_course.get(str(enrollment.course_id), [])
+            result[str(enrollment.course_id)] = LearnService._pick_continue_lesson_id(
+                course_chapters, completed_ids
+            )
         
-        # Get last published lesson in the last chapter
-        lessons = await Lesson.find({
-            "chapter_id": last_chapter.id,
-            "status": "published"
-        }).sort([("order", -1)]).limit(1).to_list()
+        return result
+    
+    @staticmethod
+    def _pick_continue_lesson_id(
+        chapters: List[List[str]],
+        completed_ids: set
+    ) -> Optional[str]:
+        """
+        Pick the first incomplete lesson from ordered lesson ids per ordered chapter.
+        Falls back to the last lesson of the last chapter for review.
+        """
+        for chapter_lesson_ids in chapters:
+            for lesson_id in chapter_lesson_ids:
+                if lesson_id not in completed_ids:
+                    return lesson_id
+        
+        if chapters and chapters[-1]:
+            return chapters[-1][-1]
         
-        if lessons:
-            return str(lessons[0].id)
-            
         return None
 
 
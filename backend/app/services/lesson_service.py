@@ -62,6 +62,7 @@ from app.models.progress import Progress
 from app.models.enrollment import Enrollment
 from app.schemas.lesson import LessonCreate, LessonUpdate, LessonReorder
 from app.services.chapter_service import chapter_service
+from app.services.course_manifest_service import course_manifest_service
 
 
 class LessonService:
@@ -124,6 +125,7 @@ class LessonService:
         )
         
         await lesson.insert()
+        await course_manifest_service.invalidate(course_id)
 
         # Trigger transcript fetch in background (non-blocking)
         youtube_url = str(lesson.video.youtube_url) if lesson.video and lesson.video.youtube_url else None
@@ -482,6 +484,7 @@ class LessonService:
         lesson.updated_at = datetime.utcnow()
         
         await lesson.save()
+        await course_manifest_service.invalidate(lesson.course_id)
 
         # Trigger transcript fetch if video URL was updated
         if "video" in update_data and lesson.video and lesson.video.youtube_url:
@@ -529,6 +532,7 @@ class LessonService:
         
         # Delete lesson
         await lesson.delete()
+        await course_manifest_service.invalidate(lesson.course_id)
         
         # Update chapter stats
         await chapter_service.update_chapter_stats(lesson.chapter_id)
@@ -570,9 +574,10 @@ class LessonService:
             from app.services.progress_service import progress_service
             unique_user_ids = set(enrollment.user_id for enrollment in affected_enrollments)
             
-            # Update progress for each affected user
-            for user_id in unique_user_ids:
-                await progress_service.calculate_course_completion(str(course.id), user_id)
+            # Update progress for all affected users in one pass
+            await progress_service.calculate_course_completions(
+                [(str(course.id), user_id) for user_id in unique_user_ids]
+            )
         
         # Reorder remaining lessons
         remaining_lessons = await Lesson.find(
@@ -584,6 +589,8 @@ class LessonService:
             ls.order -= 1
             await ls.save()
         
+        await course_manifest_service.invalidate(lesson.course_id)
+        
         return {"message": "Lesson deleted successfully"}
     
     @staticmethod
@@ -616,6 +623,8 @@ class LessonService:
                 lesson.order = item["order"]
                 await lesson.save()
         
+        await course_manifest_service.invalidate(chapter.course_id)
+        
         # Return updated lessons
         lessons = await Lesson.find(
             Lesson.chapter_id == PydanticObjectId(chapter_id)
@@ -711,6 +720,7 @@ class LessonService:
         # Update the lesson's order
         lesson.order = new_order
         await lesson.save()
+        await course_manifest_service.invalidate(lesson.course_id)
 
     @staticmethod
     async def validate_lesson_status_change(
@@ -0,0 +1,235 @@
+"""
+Payment provider adapter.
+Async wrapper around the Stripe SDK: blocking SDK calls run in worker threads
+(the SDK keeps pooled keep-alive sessions), every mutating call carries an
+idempotency key that is reused across retries, and customers are cached.
+PAYMENT_PROVIDER=fake swaps in an in-memory provider for offline load tests.
+"""
+from typing import Any, Callable, Dict, Optional
+from collections import defaultdict
+from types import SimpleNamespace
+import asyncio
+import os
+import time
+import uuid
+import logging
+
+import stripe
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.performance import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+# Initialize Stripe
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "")
+
+# Transient errors worth retrying with the same idempotency key
+RETRYABLE_ERRORS = (stripe.error.APIConnectionError, stripe.error.RateLimitError)
+
+
+def new_idempotency_key(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex}"
+
+
+class ProviderStats:
+    """Per-operation call/retry/error counters (per process)"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "retries": 0, "errors": 0}
+        )
+
+    def record(self, operation: str, field: str) -> None:
+        self._stats[operation][field] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {operation: dict(counters) for operation, counters in self._stats.items()}
+
+
+class StripeProvider:
+    """Async Stripe adapter"""
+
+    name = "stripe"
+
+    def __init__(self):
+        self.stats = ProviderStats()
+        self._customer_cache = LRUCache(maxsize=5000, ttl=settings.PAYMENT_CUSTOMER_CACHE_TTL)
+
+    async def _call(
+        self,
+        operation: str,
+        func: Callable[..., Any],
+        *args: Any,
+        idempotency_key: Optional[str] = None,
+        **kwargs: Any
+    ) -> Any:
+        """Run an SDK call off the event loop, retrying transient failures"""
+        if idempotency_key:
+            kwargs["idempotency_key"] = idempotency_key
+
+        self.stats.record(operation, "calls")
+        start = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return await asyncio.to_thread(func, *args, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    # Only reads and writes that carry an idempotency key are safe to retry
+                    if attempt >= settings.PAYMENT_PROVIDER_MAX_RETRIES or not (
+                        idempotency_key or operation.endswith("retrieve")
+                    ):
+                        raise
+                    attempt += 1
+                    self.stats.record(operation, "retries")
+                    logger.warning(f"Stripe {operation} failed ({e}), retry {attempt}")
+                    await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 4))
+        except Exception:
+            self.stats.record(operation, "errors")
+            raise
+        finally:
+            performance_monitor.track_execution_time(f"payments.stripe.{operation}", time.perf_counter() - start)
+
+    async def create_customer(self, idempotency_key: Optional[str] = None, **params: Any) -> Any:
+        customer = await self._call(
+            "customer.create", stripe.Customer.create,
+            idempotency_key=idempotency_key or new_idempotency_key("customer"), **params
+        )
+        self._customer_cache.set(customer.id, customer)
+        return customer
+
+    async def retrieve_customer(self, customer_id: str) -> Any:
+        customer = self._customer_cache.get(customer_id)
+        if customer is None:
+            customer = await self._call("customer.retrieve", stripe.Customer.retrieve, customer_id)
+            self._customer_cache.set(customer_id, customer)
+        return customer
+
+    async def modify_customer(self, customer_id: str, **params: Any) -> Any:
+        self._customer_cache.delete(customer_id)
+        return await self._call(
+            "customer.modify", stripe.Customer.modify, customer_id,
+            idempotency_key=new_idempotency_key("customer-modify"), **params
+        )
+
+    async def attach_payment_method(self, payment_method_id: str, customer_id: str) -> Any:
+        return await self._call(
+            "payment_method.attach", stripe.PaymentMethod.attach, payment_method_id,
+            customer=customer_id, idempotency_key=new_idempotency_key("pm-attach")
+        )
+
+    async def create_payment_intent(self, idempotency_key: Optional[str] = None, **params: Any) -> Any:
+        return await self._call(
+            "payment_intent.create", stripe.PaymentIntent.create,
+            idempotency_key=idempotency_key or new_idempotency_key("pi"), **params
+        )
+
+    async def create_subscription(self, idempotency_key: Optional[str] = None, **params: Any) -> Any:
+        return await self._call(
+            "subscription.create", stripe.Subscription.create,
+            idempotency_key=idempotency_key or new_idempotency_key("sub"), **params
+        )
+
+    async def modify_subscription(self, subscription_id: str, **params: Any) -> Any:
+        return await self._call(
+            "subscription.modify", stripe.Subscription.modify, subscription_id,
+            idempotency_key=new_idempotency_key("sub-modify"), **params
+        )
+
+    async def delete_subscription(self, subscription_id: str) -> Any:
+        return await self._call(
+            "subscription.delete", stripe.Subscription.delete, subscription_id,
+            idempotency_key=new_idempotency_key("sub-delete")
+        )
+
+    async def create_refund(self, idempotency_key: Optional[str] = None, **params: Any) -> Any:
+        return await self._call(
+            "refund.create", stripe.Refund.create,
+            idempotency_key=idempotency_key or new_idempotency_key("refund"), **params
+        )
+
+
+class FakePaymentProvider(StripeProvider):
+    """
+    In-memory provider for offline load tests (PAYMENT_PROVIDER=fake).
+    Returns Stripe-shaped objects after PAYMENT_FAKE_LATENCY_MS.
+    Idempotency keys replay the first response, like Stripe.
+    """
+
+    name = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self._objects = LRUCache(maxsize=100000)
+        self._idempotent = LRUCache(maxsize=100000, ttl=24 * 3600)
+
+    async def _call(
+        self,
+        operation: str,
+        func: Callable[..., Any],
+        *args: Any,
+        idempotency_key: Optional[str] = None,
+        **kwargs: Any
+    ) -> Any:
+        self.stats.record(operation, "calls")
+        start = time.perf_counter()
+        try:
+            if settings.PAYMENT_FAKE_LATENCY_MS:
+                await asyncio.sleep(settings.PAYMENT_FAKE_LATENCY_MS / 1000)
+            if idempotency_key:
+                replay = self._idempotent.get(idempotency_key)
+                if replay is not None:
+                    return replay
+            result = self._fake(operation, *args, **kwargs)
+            if idempotency_key:
+                self._idempotent.set(idempotency_key, result)
+            return result
+        finally:
+            performance_monitor.track_execution_time(f"payments.fake.{operation}", time.perf_counter() - start)
+
+    def _fake(self, operation: str, *args: Any, **params: Any) -> SimpleNamespace:
+        now = int(time.time())
+        if operation == "customer.retrieve":
+            return self._objects.get(args[0]) or SimpleNamespace(id=args[0], **params)
+        if operation in ("customer.modify", "subscription.modify", "subscription.delete"):
+            obj = self._objects.get(args[0]) or SimpleNamespace(id=args[0])
+            for key, value in params.items():
+                setattr(obj, key, value)
+            if operation == "subscription.delete":
+                obj.status = "canceled"
+            return obj
+        if operation == "payment_method.attach":
+            return SimpleNamespace(id=args[0], customer=params.get("customer"))
+
+        prefix = {
+            "customer.create": "cus",
+            "payment_intent.create": "pi",
+            "subscription.create": "sub",
+            "refund.create": "re"
+        }[operation]
+        obj = SimpleNamespace(id=f"{prefix}_fake_{uuid.uuid4().hex[:14]}", created=now, **params)
+        if operation == "payment_intent.create":
+            obj.client_secret = f"{obj.id}_secret_fake"
+            obj.status = "requires_confirmation"
+        elif operation == "subscription.create":
+            obj.status = "active"
+            obj.current_period_start = now
+            obj.current_period_end = now + 30 * 24 * 3600
+            obj.latest_invoice = f"in_fake_{uuid.uuid4().hex[:14]}"
+        elif operation == "refund.create":
+            obj.status = "succeeded"
+        self._objects.set(obj.id, obj)
+        return obj
+
+
+def get_payment_provider() -> StripeProvider:
+    if settings.PAYMENT_PROVIDER == "fake":
+        logger.warning("Using fake payment provider - no real charges are made")
+        return FakePaymentProvider()
+    return StripeProvider()
+
+
+# Global provider instance
+payment_provider = get_payment_provider()
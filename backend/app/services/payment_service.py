@@ -5,7 +5,7 @@ Based on CLAUDE.md payment workflows.
 import os
 import stripe
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from fastapi import HTTPException
 from beanie import PydanticObjectId
@@ -13,19 +13,21 @@ from beanie import PydanticObjectId
 from app.models.payment import Payment
 from app.models.course import Course
 from app.models.user import User
-from app.models.enrollment import Enrollment
+from app.models.enrollment import Enrollment, EnrollmentType
 from app.schemas.payment import (
     PaymentStatus, PaymentType, PaymentProvider,
     SubscriptionStatus, SubscriptionType
 )
-from app.services.enrollment_service import EnrollmentService
+from app.services.enrollment_service import enrollment_service
 from app.core.email import email_service
 from app.core.config import settings
+from app.core.atomic import AtomicUpdate, find_one_and_update
+from app.core.principal import invalidate_user_cache
+from app.services.analytics_rollup_service import analytics_rollup_service
+from app.services.payment_provider import payment_provider
 
 logger = logging.getLogger(__name__)
 
-# Initialize Stripe
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "")
 
 
 class PaymentService:
@@ -70,7 +72,8 @@ class PaymentService:
             
             # Create or retrieve Stripe customer
             if not user.subscription or not user.subscription.stripe_customer_id:
-                customer = stripe.Customer.create(
+                customer = await payment_provider.create_customer(
+                    idempotency_key=f"customer-{user.id}",
                     email=user.email,
                     name=user.name,
                     metadata={"user_id": str(user.id)}
@@ -83,14 +86,14 @@ class PaymentService:
                 user.subscription.stripe_customer_id = customer.id
                 await user.save()
             else:
-                customer = stripe.Customer.retrieve(user.subscription.stripe_customer_id)
+                customer = await payment_provider.retrieve_customer(user.subscription.stripe_customer_id)
             
             # Create payment intent
             price = course.pricing.get("price") if hasattr(course.pricing, 'get') else getattr(course.pricing, 'price', 0)
             currency = course.pricing.get("currency") if hasattr(course.pricing, 'get') else getattr(course.pricing, 'currency', "USD")
             amount = int(float(price) * 100)  # Convert to cents
             
-            payment_intent = stripe.PaymentIntent.create(
+            payment_intent = await payment_provider.create_payment_intent(
                 amount=amount,
                 currency=currency.lower(),
                 customer=customer.id,
@@ -139,6 +142,9 @@ class PaymentService:
     async def handle_payment_success(payment_intent_id: str) -> bool:
         """
         Handle successful payment completion.
+        Safe to run again for the same intent (redelivery, retry, replay):
+        revenue and the confirmation email happen only on the transition,
+        and enrolling an already enrolled user is a no-op.
         
         Workflow:
         1. Update payment status to completed
@@ -146,27 +152,41 @@ class PaymentService:
         3. Send confirmation email
         """
         try:
-            # Find payment record
-            payment = await Payment.find_one({"provider_payment_id": payment_intent_id})
-            if not payment:
-                logger.error(f"Payment not found for intent: {payment_intent_id}")
-                return False
-            
-            # Update payment status
-            payment.status = PaymentStatus.COMPLETED
-            payment.paid_at = datetime.utcnow()
-            await payment.save()
-            
-            # Create enrollment
+            # Mark completed only if not already - redeliveries and replays miss here
+            payment = await find_one_and_update(
+                Payment,
+                {
+                    "provider_payment_id": payment_intent_id,
+                    "status": {"$nin": [PaymentStatus.COMPLETED.value, PaymentStatus.REFUNDED.value]}
+                },
+                AtomicUpdate().set("status", PaymentStatus.COMPLETED.value).set("paid_at", datetime.utcnow())
+            )
+            completed_now = payment is not None
+            if completed_now:
+                # Revenue counts once, on the transition
+                if payment.course_id:
+                    await analytics_rollup_service.record(payment.course_id, payment.created_at, revenue=payment.amount)
+            else:
+                payment = await Payment.find_one({"provider_payment_id": payment_intent_id})
+                if not payment:
+                    logger.error(f"Payment not found for intent: {payment_intent_id}")
+                    return False
+                if payment.status != PaymentStatus.COMPLETED:
+                    # Refunded since - nothing to grant
+                    logger.info(f"Ignoring success event for {payment.status} payment: {payment_intent_id}")
+                    return True
+            
             if payment.course_id:
-                enrollment = await EnrollmentService.create_enrollment(
-                    user_id=str(payment.user_id),
+                # Also repairs a previous attempt that completed the payment but failed to enroll
+                await enrollment_service.enroll_user(
                     course_id=str(payment.course_id),
-                    enrollment_type="purchased",
+                    user_id=str(payment.user_id),
+                    enrollment_type=EnrollmentType.PURCHASED,
                     payment_id=str(payment.id)
                 )
-                
-                # Send payment confirmation email
+            
+            # Send payment confirmation email (once)
+            if payment.course_id and completed_now:
                 user = await User.get(payment.user_id)
                 course = await Course.get(payment.course_id)
                 
@@ -205,7 +225,7 @@ class PaymentService:
         try:
             # Create or retrieve Stripe customer
             if not user.subscription or not user.subscription.stripe_customer_id:
-                customer = stripe.Customer.create(
+                customer = await payment_provider.create_customer(
                     email=user.email,
                     name=user.name,
                     payment_method=payment_method_id,
@@ -216,8 +236,8 @@ class PaymentService:
             else:
                 customer_id = user.subscription.stripe_customer_id
                 # Attach payment method to existing customer
-                stripe.PaymentMethod.attach(payment_method_id, customer=customer_id)
-                stripe.Customer.modify(
+                await payment_provider.attach_payment_method(payment_method_id, customer_id)
+                await payment_provider.modify_customer(
                     customer_id,
                     invoice_settings={"default_payment_method": payment_method_id}
                 )
@@ -227,7 +247,7 @@ class PaymentService:
             price_id = os.getenv("STRIPE_PRO_PRICE_ID", "price_pro_monthly")
             
             # Create subscription
-            subscription = stripe.Subscription.create(
+            subscription = await payment_provider.create_subscription(
                 customer=customer_id,
                 items=[{"price": price_id}],
                 metadata={
@@ -336,13 +356,13 @@ class PaymentService:
             
             if cancel_at_period_end:
                 # Cancel at end of billing period
-                subscription = stripe.Subscription.modify(
+                subscription = await payment_provider.modify_subscription(
                     subscription_id,
                     cancel_at_period_end=True
                 )
             else:
                 # Cancel immediately
-                subscription = stripe.Subscription.delete(subscription_id)
+                subscription = await payment_provider.delete_subscription(subscription_id)
             
             # Update user subscription status
             user.subscription["status"] = SubscriptionStatus.CANCELLED
@@ -427,6 +447,212 @@ class PaymentService:
             logger.error(f"Error fetching payment history: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to fetch payment history")
     
+    @staticmethod
+    async def get_analytics_dashboard(
+        include: str = "all",
+        days: int = 30,
+        creator_id: Optional[PydanticObjectId] = None
+    ) -> Dict[str, Any]:
+        """
+        Payment summary and trends computed in one $facet aggregation.
+        Creator dashboards are scoped to the creator's courses in the $match,
+        so memory stays constant regardless of payment volume.
+        """
+        now = datetime.utcnow()
+        month_start = datetime(now.year, now.month, 1)
+        end_date = now
+        start_date = end_date - timedelta(days=days)
+        thirty_days_ago = now - timedelta(days=30)
+        
+        completed = PaymentStatus.COMPLETED.value
+        match: Dict[str, Any] = {}
+        if creator_id is not None:
+            course_ids = await Course.get_motor_collection().distinct("_id", {"creator_id": creator_id})
+            match["course_id"] = {"$in": course_ids}
+        
+        def completed_amount(extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+            conditions = [{"$eq": ["$status", completed]}]
+            if extra:
+                conditions.append(extra)
+            return {"$sum": {"$cond": [{"$and": conditions}, "$amount", 0]}}
+        
+        in_range = {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}}}
+        facets: Dict[str, List[Dict[str, Any]]] = {}
+        
+        if include in ["all", "summary"]:
+            facets["by_status"] = [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}, "amount": {"$sum": "$amount"}}}
+            ]
+            facets["by_type"] = [
+                {"$group": {"_id": "$type", "count": {"$sum": 1}}}
+            ]
+            facets["summary"] = [
+                {"$group": {
+                    "_id": None,
+                    "month_revenue": completed_amount({"$gte": ["$created_at", month_start]}),
+                    "active_subscriptions": {"$sum": {"$cond": [
+                        {"$and": [
+                            {"$eq": ["$type", PaymentType.SUBSCRIPTION.value]},
+                            {"$eq": ["$status", completed]},
+                            {"$gte": ["$created_at", thirty_days_ago]}
+                        ]},
+                        1,
+                        0
+                    ]}}
+                }}
+            ]
+        
+        if include in ["all", "trends"]:
+            facets["daily"] = [
+                in_range,
+                {"$match": {"status": completed}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "revenue": {"$sum": "$amount"},
+                    "payment_count": {"$sum": 1}
+                }}
+            ]
+            facets["range_by_status"] = [
+                in_range,
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ]
+            facets["range_by_type"] = [
+                in_range,
+                {"$group": {"_id": "$type", "count": {"$sum": 1}, "revenue": completed_amount()}}
+            ]
+            facets["top_courses"] = [
+                in_range,
+                {"$match": {"status": completed, "course_id": {"$ne": None}}},
+                {"$group": {"_id": "$course_id", "revenue": {"$sum": "$amount"}, "payment_count": {"$sum": 1}}},
+                {"$sort": {"revenue": -1}},
+                {"$limit": 5},
+                {"$lookup": {"from": "courses", "localField": "_id", "foreignField": "_id", "as": "course"}},
+                {"$project": {
+                    "revenue": 1,
+                    "payment_count": 1,
+                    "course_title": {"$ifNull": [{"$arrayElemAt": ["$course.title", 0]}, "Unknown Course"]}
+                }}
+            ]
+        
+        if not facets:
+            return {}
+        
+        pipeline: List[Dict[str, Any]] = [{"$match": match}] if match else []
+        pipeline.append({"$facet": facets})
+        results = await Payment.get_motor_collection().aggregate(pipeline).to_list(1)
+        result = results[0] if results else {}
+        
+        response_data: Dict[str, Any] = {}
+        
+        if "summary" in facets:
+            by_status = {row["_id"]: row for row in result.get("by_status", [])}
+            by_type = {row["_id"]: row["count"] for row in result.get("by_type", [])}
+            summary = (result.get("summary") or [{}])[0]
+            
+            completed_row = by_status.get(completed, {})
+            completed_count = completed_row.get("count", 0)
+            total_revenue = completed_row.get("amount", 0)
+            avg_payment_value = total_revenue / completed_count if completed_count else 0
+            
+            response_data["summary"] = {
+                "revenue": {
+                    "total": round(total_revenue, 2),
+                    "this_month": round(summary.get("month_revenue", 0), 2),
+                    "average_payment": round(avg_payment_value, 2)
+                },
+                "payments": {
+                    "total_count": sum(row["count"] for row in by_status.values()),
+                    "by_status": {
+                        status.value: by_status.get(status.value, {}).get("count", 0)
+                        for status in PaymentStatus
+                    },
+                    "by_type": {
+                        "course_purchases": by_type.get(PaymentType.COURSE_PURCHASE.value, 0),
+                        "subscriptions": by_type.get(PaymentType.SUBSCRIPTION.value, 0)
+                    }
+                },
+                "subscriptions": {
+                    "active_count": summary.get("active_subscriptions", 0) if creator_id is None else 0
+                },
+                "period": {
+                    "from": month_start.isoformat(),
+                    "to": now.isoformat()
+                }
+            }
+        
+        if "daily" in facets:
+            daily = {row["_id"]: row for row in result.get("daily", [])}
+            revenue_trends = []
+            current_date = start_date
+            while current_date <= end_date:
+                day_key = current_date.strftime("%Y-%m-%d")
+                day = daily.get(day_key, {})
+                revenue_trends.append({
+                    "date": day_key,
+                    "revenue": round(day.get("revenue", 0), 2),
+                    "payment_count": day.get("payment_count", 0)
+                })
+                current_date += timedelta(days=1)
+            
+            range_by_status = {row["_id"]: row["count"] for row in result.get("range_by_status", [])}
+            total_payments = sum(range_by_status.values())
+            successful_payments = range_by_status.get(completed, 0)
+            success_rate = (successful_payments / total_payments * 100) if total_payments > 0 else 0
+            
+            range_by_type = {row["_id"]: row for row in result.get("range_by_type", [])}
+            course_purchases = range_by_type.get(PaymentType.COURSE_PURCHASE.value, {})
+            subscriptions = range_by_type.get(PaymentType.SUBSCRIPTION.value, {})
+            
+            response_data["trends"] = {
+                "period": {
+                    "start_date": start_date.strftime("%Y-%m-%d"),
+                    "end_date": end_date.strftime("%Y-%m-%d"),
+                    "days": days
+                },
+                "revenue_trends": revenue_trends,
+                "payment_stats": {
+                    "total_payments": total_payments,
+                    "successful": successful_payments,
+                    "failed": range_by_status.get(PaymentStatus.FAILED.value, 0),
+                    "pending": range_by_status.get(PaymentStatus.PENDING.value, 0),
+                    "success_rate": round(success_rate, 2)
+                },
+                "top_courses": [
+                    {
+                        "course_id": str(row["_id"]),
+                        "course_title": row["course_title"],
+                        "revenue": round(row["revenue"], 2),
+                        "payment_count": row["payment_count"]
+                    }
+                    for row in result.get("top_courses", [])
+                ],
+                "payment_types": {
+                    "course_purchases": {
+                        "count": course_purchases.get("count", 0),
+                        "revenue": round(course_purchases.get("revenue", 0), 2)
+                    },
+                    "subscriptions": {
+                        "count": subscriptions.get("count", 0),
+                        "revenue": round(subscriptions.get("revenue", 0), 2)
+                    }
+                }
+            }
+        
+        return response_data
+    
+    @staticmethod
+    async def _update_customer_subscription(customer_id: Optional[str], update: Dict[str, Any]) -> None:
+        """Apply subscription fields to the user owning a Stripe customer"""
+        if not customer_id:
+            return
+        user = await User.get_motor_collection().find_one_and_update(
+            {"subscription.stripe_customer_id": customer_id},
+            {"$set": {**update, "updated_at": datetime.utcnow()}},
+            projection={"_id": 1}
+        )
+        if user:
+            invalidate_user_cache(user["_id"])
+    
     @staticmethod
     async def handle_webhook_event(event: Dict[str, Any]) -> bool:
         """
@@ -445,34 +671,32 @@ class PaymentService:
             if event_type == "payment_intent.succeeded":
                 # Handle successful payment
                 payment_intent_id = event_data.get("id")
-                await PaymentService.handle_payment_success(payment_intent_id)
+                return await PaymentService.handle_payment_success(payment_intent_id)
                 
-            elif event_type == "subscription.created" or event_type == "subscription.updated":
-                # Update subscription status
-                subscription_id = event_data.get("id")
+            elif event_type in (
+                "customer.subscription.created", "customer.subscription.updated",
+                "subscription.created", "subscription.updated"
+            ):
+                # Update subscription status (single write, no user load)
                 customer_id = event_data.get("customer")
-                status = event_data.get("status")
-                
-                # Find user by customer ID
-                user = await User.find_one({"subscription.stripe_customer_id": customer_id})
-                if user:
-                    user.subscription["status"] = status
-                    user.subscription["current_period_start"] = datetime.fromtimestamp(
-                        event_data.get("current_period_start")
+                update = {"subscription.status": event_data.get("status")}
+                if event_data.get("current_period_start"):
+                    update["subscription.current_period_start"] = datetime.fromtimestamp(
+                        event_data["current_period_start"]
                     )
-                    user.subscription["current_period_end"] = datetime.fromtimestamp(
-                        event_data.get("current_period_end")
+                if event_data.get("current_period_end"):
+                    update["subscription.current_period_end"] = datetime.fromtimestamp(
+                        event_data["current_period_end"]
                     )
-                    await user.save()
+                await PaymentService._update_customer_subscription(customer_id, update)
                     
-            elif event_type == "subscription.deleted":
+            elif event_type in ("customer.subscription.deleted", "subscription.deleted"):
                 # Handle subscription cancellation
                 customer_id = event_data.get("customer")
-                user = await User.find_one({"subscription.stripe_customer_id": customer_id})
-                if user:
-                    user.subscription["status"] = SubscriptionStatus.CANCELLED
-                    user.subscription["type"] = SubscriptionType.FREE
-                    await user.save()
+                await PaymentService._update_customer_subscription(customer_id, {
+                    "subscription.status": SubscriptionStatus.CANCELLED.value,
+                    "subscription.type": SubscriptionType.FREE.value
+                })
                     
             return True
             
@@ -515,7 +739,8 @@ class PaymentService:
             refund_amount = amount or payment.amount
             
             if payment.provider == PaymentProvider.STRIPE and payment.provider_payment_id:
-                refund = stripe.Refund.create(
+                refund = await payment_provider.create_refund(
+                    idempotency_key=f"refund-{payment.id}",
                     payment_intent=payment.provider_payment_id,
                     amount=int(refund_amount * 100),  # Convert to cents
                     reason="requested_by_customer",
@@ -534,6 +759,8 @@ class PaymentService:
                 payment.metadata["refund_reason"] = reason
                 payment.metadata["refunded_by"] = str(admin.id)
                 await payment.save()
+                if payment.course_id:
+                    await analytics_rollup_service.record(payment.course_id, payment.created_at, revenue=-payment.amount)
                 
                 # Cancel enrollment if it was a course purchase
                 if payment.type == PaymentType.COURSE_PURCHASE and payment.course_id:
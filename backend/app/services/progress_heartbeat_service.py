@@ -0,0 +1,205 @@
+"""
+Video progress heartbeat buffer.
+The player reports its position every few seconds per viewer. After the first
+(fully validated) update for a (user, lesson), later heartbeats are merged in
+process and written every PROGRESS_HEARTBEAT_FLUSH_INTERVAL seconds with one
+bulk write: $max on watch_percentage, $set on position, $inc on watch time.
+Crossing the completion threshold always goes through the synchronous path
+in ProgressService, so unlocks, completion and certificates are unchanged.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError
+
+from app.core.atomic import AtomicUpdate, bulk_update
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.enrollment import Enrollment
+from app.models.progress import Progress
+
+logger = logging.getLogger(__name__)
+
+# Watch percentage at which a lesson video counts as completed
+COMPLETION_THRESHOLD = 95
+
+
+class ProgressHeartbeatService:
+    """Coalesces video progress heartbeats per (user, lesson)"""
+
+    def __init__(self):
+        # Validated progress documents (enrollment checked) that heartbeats may update
+        self._tracked = LRUCache(
+            maxsize=settings.PROGRESS_HEARTBEAT_TRACKED_SIZE,
+            ttl=settings.PROGRESS_HEARTBEAT_TRACKED_TTL
+        )
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PROGRESS_HEARTBEAT_FLUSH_INTERVAL > 0
+
+    def get_tracked(self, lesson_id: str, user_id: str) -> Optional[Progress]:
+        """Progress document a buffered heartbeat can be applied to, if any"""
+        if not self.enabled:
+            return None
+        return self._tracked.get((user_id, lesson_id))
+
+    def track(self, progress: Progress) -> None:
+        """Remember a progress document saved by the synchronous path"""
+        if self.enabled and progress.id:
+            self._tracked.set((progress.user_id, progress.lesson_id), progress)
+
+    def take_pending(self, lesson_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return buffered values so the synchronous path can merge them"""
+        return self._pending.pop((user_id, lesson_id), None)
+
+    def record(self, progress: Progress, watch_percentage: float, current_position: float) -> Progress:
+        """
+        Buffer one heartbeat and apply it to the tracked document, which is
+        returned as the response view of the lesson progress.
+        """
+        now = datetime.now(timezone.utc)
+        video = progress.video_progress
+        video.watch_percentage = max(video.watch_percentage, watch_percentage)
+        video.current_position = current_position
+        video.total_watch_time += 1  # Increment by 1 second
+        progress.last_accessed = now
+
+        entry = self._pending.setdefault((progress.user_id, progress.lesson_id), {
+            "progress_id": progress.id,
+            "course_id": progress.course_id,
+            "watch_percentage": 0.0,
+            "watch_seconds": 0
+        })
+        entry["watch_percentage"] = max(entry["watch_percentage"], watch_percentage)
+        entry["current_position"] = current_position
+        entry["watch_seconds"] += 1
+        entry["last_accessed"] = now
+
+        if len(self._pending) >= settings.PROGRESS_HEARTBEAT_MAX_PENDING:
+            self._schedule_flush()
+        return progress
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Write buffered heartbeats. Returns the number of lessons written."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            failed = await self._write_progress(pending)
+            if failed:
+                # Merge back only what did not apply (re-running a landed $inc
+                # would double count watch time); newer heartbeats win on position
+                for key, entry in failed.items():
+                    newer = self._pending.get(key)
+                    if newer is None:
+                        self._pending[key] = entry
+                    else:
+                        newer["watch_percentage"] = max(newer["watch_percentage"], entry["watch_percentage"])
+                        newer["watch_seconds"] += entry["watch_seconds"]
+                pending = {key: entry for key, entry in pending.items() if key not in failed}
+                if not pending:
+                    return 0
+
+        await self._write_enrollments(pending)
+        await self._refresh_enrollments(pending)
+        return len(pending)
+
+    async def _write_progress(
+        self,
+        pending: Dict[Tuple[str, str], Dict[str, Any]]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Bulk-write heartbeats to Progress. Returns the entries that were not applied."""
+        now = datetime.now(timezone.utc)
+        keys = list(pending)
+        progress_operations = [
+            AtomicUpdate()
+            .max("video_progress.watch_percentage", pending[key]["watch_percentage"])
+            .set("video_progress.current_position", pending[key]["current_position"])
+            .inc("video_progress.total_watch_time", pending[key]["watch_seconds"])
+            .set("last_accessed", pending[key]["last_accessed"])
+            .set("updated_at", now)
+            .as_operation({"_id": pending[key]["progress_id"]})
+            for key in keys
+        ]
+        try:
+            await bulk_update(Progress, progress_operations)
+        except BulkWriteError as e:
+            # Unordered: everything except the reported operations was applied
+            errors = e.details.get("writeErrors", [])
+            logger.error(f"Progress heartbeat flush failed for {len(errors)} of {len(keys)} lessons: {e}")
+            return {keys[error["index"]]: pending[keys[error["index"]]] for error in errors}
+        except Exception as e:
+            # No per-operation result - nothing is known to have applied
+            logger.error(f"Progress heartbeat flush failed: {e}")
+            return pending
+        return {}
+
+    async def _write_enrollments(self, pending: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        """Point each affected enrollment at its latest lesson (best effort)"""
+        # Latest lesson per enrollment becomes its "continue" lesson
+        latest: Dict[Tuple[str, str], Tuple[str, datetime]] = {}
+        for (user_id, lesson_id), entry in pending.items():
+            key = (user_id, entry["course_id"])
+            if key not in latest or entry["last_accessed"] > latest[key][1]:
+                latest[key] = (lesson_id, entry["last_accessed"])
+        enrollment_operations = [
+            AtomicUpdate()
+            .set("progress.current_lesson_id", lesson_id)
+            .set("last_accessed", last_accessed)
+            .as_operation({"user_id": user_id, "course_id": course_id, "is_active": True})
+            for (user_id, course_id), (lesson_id, last_accessed) in latest.items()
+        ]
+        try:
+            await bulk_update(Enrollment, enrollment_operations)
+        except Exception as e:
+            logger.error(f"Failed to update enrollments after heartbeat flush: {e}")
+
+    async def _refresh_enrollments(self, pending: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        """Recompute weighted course completion once per affected enrollment"""
+        from app.services.progress_service import progress_service
+        pairs: List[Tuple[str, str]] = [(entry["course_id"], user_id) for (user_id, _), entry in pending.items()]
+        try:
+            await progress_service.calculate_course_completions(pairs)
+        except Exception as e:
+            logger.error(f"Failed to refresh enrollment progress after heartbeat flush: {e}")
+
+    def start(self) -> None:
+        """Start periodic flushing when buffering is enabled"""
+        if self.enabled and self._scheduler_task is None:
+            self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write what is left"""
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+        await self.flush()
+
+    async def _run_scheduler(self) -> None:
+        while True:
+            await asyncio.sleep(settings.PROGRESS_HEARTBEAT_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Progress heartbeat flush error: {e}")
+
+
+# Global heartbeat buffer instance
+progress_heartbeat_service = ProgressHeartbeatService()
@@ -1,10 +1,15 @@
 from datetime import datetime, timezone
-from typing import Optional, List
+from typing import Optional, List, Dict, Set, Tuple
 from bson import ObjectId
+from pymongo import UpdateOne
 from app.models.progress import Progress, VideoProgress
 from app.models.lesson import Lesson
 from app.models.enrollment import Enrollment
+from app.core.atomic import AtomicUpdate, bulk_update, find_one_and_update, id_filter, update_one
 from app.core.exceptions import NotFoundError, ForbiddenError
+from app.services.course_manifest_service import course_manifest_service
+from app.services.analytics_rollup_service import analytics_rollup_service
+from app.services.progress_heartbeat_service import progress_heartbeat_service, COMPLETION_THRESHOLD
 
 class ProgressService:
     
@@ -22,8 +27,20 @@ class ProgressService:
         user_id: str, 
         watch_percentage: float,
         current_position: float
-    ) -> Progress:
-        """Update video watching progress for a lesson."""
+    ) -> Tuple[Progress, bool]:
+        """
+        Update video watching progress for a lesson.
+        Steady-state heartbeats for a lesson already validated by this worker are
+        buffered and bulk-written; the first update and the completion crossing
+        take the full path below.
+        Returns the progress and whether this call completed the lesson.
+        """
+        tracked = progress_heartbeat_service.get_tracked(lesson_id, user_id)
+        if tracked and (tracked.video_progress.is_completed or watch_percentage < COMPLETION_THRESHOLD):
+            progress = progress_heartbeat_service.record(tracked, watch_percentage, current_position)
+            await analytics_rollup_service.record(progress.course_id, watch_time_seconds=1)
+            return progress, False
+        
         # Check if lesson exists
         lesson = await Lesson.get(lesson_id)
         if not lesson:
@@ -38,52 +55,77 @@ class ProgressService:
         if not enrollment:
             raise ForbiddenError("User is not enrolled in this course")
         
-        # Get or create progress record
-        progress = await Progress.find_one({
-            "lesson_id": lesson_id,
-            "user_id": user_id
-        })
-        
-        if not progress:
-            progress = Progress(
-                user_id=user_id,
-                course_id=str(lesson.course_id),
-                lesson_id=lesson_id,
-                started_at=datetime.now(timezone.utc)
+        # Fold in heartbeats still waiting in the buffer
+        pending = progress_heartbeat_service.take_pending(lesson_id, user_id) or {}
+        now = datetime.now(timezone.utc)
+        
+        # Update or create the progress record in one write
+        # $max: only update percentage if it's higher than current (prevent going backwards)
+        # $set: always update current position (allow rewind)
+        progress = await find_one_and_update(
+            Progress,
+            {"lesson_id": lesson_id, "user_id": user_id},
+            AtomicUpdate()
+            .max("video_progress.watch_percentage", max(watch_percentage, pending.get("watch_percentage", 0.0)))
+            .set("video_progress.current_position", current_position)
+            .inc("video_progress.total_watch_time", 1 + pending.get("watch_seconds", 0))  # 1 second per heartbeat
+            .set("last_accessed", now)
+            .set("updated_at", now)
+            .set_on_insert("user_id", user_id)
+            .set_on_insert("course_id", str(lesson.course_id))
+            .set_on_insert("lesson_id", lesson_id)
+            .set_on_insert("video_progress.is_completed", False)
+            .set_on_insert("video_progress.completed_at", None)
+            .set_on_insert("quiz_progress", None)
+            .set_on_insert("is_unlocked", True)
+            .set_on_insert("is_completed", False)
+            .set_on_insert("started_at", now)
+            .set_on_insert("completed_at", None)
+            .set_on_insert("created_at", now),
+            upsert=True
+        )
+        
+        # Check if completed (95% threshold) - the guarded update wins exactly once
+        just_completed = False
+        if watch_percentage >= COMPLETION_THRESHOLD and not progress.video_progress.is_completed:
+            completed = await find_one_and_update(
+                Progress,
+                {"_id": progress.id, "video_progress.is_completed": {"$ne": True}},
+                AtomicUpdate().set_many({
+                    "video_progress.is_completed": True,
+                    "video_progress.completed_at": now,
+                    "is_completed": True,
+                    "completed_at": now
+                })
             )
-        
-        # Update video progress - PROTECT AGAINST RESET
-        # Only update percentage if it's higher than current (prevent going backwards)
-        if watch_percentage > progress.video_progress.watch_percentage:
-            progress.video_progress.watch_percentage = watch_percentage
-        
-        # Always update current position (allow rewind)
-        progress.video_progress.current_position = current_position
-        progress.video_progress.total_watch_time += 1  # Increment by 1 second
-        
-        # Check if completed (95% threshold)
-        if watch_percentage >= 95 and not progress.video_progress.is_completed:
-            progress.video_progress.is_completed = True
-            progress.video_progress.completed_at = datetime.now(timezone.utc)
-            progress.is_completed = True
-            progress.completed_at = datetime.now(timezone.utc)
-            
-            # Unlock next lesson
-            await self._unlock_next_lesson(lesson, user_id)
+            if completed:
+                progress = completed
+                just_completed = True
+                
+                # Unlock next lesson
+                await self._unlock_next_lesson(lesson, user_id)
         
         # Update enrollment's current lesson to ensure consistency
         # This ensures the Continue button works correctly everywhere
-        enrollment.progress.current_lesson_id = lesson_id
-        enrollment.last_accessed = datetime.now(timezone.utc)
-        await enrollment.save()
+        await update_one(
+            Enrollment,
+            {"_id": enrollment.id},
+            AtomicUpdate().set("progress.current_lesson_id", lesson_id).set("last_accessed", now)
+        )
         
         # Always update enrollment progress for real-time updates
-        await self._update_enrollment_progress(enrollment.id, str(lesson.course_id))
+        await self.calculate_course_completion(str(lesson.course_id), user_id)
         
-        progress.last_accessed = datetime.now(timezone.utc)
-        await progress.save()
+        progress_heartbeat_service.track(progress)
         
-        return progress
+        # Daily analytics counters
+        await analytics_rollup_service.record(
+            progress.course_id,
+            watch_time_seconds=1,
+            lessons_completed=1 if just_completed else 0
+        )
+        
+        return progress, just_completed
     
     async def start_lesson(self, lesson_id: str, user_id: str) -> Progress:
         """Start a lesson and create initial progress record."""
@@ -138,6 +180,9 @@ class ProgressService:
         if progress.video_progress.watch_percentage < 95:
             raise ForbiddenError("Watch at least 95% of the video to complete the lesson")
         
+        if not progress.video_progress.is_completed:
+            await analytics_rollup_service.record(progress.course_id, lessons_completed=1)
+        
         progress.is_completed = True
         progress.completed_at = datetime.now(timezone.utc)
         progress.video_progress.is_completed = True
@@ -176,41 +221,94 @@ class ProgressService:
     
     async def calculate_course_completion(self, course_id: str, user_id: str) -> dict:
         """Calculate course completion percentage using weighted average of lesson progress."""
-        # Get lessons through chapters to match UI display
-        from app.models.chapter import Chapter
+        results = await self.calculate_course_completions([(str(course_id), user_id)])
+        return results[(str(course_id), user_id)]
+    
+    async def calculate_course_completions(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+        """
+        Bulk form of calculate_course_completion for many (course_id, user_id) pairs.
+        Uses cached course manifests, one Progress aggregation and one Enrollment
+        query in total, then updates each matching enrollment.
+        Returns a dictionary mapping (course_id, user_id) to completion data.
+        """
+        pairs = list(dict.fromkeys((str(course_id), str(user_id)) for course_id, user_id in pairs))
+        if not pairs:
+            return {}
         
         # ULTRATHINK: Chapters được ưu tiên cao nhất! 
-        # Chỉ lấy PUBLISHED chapters trước, sau đó mới lấy PUBLISHED lessons
-        
-        # Get only PUBLISHED chapters for this course
-        # IMPORTANT: Convert course_id to ObjectId for MongoDB query
-        from beanie import PydanticObjectId
-        course_obj_id = PydanticObjectId(course_id) if isinstance(course_id, str) else course_id
-        
-        chapters = await Chapter.find({
-            "course_id": course_obj_id, 
-            "status": "published"
-        }).sort([("order", 1)]).to_list()
-        
-        if not chapters:
-            return {
-                "total_lessons": 0,
-                "completed_lessons": 0,
-                "completion_percentage": 0.0,
-                "is_completed": False
-            }
+        # Only PUBLISHED lessons from PUBLISHED chapters count, matching UI display
+        manifests = await self._get_published_lesson_ids({course_id for course_id, _ in pairs})
+        
+        # One aggregation for every (user, lesson) progress record we need
+        user_ids = list({user_id for _, user_id in pairs})
+        lesson_ids = list({lesson_id for ids in manifests.values() for lesson_id in ids})
+        progress_map: Dict[Tuple[str, str], dict] = {}
+        if lesson_ids:
+            progress_docs = await Progress.aggregate([
+                {"$match": {
+                    "user_id": {"$in": user_ids},
+                    "lesson_id": {"$in": lesson_ids}
+                }},
+                {"$group": {
+                    "_id": {"user_id": "$user_id", "lesson_id": "$lesson_id"},
+                    "is_completed": {"$first": "$is_completed"},
+                    "watch_percentage": {"$first": "$video_progress.watch_percentage"},
+                    "total_watch_time": {"$first": "$video_progress.total_watch_time"}
+                }}
+            ]).to_list(None)
+            for doc in progress_docs:
+                progress_map[(doc["_id"]["user_id"], doc["_id"]["lesson_id"])] = doc
+        
+        # One query for the enrollments to update
+        enrollments = await Enrollment.find({
+            "$or": [{"course_id": course_id, "user_id": user_id} for course_id, user_id in pairs]
+        }).to_list()
+        enrollment_map = {}
+        for enrollment in enrollments:
+            enrollment_map.setdefault((enrollment.course_id, enrollment.user_id), enrollment)
+        
+        results = {}
+        operations = []
+        newly_completed = []
+        for course_id, user_id in pairs:
+            completion_data, total_watch_time_seconds = self._compute_completion(
+                manifests.get(course_id, []), user_id, progress_map
+            )
+            results[(course_id, user_id)] = completion_data
+            
+            enrollment = enrollment_map.get((course_id, user_id))
+            if enrollment:
+                operation = self._apply_completion_to_enrollment(
+                    enrollment, completion_data, total_watch_time_seconds
+                )
+                if operation:
+                    operations.append(operation)
+                if completion_data["is_completed"] and not enrollment.progress.completed_at:
+                    newly_completed.append(enrollment)
         
-        # Get only PUBLISHED lessons from PUBLISHED chapters
-        lessons = []
-        for chapter in chapters:
-            # IMPORTANT: chapter_id in Lesson is also PydanticObjectId
-            chapter_lessons = await Lesson.find({
-                "chapter_id": chapter.id,  # Use ObjectId directly, not string
-                "status": "published"
-            }).sort([("order", 1)]).to_list()
-            lessons.extend(chapter_lessons)
+        # One bulk write for every enrollment whose values changed
+        await bulk_update(Enrollment, operations)
+        for enrollment in newly_completed:
+            await self._record_enrollment_completion(enrollment)
         
-        total_lessons = len(lessons)
+        return results
+    
+    async def _get_published_lesson_ids(self, course_ids: Set[str]) -> Dict[str, List[str]]:
+        """Get ordered published lesson ids from published chapters, per course."""
+        manifests = await course_manifest_service.get_manifests(course_ids)
+        return {
+            course_id: course_manifest_service.get_published_lesson_ids(manifest)
+            for course_id, manifest in manifests.items()
+        }
+    
+    @staticmethod
+    def _compute_completion(
+        lesson_ids: List[str],
+        user_id: str,
+        progress_map: Dict[Tuple[str, str], dict]
+    ) -> Tuple[dict, float]:
+        """Weighted completion for one user over one lesson manifest."""
+        total_lessons = len(lesson_ids)
         
         if total_lessons == 0:
             return {
@@ -218,76 +316,94 @@ class ProgressService:
                 "completed_lessons": 0,
                 "completion_percentage": 0.0,
                 "is_completed": False
-            }
+            }, 0.0
         
-        # Calculate weighted average completion percentage
         total_progress = 0.0
         completed_lessons = 0
         total_watch_time_seconds = 0.0  # Track total watch time across all lessons
         
-        for lesson in lessons:
-            lesson_id = str(lesson.id)
+        for lesson_id in lesson_ids:
+            progress = progress_map.get((user_id, lesson_id))
             
-            # Get progress for this lesson
-            progress = await Progress.find_one({
-                "lesson_id": lesson_id,
-                "user_id": user_id
-            })
+            # No progress record = 0% for this lesson
+            if not progress:
+                continue
             
-            if progress:
-                # Completed lessons count as 100% (not actual watch_percentage) to avoid float rounding issues
-                if progress.is_completed:
-                    total_progress += 100.0
-                    completed_lessons += 1
-                else:
-                    total_progress += progress.video_progress.watch_percentage
-
-                # Accumulate watch time (in seconds)
-                total_watch_time_seconds += progress.video_progress.total_watch_time
+            # Completed lessons count as 100% (not actual watch_percentage) to avoid float rounding issues
+            if progress.get("is_completed"):
+                total_progress += 100.0
+                completed_lessons += 1
             else:
-                # No progress record = 0% for this lesson
-                total_progress += 0.0
-
+                total_progress += progress.get("watch_percentage") or 0.0
+            
+            # Accumulate watch time (in seconds)
+            total_watch_time_seconds += progress.get("total_watch_time") or 0.0
+        
         # Calculate weighted average completion percentage (rounded to 1 decimal)
-        completion_percentage = round(total_progress / total_lessons, 1) if total_lessons > 0 else 0.0
+        completion_percentage = round(total_progress / total_lessons, 1)
         # Use lessons_completed as primary check to avoid float rounding issues (e.g. 99.9 != 100)
-        is_completed = completed_lessons >= total_lessons and total_lessons > 0
-        
-        # Update enrollment progress
-        from app.models.enrollment import Enrollment
-        enrollment = await Enrollment.find_one({
-            "course_id": course_id,
-            "user_id": user_id
-        })
-        
-        if enrollment:
-            enrollment.progress.lessons_completed = completed_lessons
-            enrollment.progress.total_lessons = total_lessons
-            enrollment.progress.completion_percentage = completion_percentage
-            enrollment.progress.is_completed = is_completed
-            
-            # Convert total watch time from seconds to minutes and update enrollment
-            enrollment.progress.total_watch_time = round(total_watch_time_seconds / 60.0, 2)
-            
-            if is_completed and not enrollment.progress.completed_at:
-                enrollment.progress.completed_at = datetime.now(timezone.utc)
-                
-                # Update user stats
-                from app.models.user import User
-                user = await User.get(user_id)
-                if user:
-                    user.stats.courses_completed += 1
-                    user.stats.certificates_earned += 1
-                    await user.save()
-            
-            await enrollment.save()
+        is_completed = completed_lessons >= total_lessons
         
         return {
             "total_lessons": total_lessons,
             "completed_lessons": completed_lessons,
-            "completion_percentage": round(completion_percentage, 1),
+            "completion_percentage": completion_percentage,
             "is_completed": is_completed
+        }, total_watch_time_seconds
+    
+    @staticmethod
+    def _apply_completion_to_enrollment(
+        enrollment: Enrollment,
+        completion_data: dict,
+        total_watch_time_seconds: float
+    ) -> Optional[UpdateOne]:
+        """
+        Apply computed completion data to an enrollment.
+        Returns the update operation to persist it, or None if nothing changed.
+        """
+        progress = enrollment.progress
+        values = {
+            "lessons_completed": completion_data["completed_lessons"],
+            "total_lessons": completion_data["total_lessons"],
+            "completion_percentage": completion_data["completion_percentage"],
+            "is_completed": completion_data["is_completed"],
+            # Convert total watch time from seconds to minutes
+            "total_watch_time": round(total_watch_time_seconds / 60.0, 2)
         }
+        if all(getattr(progress, field) == value for field, value in values.items()):
+            return None
+        
+        now = datetime.now(timezone.utc)
+        for field, value in values.items():
+            setattr(progress, field, value)
+        enrollment.updated_at = now
+        
+        return (
+            AtomicUpdate()
+            .set_many({f"progress.{field}": value for field, value in values.items()})
+            .set("updated_at", now)
+            .as_operation({"_id": enrollment.id})
+        )
+    
+    async def _record_enrollment_completion(self, enrollment: Enrollment) -> None:
+        """Stamp completed_at; guarded so concurrent recomputes count the completion once"""
+        now = datetime.now(timezone.utc)
+        first_completion = await update_one(
+            Enrollment,
+            {"_id": enrollment.id, "progress.completed_at": None},
+            AtomicUpdate().set("progress.completed_at", now)
+        )
+        enrollment.progress.completed_at = now
+        if first_completion:
+            await analytics_rollup_service.record(enrollment.course_id, now, completions=1)
+            
+            # Update user stats
+            from app.models.user import User
+            await update_one(
+                User,
+                id_filter(enrollment.user_id),
+                AtomicUpdate().inc("stats.courses_completed").inc("stats.certificates_earned")
+            )
     
     async def get_user_learning_stats(self, user_id: str) -> dict:
         """Get overall learning statistics for a user."""
@@ -321,14 +437,12 @@ class ProgressService:
             return True
         
         # Check if previous lesson in the same chapter is completed
-        prev_lesson = await Lesson.find_one({
-            "chapter_id": lesson.chapter_id,
-            "order": lesson.order - 1
-        })
+        manifest = await course_manifest_service.get_manifest(str(lesson.course_id))
+        prev_lesson_id = course_manifest_service.get_previous_lesson_id(manifest, str(lesson.id))
         
-        if prev_lesson:
+        if prev_lesson_id and manifest["lessons"][prev_lesson_id]["chapter_id"] == str(lesson.chapter_id):
             prev_progress = await Progress.find_one({
-                "lesson_id": str(prev_lesson.id),
+                "lesson_id": prev_lesson_id,
                 "user_id": user_id
             })
             
@@ -347,44 +461,22 @@ class ProgressService:
         if course and not course.sequential_learning_enabled:
             return
 
-        # First, try to find next lesson in the same chapter
-        next_lesson = await Lesson.find_one({
-            "chapter_id": current_lesson.chapter_id,
-            "order": current_lesson.order + 1
-        })
+        # Next lesson in course order (same chapter, or first lesson of next chapter)
+        manifest = await course_manifest_service.get_manifest(str(current_lesson.course_id))
+        next_lesson_id = course_manifest_service.get_next_lesson_id(manifest, str(current_lesson.id))
         
-        # If no next lesson in current chapter, find first lesson of next chapter
-        if not next_lesson:
-            from app.models.chapter import Chapter
-            
-            # Get current chapter
-            current_chapter = await Chapter.get(current_lesson.chapter_id)
-            if current_chapter:
-                # Find next chapter
-                next_chapter = await Chapter.find_one({
-                    "course_id": current_chapter.course_id,
-                    "order": current_chapter.order + 1
-                })
-                
-                if next_chapter:
-                    # Get first lesson of next chapter
-                    next_lesson = await Lesson.find_one({
-                        "chapter_id": str(next_chapter.id),
-                        "order": 1
-                    })
-        
-        if next_lesson:
+        if next_lesson_id:
             # Create progress record for next lesson if it doesn't exist
             progress = await Progress.find_one({
-                "lesson_id": str(next_lesson.id),
+                "lesson_id": next_lesson_id,
                 "user_id": user_id
             })
             
             if not progress:
                 progress = Progress(
                     user_id=user_id,
-                    course_id=str(next_lesson.course_id),
-                    lesson_id=str(next_lesson.id),
+                    course_id=str(current_lesson.course_id),
+                    lesson_id=next_lesson_id,
                     is_unlocked=True
                 )
                 await progress.save()
@@ -399,21 +491,8 @@ class ProgressService:
         if not enrollment:
             return
         
-        # Use the same weighted calculation as calculate_course_completion
-        completion_data = await self.calculate_course_completion(course_id, enrollment.user_id)
-        
-        # Update enrollment progress with weighted data
-        enrollment.progress.total_lessons = completion_data["total_lessons"]
-        enrollment.progress.lessons_completed = completion_data["completed_lessons"]
-        enrollment.progress.completion_percentage = completion_data["completion_percentage"]
-        enrollment.progress.is_completed = completion_data["is_completed"]
-        
-        # Set completion timestamp if completed
-        if completion_data["is_completed"] and not enrollment.progress.completed_at:
-            enrollment.progress.completed_at = datetime.now(timezone.utc)
-        
-        enrollment.updated_at = datetime.now(timezone.utc)
-        await enrollment.save()
+        # calculate_course_completion persists the weighted data on the enrollment
+        await self.calculate_course_completion(course_id, enrollment.user_id)
     
     async def get_batch_lesson_progress(self, lesson_ids: List[str], user_id: str) -> List[dict]:
         """Get progress for multiple lessons in a single query."""
@@ -0,0 +1,147 @@
+"""
+Quiz analytics.
+Attempt statistics are computed inside MongoDB with one $facet aggregation over
+quiz_progress for a quiz or a whole course: per-quiz totals, a score histogram
+and per-question answer counts ($unwind of the answers array). Only the
+grouped rows come back, so the cost no longer grows with attempts loaded into
+Python; correctness and distractor counts are derived from those rows.
+"""
+from typing import Any, Dict, List, Tuple
+from collections import defaultdict
+
+from beanie import PydanticObjectId
+
+from app.models.quiz import Quiz, QuizProgress
+
+# Score histogram buckets of 10 points; 100 falls in the last one
+SCORE_BUCKETS = 10
+
+
+def _attempt_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    completed = {"is_completed": True}
+    return [
+        {"$match": match},
+        {"$facet": {
+            "summary": [
+                {"$group": {
+                    "_id": "$quiz_id",
+                    "total_users": {"$sum": 1},
+                    "total_completed": {"$sum": {"$cond": ["$is_completed", 1, 0]}},
+                    "passed_users": {"$sum": {"$cond": [{"$eq": ["$passed", True]}, 1, 0]}},
+                    # $avg skips the nulls of unfinished attempts
+                    "average_score": {"$avg": {"$cond": ["$is_completed", "$score", None]}}
+                }}
+            ],
+            "histogram": [
+                {"$match": {**completed, "score": {"$ne": None}}},
+                {"$group": {
+                    "_id": {
+                        "quiz_id": "$quiz_id",
+                        "bucket": {"$min": [{"$floor": {"$divide": ["$score", 100 / SCORE_BUCKETS]}}, SCORE_BUCKETS - 1]}
+                    },
+                    "count": {"$sum": 1}
+                }}
+            ],
+            "answers": [
+                {"$match": {**completed, "answers.0": {"$exists": True}}},
+                {"$unwind": {"path": "$answers", "includeArrayIndex": "question_index"}},
+                {"$group": {
+                    "_id": {"quiz_id": "$quiz_id", "question_index": "$question_index", "answer": "$answers"},
+                    "count": {"$sum": 1}
+                }}
+            ]
+        }}
+    ]
+
+
+def _score_distribution(buckets: Dict[int, int]) -> List[Dict[str, Any]]:
+    width = 100 // SCORE_BUCKETS
+    return [
+        {
+            "range": f"{i * width}-{100 if i == SCORE_BUCKETS - 1 else (i + 1) * width - 1}",
+            "count": buckets.get(i, 0)
+        }
+        for i in range(SCORE_BUCKETS)
+    ]
+
+
+def _question_statistics(quiz: Quiz, answer_counts: Dict[Tuple[int, int], int]) -> List[Dict[str, Any]]:
+    stats = []
+    for i, question in enumerate(quiz.questions):
+        total_answered = sum(count for (index, _), count in answer_counts.items() if index == i)
+        correct_count = answer_counts.get((i, question.correct_answer), 0)
+        distribution = [
+            {
+                "option_index": option,
+                "option_text": text,
+                "is_correct": option == question.correct_answer,
+                "count": answer_counts.get((i, option), 0)
+            }
+            for option, text in enumerate(question.options)
+        ]
+        distractors = [d for d in distribution if not d["is_correct"] and d["count"] > 0]
+
+        stats.append({
+            "question_index": i,
+            "question_text": question.question,
+            "type": question.type,
+            "total_answered": total_answered,
+            "correct_count": correct_count,
+            "success_rate": (correct_count / total_answered * 100) if total_answered > 0 else 0,
+            "answer_distribution": distribution,
+            "top_distractor": max(distractors, key=lambda d: d["count"])["option_index"] if distractors else None
+        })
+    return stats
+
+
+class QuizAnalyticsService:
+    """Aggregation-based quiz and course quiz analytics"""
+
+    async def _aggregate(self, quizzes: List[Quiz], match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Analytics for each quiz from a single pass over the matching attempts"""
+        rows = await QuizProgress.aggregate(_attempt_pipeline(match)).to_list(None)
+        facets = rows[0] if rows else {}
+
+        summaries = {row["_id"]: row for row in facets.get("summary", [])}
+        histograms: Dict[Any, Dict[int, int]] = defaultdict(dict)
+        for row in facets.get("histogram", []):
+            histograms[row["_id"]["quiz_id"]][int(row["_id"]["bucket"])] = row["count"]
+        answers: Dict[Any, Dict[Tuple[int, int], int]] = defaultdict(dict)
+        for row in facets.get("answers", []):
+            key = row["_id"]
+            answers[key["quiz_id"]][(key["question_index"], key["answer"])] = row["count"]
+
+        results = []
+        for quiz in quizzes:
+            summary = summaries.get(quiz.id, {})
+            total_users = summary.get("total_users", 0)
+            total_completed = summary.get("total_completed", 0)
+            passed_users = summary.get("passed_users", 0)
+            results.append({
+                "quiz_id": str(quiz.id),
+                "quiz_title": quiz.title,
+                "total_users": total_users,
+                "total_completed": total_completed,
+                "passed_users": passed_users,
+                "completion_rate": (total_completed / total_users * 100) if total_users > 0 else 0,
+                "pass_rate": (passed_users / total_completed * 100) if total_completed > 0 else 0,
+                "average_score": round(summary.get("average_score") or 0, 2),
+                "score_distribution": _score_distribution(histograms.get(quiz.id, {})),
+                "question_statistics": _question_statistics(quiz, answers.get(quiz.id, {}))
+            })
+        return results
+
+    async def get_quiz_analytics(self, quiz: Quiz) -> Dict[str, Any]:
+        results = await self._aggregate([quiz], {"quiz_id": quiz.id})
+        return results[0]
+
+    async def get_course_analytics(self, course_id: PydanticObjectId) -> List[Dict[str, Any]]:
+        """Analytics for every quiz in the course (empty if it has none)"""
+        quizzes = await Quiz.find(Quiz.course_id == course_id).to_list()
+        if not quizzes:
+            return []
+        return await self._aggregate(quizzes, {"course_id": course_id})
+
+
+# Global quiz analytics instance
+quiz_analytics_service = QuizAnalyticsService()
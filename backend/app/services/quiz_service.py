@@ -14,6 +14,8 @@ from app.schemas.quiz import (
     QuizAnswerSubmit, QuizAttemptResult, QuizProgressResponse, QuizProgressSave
 )
 from app.core.exceptions import NotFoundError, ForbiddenError, BadRequestError
+from app.services.analytics_rollup_service import analytics_rollup_service
+from app.services.quiz_analytics_service import quiz_analytics_service
 
 
 class QuizService:
@@ -250,6 +252,12 @@ class QuizService:
         progress.completed_at = datetime.utcnow()
         
         await progress.save()
+        await analytics_rollup_service.record(
+            quiz.course_id,
+            progress.completed_at,
+            quiz_attempts=1,
+            quizzes_passed=1 if passed else 0
+        )
         
         # Update lesson progress if passed
         if passed:
@@ -435,83 +443,21 @@ class QuizService:
         if not quiz:
             raise NotFoundError("Quiz not found")
         
-        # Ensure questions are dictionaries
-        if quiz.questions and not isinstance(quiz.questions[0], dict):
-            quiz.questions = [q.dict() if hasattr(q, 'dict') else q for q in quiz.questions]
-        
-        # Get all quiz progress for this quiz
-        all_progress = await QuizProgress.find(
-            QuizProgress.quiz_id == quiz_id
-        ).to_list()
-        
-        # Calculate analytics
-        total_users = len(all_progress)
-        total_completed = len([p for p in all_progress if p.is_completed])
-        passed_users = len([p for p in all_progress if p.passed])
-        
-        # Calculate average score from completed quizzes
-        completed_scores = [p.score for p in all_progress if p.is_completed and p.score is not None]
-        avg_score = sum(completed_scores) / len(completed_scores) if completed_scores else 0
-        
-        # Question-level statistics
-        question_stats = []
-        for i, question in enumerate(quiz.questions):
-            correct_count = 0
-            total_answered = 0
-            
-            for progress in all_progress:
-                if progress.is_completed and progress.answers and i < len(progress.answers):
-                    total_answered += 1
-                    if progress.answers[i] == question["correct_answer"]:
-                        correct_count += 1
-            
-            question_stats.append({
-                "question_index": i,
-                "question_text": question["question"],
-                "type": question.get("type", "multiple_choice"),
-                "total_answered": total_answered,
-                "correct_count": correct_count,
-                "success_rate": (correct_count / total_answered * 100) if total_answered > 0 else 0
-            })
-        
-        return {
-            "quiz_id": str(quiz_id),
-            "quiz_title": quiz.title,
-            "total_users": total_users,
-            "total_completed": total_completed,
-            "passed_users": passed_users,
-            "completion_rate": (total_completed / total_users * 100) if total_users > 0 else 0,
-            "pass_rate": (passed_users / total_completed * 100) if total_completed > 0 else 0,
-            "average_score": round(avg_score, 2),
-            "question_statistics": question_stats
-        }
+        return await quiz_analytics_service.get_quiz_analytics(quiz)
     
     @staticmethod
     async def get_course_quiz_analytics(course_id: PydanticObjectId) -> dict:
         """Get aggregated quiz analytics for a course."""
-        # Get all quizzes for the course
-        quizzes = await Quiz.find(
-            Quiz.course_id == course_id
-        ).to_list()
+        # One aggregation covers every quiz in the course
+        all_analytics = await quiz_analytics_service.get_course_analytics(course_id)
         
-        if not quizzes:
+        if not all_analytics:
             return {
                 "course_id": str(course_id),
                 "total_quizzes": 0,
                 "message": "No quizzes found for this course"
             }
         
-        # Aggregate analytics
-        total_quizzes = len(quizzes)
-        all_analytics = []
-        
-        for quiz in quizzes:
-            try:
-                quiz_analytics = await QuizService.get_quiz_analytics(quiz.id)
-                all_analytics.append(quiz_analytics)
-            except:
-                continue
-        
         # Calculate course-level statistics
         total_users = sum(a["total_users"] for a in all_analytics)
         total_completed = sum(a["total_completed"] for a in all_analytics)
@@ -520,7 +466,7 @@ class QuizService:
         
         return {
             "course_id": str(course_id),
-            "total_quizzes": total_quizzes,
+            "total_quizzes": len(all_analytics),
             "total_users_attempted": total_users,
             "total_completed": total_completed,
             "total_passed_users": total_passed,
@@ -532,7 +478,9 @@ class QuizService:
                     "quiz_id": a["quiz_id"],
                     "quiz_title": a["quiz_title"],
                     "pass_rate": a["pass_rate"],
-                    "average_score": a["average_score"]
+                    "average_score": a["average_score"],
+                    "score_distribution": a["score_distribution"],
+                    "question_statistics": a["question_statistics"]
                 }
                 for a in all_analytics
             ]
@@ -4,11 +4,14 @@ Review service for business logic
 from datetime import datetime
 from typing import List, Optional, Dict
 from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
 
 from app.models.review import Review, ReviewStatus, ReviewVote, ReviewReport
 from app.models.user import User
 from app.models.course import Course
 from app.models.enrollment import Enrollment
+from app.core.atomic import AtomicUpdate, find_one_and_update, id_filter, update_one
+from app.services.course_counter_service import course_counter_service
 from app.schemas.review import (
     ReviewCreateRequest,
     ReviewUpdateRequest,
@@ -18,6 +21,7 @@ from app.schemas.review import (
     ReviewModerationRequest,
     ReviewSearchQuery
 )
+from app.utils.pagination import keyset_sort, apply_cursor, paginate_results, count_documents
 
 
 class ReviewService:
@@ -71,7 +75,8 @@ class ReviewService:
         await review.insert()
         
         # Update course rating statistics
-        await self._update_course_stats(course_id)
+        if review.status == ReviewStatus.APPROVED:
+            await course_counter_service.apply_review_delta(course_id, 1, review.rating)
         
         return review
 
@@ -97,17 +102,18 @@ class ReviewService:
         if query.is_verified_purchase is not None:
             filter_dict["is_verified_purchase"] = query.is_verified_purchase
         
-        # Count total
-        total = await Review.find(filter_dict).count()
+        # Count total (cached across cursor pages)
+        total = await count_documents(Review.get_motor_collection(), filter_dict, cached=bool(query.cursor))
         
         # Sort
-        sort_field = query.sort_by
-        if query.sort_order == "desc":
-            sort_field = f"-{sort_field}"
+        sort = keyset_sort([(query.sort_by, -1 if query.sort_order == "desc" else 1)])
         
         # Fetch paginated results
-        skip = (query.page - 1) * query.per_page
-        reviews = await Review.find(filter_dict).sort(sort_field).skip(skip).limit(query.per_page).to_list()
+        reviews_query = Review.find(apply_cursor(filter_dict, sort, query.cursor)).sort(sort)
+        if not query.cursor:
+            reviews_query = reviews_query.skip((query.page - 1) * query.per_page)
+        reviews = await reviews_query.limit(query.per_page + 1).to_list()
+        reviews, next_cursor = paginate_results(reviews, query.per_page, sort)
         
         # Format reviews using _format_review to properly serialize PydanticObjectId
         review_dicts = [self._format_review(r) for r in reviews]
@@ -128,7 +134,7 @@ class ReviewService:
         
         # Get stats if requesting course reviews
         stats = None
-        if query.course_id and query.page == 1:
+        if query.course_id and query.page == 1 and not query.cursor:
             stats = await self.get_course_stats(query.course_id)
         
         return {
@@ -137,6 +143,7 @@ class ReviewService:
             "page": query.page,
             "per_page": query.per_page,
             "total_pages": (total + query.per_page - 1) // query.per_page,
+            "next_cursor": next_cursor,
             "stats": stats
         }
 
@@ -156,6 +163,7 @@ class ReviewService:
             raise ValueError("You can only edit your own reviews")
         
         # Update fields
+        old_rating = review.rating
         update_dict = update_data.dict(exclude_unset=True)
         for field, value in update_dict.items():
             if field != "edit_reason":
@@ -169,8 +177,8 @@ class ReviewService:
         await review.save()
         
         # Update course stats if rating changed
-        if "rating" in update_dict:
-            await self._update_course_stats(review.course_id)
+        if review.status == ReviewStatus.APPROVED and review.rating != old_rating:
+            await course_counter_service.apply_review_delta(review.course_id, 0, review.rating - old_rating)
         
         return review
 
@@ -188,11 +196,11 @@ class ReviewService:
         if str(review.user_id) != str(user.id) and user.role != "admin":
             raise ValueError("Unauthorized to delete this review")
         
-        course_id = review.course_id
         await review.delete()
         
         # Update course stats
-        await self._update_course_stats(course_id)
+        if review.status == ReviewStatus.APPROVED:
+            await course_counter_service.apply_review_delta(review.course_id, -1, -review.rating)
         
         return True
 
@@ -203,50 +211,53 @@ class ReviewService:
         vote_data: ReviewVoteRequest
     ) -> Review:
         """Vote on review helpfulness"""
-        review = await Review.get(review_id)
-        if not review:
-            raise ValueError("Review not found")
-        
         # Check if already voted
         existing_vote = await ReviewVote.find_one({
             "review_id": review_id,
             "user_id": str(user.id)
         })
         
+        # Counters only move once the guarded vote write succeeded,
+        # so a double-click can't count the same change twice
+        helpful_field = "helpful_count" if vote_data.is_helpful else "unhelpful_count"
+        update = AtomicUpdate()
         if existing_vote:
+            old_field = "helpful_count" if existing_vote.is_helpful else "unhelpful_count"
             if existing_vote.is_helpful == vote_data.is_helpful:
-                # Same vote - toggle OFF (remove vote)
-                if existing_vote.is_helpful:
-                    review.helpful_count = max(0, review.helpful_count - 1)
-                else:
-                    review.unhelpful_count = max(0, review.unhelpful_count - 1)
-                await existing_vote.delete()
-            else:
-                # Different vote - switch vote
-                if existing_vote.is_helpful:
-                    review.helpful_count = max(0, review.helpful_count - 1)
-                    review.unhelpful_count += 1
-                else:
-                    review.helpful_count += 1
-                    review.unhelpful_count = max(0, review.unhelpful_count - 1)
-
-                existing_vote.is_helpful = vote_data.is_helpful
-                await existing_vote.save()
+                # Same vote toggles OFF
+                result = await ReviewVote.get_motor_collection().delete_one({"_id": existing_vote.id})
+                if result.deleted_count:
+                    update.inc(old_field, -1)
+            elif await update_one(
+                ReviewVote,
+                {"_id": existing_vote.id, "is_helpful": existing_vote.is_helpful},
+                AtomicUpdate().set("is_helpful", vote_data.is_helpful)
+            ):
+                # A different vote switches
+                update.inc(old_field, -1).inc(helpful_field, 1)
         else:
+            if not await Review.get_motor_collection().find_one(id_filter(review_id), {"_id": 1}):
+                raise ValueError("Review not found")
+            
             # New vote
             vote = ReviewVote(
                 review_id=review_id,
                 user_id=str(user.id),
                 is_helpful=vote_data.is_helpful
             )
-            await vote.insert()
-            
-            if vote_data.is_helpful:
-                review.helpful_count += 1
-            else:
-                review.unhelpful_count += 1
+            try:
+                await vote.insert()
+                update.inc(helpful_field, 1)
+            except DuplicateKeyError:
+                pass  # A concurrent request created it and counted it
+        
+        if update:
+            review = await find_one_and_update(Review, id_filter(review_id), update)
+        else:
+            review = await Review.find_one(id_filter(review_id))
+        if not review:
+            raise ValueError("Review not found")
         
-        await review.save()
         return review
 
     async def report_review(
@@ -279,13 +290,12 @@ class ReviewService:
         await report.insert()
         
         # Increment report count
-        review.report_count += 1
+        review = await find_one_and_update(Review, {"_id": review.id}, AtomicUpdate().inc("report_count"))
         
         # Auto-flag if too many reports
-        if review.report_count >= 3:
-            review.status = ReviewStatus.FLAGGED
+        if review and review.report_count >= 3 and review.status != ReviewStatus.FLAGGED:
+            await self._set_status(review_id, ReviewStatus.FLAGGED)
         
-        await review.save()
         return True
 
     async def respond_to_review(
@@ -321,23 +331,51 @@ class ReviewService:
         if admin.role != "admin":
             raise ValueError("Only admins can moderate reviews")
         
-        review = await Review.get(review_id)
+        now = datetime.utcnow()
+        review = await self._set_status(review_id, moderation_data.status, {
+            "moderation_note": moderation_data.moderation_note,
+            "moderated_by": str(admin.id),
+            "moderated_at": now,
+            "updated_at": now
+        })
         if not review:
             raise ValueError("Review not found")
         
-        review.status = moderation_data.status
-        review.moderation_note = moderation_data.moderation_note
-        review.moderated_by = str(admin.id)
-        review.moderated_at = datetime.utcnow()
-        review.update_timestamps()
-        
-        await review.save()
-        
-        # Update course stats if status changed
-        if moderation_data.status != ReviewStatus.APPROVED:
-            await self._update_course_stats(review.course_id)
-        
         return review
+    
+    async def _set_status(
+        self,
+        review_id: str,
+        status: ReviewStatus,
+        fields: Optional[Dict] = None
+    ) -> Optional[Review]:
+        """
+        Change a review's status, guarded on the status it had when read, and
+        keep course counters in step whenever it enters or leaves APPROVED.
+        Returns the updated review, or None if it does not exist.
+        """
+        for _ in range(3):
+            current = await Review.find_one(id_filter(review_id))
+            if not current:
+                return None
+            
+            review = await find_one_and_update(
+                Review,
+                {"_id": current.id, "status": current.status},
+                AtomicUpdate().set("status", status).set_many(fields or {})
+            )
+            if not review:
+                continue  # Status changed since the read - re-evaluate
+            
+            # Update course stats if the review entered or left the approved set
+            was_approved = current.status == ReviewStatus.APPROVED
+            is_approved = review.status == ReviewStatus.APPROVED
+            if is_approved != was_approved:
+                sign = 1 if is_approved else -1
+                await course_counter_service.apply_review_delta(review.course_id, sign, sign * review.rating)
+            return review
+        
+        raise ValueError("Review is being modified, please retry")
 
     async def get_course_stats(self, course_id: str) -> Dict:
         """Get review statistics for a course"""
@@ -397,17 +435,6 @@ class ReviewService:
             "recent_reviews": [self._format_review(r) for r in recent_reviews]
         }
 
-    async def _update_course_stats(self, course_id: str):
-        """Update course rating statistics"""
-        stats = await self.get_course_stats(course_id)
-        
-        # Update course model
-        course = await Course.get(course_id)
-        if course:
-            course.stats.average_rating = stats["average_rating"]
-            course.stats.total_reviews = stats["total_reviews"]
-            await course.save()
-
     def _format_review(self, review: Review) -> Dict:
         """Format review for response"""
         return {
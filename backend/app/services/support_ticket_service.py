@@ -15,6 +15,9 @@ from app.schemas.support_ticket import (
     TicketSearchQuery
 )
 from app.core.email import email_service
+from app.core.config import settings
+from app.utils.search import SearchBuilder
+from app.utils.pagination import keyset_sort, apply_cursor, paginate_results, count_documents
 
 
 class SupportTicketService:
@@ -182,13 +185,6 @@ class SupportTicketService:
         elif query.user_id:
             filter_dict["user_id"] = query.user_id
         
-        # Search filters
-        if query.q:
-            filter_dict["$or"] = [
-                {"title": {"$regex": query.q, "$options": "i"}},
-                {"description": {"$regex": query.q, "$options": "i"}}
-            ]
-        
         if query.status:
             filter_dict["status"] = query.status
         if query.priority:
@@ -207,17 +203,29 @@ class SupportTicketService:
                 date_filter["$lte"] = query.date_to
             filter_dict["created_at"] = date_filter
         
-        # Count total
-        total = await SupportTicket.find(filter_dict).count()
+        # Search filters
+        if query.q:
+            search_filter, _ = await SearchBuilder.build_search_filter(
+                SupportTicket.get_motor_collection(),
+                query.q,
+                SearchBuilder.get_support_search_config(),
+                base_filter=filter_dict,
+                allow_fallback=settings.SEARCH_REGEX_FALLBACK
+            )
+            filter_dict.update(search_filter)
+        
+        # Count total (cached across cursor pages)
+        total = await count_documents(SupportTicket.get_motor_collection(), filter_dict, cached=bool(query.cursor))
         
         # Sort
-        sort_field = query.sort_by
-        if query.sort_order == "desc":
-            sort_field = f"-{sort_field}"
+        sort = keyset_sort([(query.sort_by, -1 if query.sort_order == "desc" else 1)])
         
         # Fetch paginated results
-        skip = (query.page - 1) * query.per_page
-        tickets = await SupportTicket.find(filter_dict).sort(sort_field).skip(skip).limit(query.per_page).to_list()
+        tickets_query = SupportTicket.find(apply_cursor(filter_dict, sort, query.cursor)).sort(sort)
+        if not query.cursor:
+            tickets_query = tickets_query.skip((query.page - 1) * query.per_page)
+        tickets = await tickets_query.limit(query.per_page + 1).to_list()
+        tickets, next_cursor = paginate_results(tickets, query.per_page, sort)
         
         # Return raw Pydantic models - endpoint will handle conversion with is_unread computation
         return {
@@ -225,7 +233,8 @@ class SupportTicketService:
             "total": total,
             "page": query.page,
             "per_page": query.per_page,
-            "total_pages": (total + query.per_page - 1) // query.per_page
+            "total_pages": (total + query.per_page - 1) // query.per_page,
+            "next_cursor": next_cursor
         }
 
     async def search_tickets_with_unread_aggregation(
@@ -247,13 +256,6 @@ class SupportTicketService:
         elif query.user_id:
             match_stage["user_id"] = query.user_id
         
-        # Search filters
-        if query.q:
-            match_stage["$or"] = [
-                {"title": {"$regex": query.q, "$options": "i"}},
-                {"description": {"$regex": query.q, "$options": "i"}}
-            ]
-        
         if query.status:
             match_stage["status"] = query.status
         if query.priority:
@@ -272,6 +274,17 @@ class SupportTicketService:
                 date_filter["$lte"] = query.date_to
             match_stage["created_at"] = date_filter
         
+        # Search filters
+        if query.q:
+            search_filter, _ = await SearchBuilder.build_search_filter(
+                SupportTicket.get_motor_collection(),
+                query.q,
+                SearchBuilder.get_support_search_config(),
+                base_filter=match_stage,
+                allow_fallback=settings.SEARCH_REGEX_FALLBACK
+            )
+            match_stage.update(search_filter)
+        
         # Build aggregation pipeline
         pipeline = [
             {"$match": match_stage},
@@ -1,24 +1,155 @@
 """
 Token Blacklist Service
-Manages JWT token invalidation for secure logout
+Manages JWT token invalidation for secure logout.
+Revocation checks are served from an in-memory index that is synced
+incrementally from the blacklisted_tokens collection.
 """
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
 import logging
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
 from jose import jwt, JWTError
 
-from app.core.config import settings
 from app.core.database import get_database
 
 logger = logging.getLogger(__name__)
 
 
+class RevocationIndex:
+    """
+    In-memory view of blacklisted_tokens.
+    Holds hashes of revoked tokens and per-user "revoked before" timestamps
+    (blanket blacklists). Synced with a polling cursor on blacklisted_at/updated_at,
+    plus a periodic full reload to pick up deleted entries.
+    """
+    
+    def __init__(self, collection_name: str, sync_interval: float = 5, full_sync_interval: float = 300):
+        self.collection_name = collection_name
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.token_hashes: Dict[bytes, datetime] = {}  # token hash -> expires_at
+        self.user_revocations: Dict[str, Dict[str, Tuple[datetime, datetime]]] = {}  # user_id -> {entry_id: (revoked_before, expires_at)}
+        self.cursor: Optional[datetime] = None
+        self.last_sync = 0.0
+        self.last_full_sync = 0.0
+        self._lock = asyncio.Lock()
+    
+    @staticmethod
+    def hash_token(token: str) -> bytes:
+        """Compact token fingerprint (128-bit SHA-256 prefix)"""
+        return hashlib.sha256(token.encode()).digest()[:16]
+    
+    def add_token(self, token: str, expires_at: datetime) -> None:
+        self.token_hashes[self.hash_token(token)] = expires_at
+    
+    def add_user_revocation(self, entry_id: str, user_id: str, revoked_before: datetime, expires_at: datetime) -> None:
+        self.user_revocations.setdefault(user_id, {})[entry_id] = (revoked_before, expires_at)
+    
+    def remove_user_revocations(self, user_id: str) -> None:
+        self.user_revocations.pop(user_id, None)
+    
+    def _apply(self, doc: Dict[str, Any], now: datetime) -> None:
+        """Apply one blacklisted_tokens document to the index"""
+        expires_at = doc.get("expires_at")
+        active = expires_at is not None and expires_at > now
+        
+        if doc.get("all_tokens"):
+            user_id = doc.get("user_id")
+            entry_id = str(doc["_id"])
+            if active:
+                self.add_user_revocation(entry_id, user_id, doc.get("blacklisted_at") or now, expires_at)
+            elif user_id in self.user_revocations:
+                self.user_revocations[user_id].pop(entry_id, None)
+                if not self.user_revocations[user_id]:
+                    del self.user_revocations[user_id]
+        elif doc.get("token"):
+            if active:
+                self.add_token(doc["token"], expires_at)
+            else:
+                self.token_hashes.pop(self.hash_token(doc["token"]), None)
+    
+    async def sync(self, full: bool = False) -> None:
+        """Load changes since the last cursor (or everything when full)"""
+        db = get_database()
+        now = datetime.utcnow()
+        projection = {"token": 1, "user_id": 1, "all_tokens": 1, "blacklisted_at": 1, "updated_at": 1, "expires_at": 1}
+        
+        if full or self.cursor is None:
+            docs = await db[self.collection_name].find(
+                {"expires_at": {"$gt": now}}, projection
+            ).to_list(None)
+            self.token_hashes = {}
+            self.user_revocations = {}
+            self.last_full_sync = time.monotonic()
+        else:
+            # Overlap the cursor to tolerate clock skew between instances
+            since = self.cursor - timedelta(seconds=30)
+            docs = await db[self.collection_name].find(
+                {"$or": [{"blacklisted_at": {"$gte": since}}, {"updated_at": {"$gte": since}}]},
+                projection
+            ).to_list(None)
+        
+        for doc in docs:
+            self._apply(doc, now)
+        
+        # Drop naturally expired entries
+        self.token_hashes = {h: exp for h, exp in self.token_hashes.items() if exp > now}
+        for user_id in list(self.user_revocations):
+            entries = {k: v for k, v in self.user_revocations[user_id].items() if v[1] > now}
+            if entries:
+                self.user_revocations[user_id] = entries
+            else:
+                del self.user_revocations[user_id]
+        
+        self.cursor = now
+        self.last_sync = time.monotonic()
+    
+    async def ensure_fresh(self) -> None:
+        """Sync at most once per sync_interval; never more than one sync in flight"""
+        elapsed = time.monotonic() - self.last_sync
+        if self.cursor is not None and elapsed < self.sync_interval:
+            return
+        
+        async with self._lock:
+            if self.cursor is not None and time.monotonic() - self.last_sync < self.sync_interval:
+                return
+            full = time.monotonic() - self.last_full_sync >= self.full_sync_interval
+            try:
+                await self.sync(full=full)
+            except Exception as e:
+                # Keep serving the last known index; retry on next interval
+                self.last_sync = time.monotonic()
+                logger.error(f"Failed to sync token revocation index: {str(e)}")
+    
+    def is_token_revoked(self, token: str, now: datetime) -> bool:
+        expires_at = self.token_hashes.get(self.hash_token(token))
+        return expires_at is not None and expires_at > now
+    
+    def is_user_revoked(self, user_id: Optional[str], issued_at: Optional[float], now: datetime) -> bool:
+        """Token is revoked if issued before an active blanket blacklist (or has no iat)"""
+        if not user_id or user_id not in self.user_revocations:
+            return False
+        
+        for revoked_before, expires_at in self.user_revocations[user_id].values():
+            if expires_at <= now:
+                continue
+            if issued_at is None:
+                return True
+            if issued_at < revoked_before.replace(tzinfo=timezone.utc).timestamp():
+                return True
+        
+        return False
+
+
 class TokenBlacklistService:
     """Service for managing blacklisted JWT tokens"""
     
     def __init__(self):
         self.collection_name = "blacklisted_tokens"
+        self.index = RevocationIndex(self.collection_name)
         
     async def blacklist_token(self, token: str, user_id: str, expires_at: datetime) -> bool:
         """
@@ -50,6 +181,7 @@ class TokenBlacklistService:
                 {"$set": blacklist_doc},
                 upsert=True
             )
+            self.index.add_token(token, expires_at)
             
             logger.info(f"Token blacklisted for user {user_id}")
             return True
@@ -58,47 +190,40 @@ class TokenBlacklistService:
             logger.error(f"Failed to blacklist token: {str(e)}")
             return False
     
-    async def is_token_blacklisted(self, token: str) -> bool:
+    async def is_token_blacklisted(self, token: str, payload: Optional[dict] = None) -> bool:
         """
         Check if a token is blacklisted (specific token OR user blanket)
+        Served from the in-memory revocation index; no I/O in the common case.
 
         Args:
             token: JWT token to check
+            payload: Already decoded claims, if available
 
         Returns:
             bool: True if token is blacklisted
         """
         try:
-            db = get_database()
+            await self.index.ensure_fresh()
+            now = datetime.utcnow()
 
             # Check specific token blacklist
-            if await db[self.collection_name].find_one({
-                "token": token,
-                "expires_at": {"$gt": datetime.utcnow()}
-            }):
+            if self.index.is_token_revoked(token, now):
                 return True
 
-            # Decode token to check user blanket blacklist
-            try:
-                payload = jwt.decode(
-                    token,
-                    settings.JWT_SECRET,
-                    algorithms=[settings.JWT_ALGORITHM],
-                    options={"verify_exp": False}  # Don't verify expiry, just get user_id
-                )
-                user_id = payload.get("sub")
+            # Check user blanket blacklist (only decode when any exist)
+            if self.index.user_revocations:
+                if payload is None:
+                    try:
+                        # Claims are only used to deny, so signature is not needed here
+                        payload = jwt.get_unverified_claims(token)
+                    except JWTError:
+                        return False  # Can't decode = can't check user blacklist
 
-                if user_id and await db[self.collection_name].find_one({
-                    "user_id": user_id,
-                    "all_tokens": True,
-                    "expires_at": {"$gt": datetime.utcnow()}
-                }):
+                user_id = payload.get("sub")
+                if self.index.is_user_revoked(user_id, payload.get("iat"), now):
                     logger.info(f"Token blocked by blanket blacklist for user {user_id}")
                     return True
 
-            except JWTError:
-                pass  # Can't decode = can't check user blacklist
-
             return False
 
         except Exception as e:
@@ -153,7 +278,13 @@ class TokenBlacklistService:
                 "all_tokens": True
             }
             
-            await db[self.collection_name].insert_one(blanket_blacklist)
+            result = await db[self.collection_name].insert_one(blanket_blacklist)
+            self.index.add_user_revocation(
+                str(result.inserted_id),
+                user_id,
+                blanket_blacklist["blacklisted_at"],
+                blanket_blacklist["expires_at"]
+            )
             
             logger.warning(f"All tokens blacklisted for user {user_id} due to security incident")
             return True
@@ -162,6 +293,35 @@ class TokenBlacklistService:
             logger.error(f"Failed to blacklist all user tokens: {str(e)}")
             return False
     
+    async def clear_user_blacklist(self, user_id: str) -> int:
+        """
+        Lift blanket blacklists for a user (e.g. on reactivation)
+        
+        Entries are expired rather than deleted so other instances pick up
+        the change on their next incremental sync.
+        
+        Args:
+            user_id: User ID to clear
+            
+        Returns:
+            int: Number of blanket entries cleared
+        """
+        try:
+            db = get_database()
+            now = datetime.utcnow()
+            
+            result = await db[self.collection_name].update_many(
+                {"user_id": user_id, "all_tokens": True, "expires_at": {"$gt": now}},
+                {"$set": {"expires_at": now, "updated_at": now}}
+            )
+            self.index.remove_user_revocations(user_id)
+            
+            return result.modified_count
+            
+        except Exception as e:
+            logger.error(f"Failed to clear user blacklist: {str(e)}")
+            return 0
+    
     async def get_blacklist_stats(self) -> dict:
         """
         Get statistics about the token blacklist
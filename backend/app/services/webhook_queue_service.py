@@ -0,0 +1,247 @@
+"""
+Stripe webhook queue.
+The webhook endpoint only verifies the event and inserts it into
+`webhook_events` keyed by the Stripe event id (duplicates are dropped), then
+returns 200. Background workers process events per customer, in event order,
+under a short per-customer lease so several workers/instances can run at once.
+Consecutive subscription updates for a customer are coalesced into one write.
+Failed events are retried with backoff and can be replayed by an admin.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import uuid
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.services.payment_service import PaymentService
+
+logger = logging.getLogger(__name__)
+
+# Events whose effect is "set the customer's subscription state" - only the latest matters
+SUBSCRIPTION_STATE_EVENTS = {
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "subscription.created",
+    "subscription.updated"
+}
+
+
+class WebhookQueueService:
+    """Durable, deduplicated webhook event queue with ordered background processing"""
+
+    COLLECTION = "webhook_events"
+    LOCKS_COLLECTION = "webhook_event_locks"
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    @staticmethod
+    def _ordering_key(event: Dict[str, Any]) -> str:
+        """Events for the same customer are processed in order"""
+        event_object = event.get("data", {}).get("object", {}) or {}
+        customer = event_object.get("customer")
+        if isinstance(customer, dict):
+            customer = customer.get("id")
+        return f"customer:{customer}" if customer else f"event:{event.get('id')}"
+
+    async def ingest(self, event: Dict[str, Any]) -> bool:
+        """Persist a verified event. Returns False if it was already received."""
+        now = datetime.utcnow()
+        # Stripe objects -> plain dicts for storage
+        to_dict = getattr(event, "to_dict_recursive", None) or getattr(event, "to_dict", None)
+        payload = to_dict() if callable(to_dict) else dict(event)
+        try:
+            await get_database()[self.COLLECTION].insert_one({
+                "_id": event.get("id") or f"evt_local_{uuid.uuid4().hex}",
+                "type": event.get("type"),
+                "ordering_key": self._ordering_key(event),
+                "event_created": event.get("created") or int(now.timestamp()),
+                "payload": payload,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "received_at": now
+            })
+        except DuplicateKeyError:
+            logger.info(f"Duplicate webhook event ignored: {event.get('id')}")
+            return False
+
+        self._wakeup.set()
+        return True
+
+    async def replay(self, event_id: Optional[str] = None, status: str = "failed") -> int:
+        """Re-queue one event (any status) or all events with the given status"""
+        query: Dict[str, Any] = {"_id": event_id} if event_id else {"status": status}
+        result = await get_database()[self.COLLECTION].update_many(
+            query,
+            {
+                "$set": {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow()},
+                "$unset": {"last_error": "", "expires_at": ""}
+            }
+        )
+        if result.modified_count:
+            self._wakeup.set()
+        return result.modified_count
+
+    async def get_stats(self) -> Dict[str, int]:
+        rows = await get_database()[self.COLLECTION].aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        return {row["_id"]: row["count"] for row in rows}
+
+    def start(self) -> None:
+        """Start WEBHOOK_WORKERS processing workers"""
+        if self._workers or settings.WEBHOOK_WORKERS <= 0:
+            return
+        self._workers = [
+            asyncio.create_task(self._run_worker(index))
+            for index in range(settings.WEBHOOK_WORKERS)
+        ]
+        logger.info(f"Webhook queue started with {len(self._workers)} workers")
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_worker(self, index: int) -> None:
+        while True:
+            try:
+                processed = await self._process_batch()
+                if not processed:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=settings.WEBHOOK_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook worker {index} error: {e}")
+                await asyncio.sleep(settings.WEBHOOK_POLL_INTERVAL)
+
+    async def _process_batch(self) -> int:
+        """Pick due events, then drain each customer's queue under its lease"""
+        collection = get_database()[self.COLLECTION]
+        due = await collection.find(
+            {"status": "pending", "next_attempt_at": {"$lte": datetime.utcnow()}},
+            {"ordering_key": 1}
+        ).sort("received_at", 1).limit(settings.WEBHOOK_BATCH_SIZE).to_list(None)
+
+        processed = 0
+        for ordering_key in dict.fromkeys(event["ordering_key"] for event in due):
+            token = await self._acquire(ordering_key)
+            if token is None:
+                continue  # Another worker owns this customer
+            try:
+                processed += await self._process_key(ordering_key)
+            finally:
+                await self._release(ordering_key, token)
+        return processed
+
+    async def _acquire(self, ordering_key: str) -> Optional[str]:
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        try:
+            await get_database()[self.LOCKS_COLLECTION].update_one(
+                {"_id": ordering_key, "locked_until": {"$lte": now}},
+                {"$set": {
+                    "owner": token,
+                    "locked_until": now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return None
+        return token
+
+    async def _release(self, ordering_key: str, token: str) -> None:
+        await get_database()[self.LOCKS_COLLECTION].delete_one({"_id": ordering_key, "owner": token})
+
+    async def _process_key(self, ordering_key: str) -> int:
+        """Process one customer's pending events in event order; stop at the first failure"""
+        collection = get_database()[self.COLLECTION]
+        events = await collection.find({
+            "ordering_key": ordering_key,
+            "status": "pending"
+        }).sort([("event_created", 1), ("received_at", 1)]).to_list(None)
+
+        # Coalesce runs of subscription state events into the latest one
+        groups: List[List[Dict[str, Any]]] = []
+        for event in events:
+            if (
+                groups
+                and event["type"] in SUBSCRIPTION_STATE_EVENTS
+                and groups[-1][-1]["type"] in SUBSCRIPTION_STATE_EVENTS
+            ):
+                groups[-1].append(event)
+            else:
+                groups.append([event])
+
+        now = datetime.utcnow()
+        done_ids: List[str] = []
+        failure: Optional[Dict[str, Any]] = None
+        error: Optional[str] = None
+        for group in groups:
+            # An earlier event waiting for retry blocks the rest of the queue
+            if any(event["next_attempt_at"] > now for event in group):
+                break
+            latest = group[-1]
+            try:
+                ok = await PaymentService.handle_webhook_event(latest["payload"])
+            except Exception as e:
+                ok, error = False, str(e)
+            if not ok:
+                failure = latest
+                break
+            done_ids.extend(event["_id"] for event in group)
+
+        now = datetime.utcnow()
+        if done_ids:
+            await collection.update_many(
+                {"_id": {"$in": done_ids}},
+                {"$set": {
+                    "status": "processed",
+                    "processed_at": now,
+                    "expires_at": now + timedelta(days=settings.WEBHOOK_RETENTION_DAYS)
+                }}
+            )
+
+        if failure is not None:
+            await self._mark_failed_attempt(failure, error or "Handler returned failure")
+
+        return len(done_ids)
+
+    async def _mark_failed_attempt(self, event: Dict[str, Any], error: str) -> None:
+        attempts = event.get("attempts", 0) + 1
+        collection = get_database()[self.COLLECTION]
+
+        if attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            logger.error(f"Webhook event {event['_id']} ({event['type']}) failed after {attempts} attempts: {error}")
+            update = {"status": "failed"}
+        else:
+            delay = min(settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600)
+            update = {"next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)}
+
+        await collection.update_one(
+            {"_id": event["_id"]},
+            {"$set": {**update, "attempts": attempts, "last_error": error}}
+        )
+
+
+# Global queue instance
+webhook_queue_service = WebhookQueueService()
@@ -0,0 +1,147 @@
+"""
+Keyset (cursor) pagination helpers.
+Cursors are opaque tokens holding the sort key values of the last item on a
+page, so the next page is an indexed range query instead of skip().
+Page-number mode stays available for backward compatibility.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import base64
+import json
+import logging
+
+from bson import json_util
+from fastapi import HTTPException
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SortSpec = List[Tuple[str, int]]
+
+# Short-lived totals for cursor mode (deep pages shouldn't re-count every time)
+count_cache = LRUCache(maxsize=1000, ttl=settings.PAGINATION_COUNT_CACHE_TTL)
+
+
+def keyset_sort(sort: Sequence[Tuple[str, int]]) -> SortSpec:
+    """Append _id as tie-breaker so the sort order is total"""
+    sort = [(field, direction) for field, direction in sort]
+    if not any(field == "_id" for field, _ in sort):
+        sort.append(("_id", sort[-1][1] if sort else -1))
+    return sort
+
+
+def encode_cursor(values: List[Any], sort: SortSpec) -> str:
+    """Encode sort key values into an opaque URL-safe token"""
+    payload = json_util.dumps({"s": [field for field, _ in sort], "v": values})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    """Decode a cursor, rejecting tokens issued for a different sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = payload["v"]
+        fields = payload["s"]
+    except (ValueError, KeyError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if fields != [field for field, _ in sort] or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Pagination cursor does not match the requested sort")
+
+    return values
+
+
+def _after_clause(field: str, direction: int, value: Any) -> Optional[Dict]:
+    """Condition for values strictly after `value` in sort order (nulls sort first)"""
+    if direction > 0:
+        return {field: {"$ne": None}} if value is None else {field: {"$gt": value}}
+
+    if value is None:
+        return None
+    if field == "_id":
+        return {field: {"$lt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def build_keyset_filter(sort: SortSpec, values: List[Any]) -> Dict:
+    """
+    Range filter for the page after the given sort values:
+    (a > x) or (a == x and b > y) or ...
+    """
+    or_conditions = []
+    for index, (field, direction) in enumerate(sort):
+        clause = _after_clause(field, direction, values[index])
+        if clause is None:
+            continue
+        prefix = {prefix_field: values[i] for i, (prefix_field, _) in enumerate(sort[:index])}
+        or_conditions.append({**prefix, **clause} if prefix else clause)
+
+    # Nothing sorts after the cursor
+    if not or_conditions:
+        return {"_id": {"$exists": False}}
+
+    return {"$or": or_conditions} if len(or_conditions) > 1 else or_conditions[0]
+
+
+def apply_cursor(query: Dict, sort: SortSpec, cursor: Optional[str]) -> Dict:
+    """Combine a filter with the keyset range for the given cursor"""
+    if not cursor:
+        return query
+
+    keyset_filter = build_keyset_filter(sort, decode_cursor(cursor, sort))
+    if not query:
+        return keyset_filter
+    return {"$and": [query, keyset_filter]}
+
+
+def _sort_value(item: Any, field: str) -> Any:
+    """Read a (dotted) sort field from a raw document or a Beanie model"""
+    value = item
+    for part in field.split("."):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif part == "_id":
+            value = getattr(value, "id", None)
+        else:
+            value = getattr(value, part, None)
+        if value is None:
+            return None
+
+    # Enum values are stored as plain strings
+    return getattr(value, "value", value)
+
+
+def paginate_results(items: List[Any], per_page: int, sort: SortSpec) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a page fetched with limit(per_page + 1).
+    Returns the page items and the cursor for the next page (None on the last page).
+    """
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, encode_cursor([_sort_value(last, field) for field, _ in sort], sort)
+
+
+async def count_documents(collection: Any, query: Dict, cached: bool = False) -> int:
+    """
+    Count matching documents.
+    Unfiltered counts use collection metadata; cached=True reuses a recent
+    total for the same filter (cursor mode).
+    """
+    if not query:
+        return await collection.estimated_document_count()
+
+    if not cached:
+        return await collection.count_documents(query)
+
+    key = f"{collection.name}:{json_util.dumps(query, sort_keys=True)}"
+    total = count_cache.get(key)
+    if total is None:
+        total = await collection.count_documents(query)
+        count_cache.set(key, total)
+    return total
@@ -3,9 +3,13 @@ Unified Search Logic for All Endpoints
 Smart search với relevance scoring và performance optimization
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import re
+import logging
 from pymongo import TEXT
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
 
 
 class SearchBuilder:
@@ -88,6 +92,61 @@ class SearchBuilder:
 
         return query, aggregation_pipeline
 
+    @staticmethod
+    def build_text_search_query(search_term: str) -> Dict:
+        """
+        Build $text query served by the weighted text index.
+        Relevance comes from the index weights (same as search configs).
+        """
+        return {"$text": {"$search": search_term.strip()}}
+
+    @staticmethod
+    def build_fallback_query(search_term: str, config: Dict[str, Dict]) -> Dict:
+        """Escaped case-insensitive match for partial words the text index can't find"""
+        escaped_term = re.escape(search_term.strip())
+        return {
+            "$or": [
+                {field: {"$regex": escaped_term, "$options": "i"}}
+                for field in config
+            ]
+        }
+
+    @staticmethod
+    async def build_search_filter(
+        collection: Any,
+        search_term: str,
+        config: Dict[str, Dict],
+        base_filter: Optional[Dict] = None,
+        allow_fallback: bool = False
+    ) -> Tuple[Dict, bool]:
+        """
+        Pick the search filter for a collection.
+
+        Always the text index by default. With `allow_fallback` the index is
+        first probed within the caller's `base_filter` (access scope, status...)
+        and an unanchored regex - a collection scan - runs for partial words
+        (e.g. "respon") or when the index is missing.
+
+        Returns:
+            Tuple[filter, uses_text_index]
+        """
+        if not search_term or not search_term.strip():
+            return {}, False
+
+        text_query = SearchBuilder.build_text_search_query(search_term)
+        if not allow_fallback:
+            return text_query, True
+
+        try:
+            # Cheap indexed probe - one _id from the text index, within the caller's scope
+            probe = {**(base_filter or {}), **text_query}
+            if await collection.find_one(probe, {"_id": 1}):
+                return text_query, True
+        except OperationFailure as e:
+            logger.warning(f"Text search unavailable on {collection.name}, using regex: {e}")
+
+        return SearchBuilder.build_fallback_query(search_term, config), False
+
     @staticmethod
     def get_courses_search_config() -> Dict[str, Dict]:
         """Configuration for courses search"""
@@ -136,24 +195,24 @@ class SearchOptimizer:
         return len(search_term.split()) >= 2
 
     @staticmethod
-    def create_text_indexes() -> Dict[str, List[Tuple[str, str]]]:
-        """Define text indexes for collections"""
+    def text_index_for(collection: str, config: Dict[str, Dict]) -> Dict:
+        """Text index definition weighted like the search config"""
         return {
-            "courses": [
-                ("title", TEXT),
-                ("description", TEXT),
-                ("creator_name", TEXT)
-            ],
-            "users": [
-                ("name", TEXT),
-                ("email", TEXT)
-            ],
-            "faqs": [
-                ("question", TEXT),
-                ("answer", TEXT)
-            ],
-            "support_tickets": [
-                ("title", TEXT),
-                ("description", TEXT)
-            ]
-        }
\ No newline at end of file
+            "collection": collection,
+            "index": [(field, TEXT) for field in config],
+            "options": {
+                "weights": {field: settings.get("weight", 1) for field, settings in config.items()},
+                # No stemming/stop words - content is mixed Vietnamese/English
+                "default_language": "none"
+            }
+        }
+
+    @staticmethod
+    def create_text_indexes() -> List[Dict]:
+        """Define text indexes for collections (DatabaseOptimizer index format)"""
+        return [
+            SearchOptimizer.text_index_for("courses", SearchBuilder.get_courses_search_config()),
+            SearchOptimizer.text_index_for("users", SearchBuilder.get_users_search_config()),
+            SearchOptimizer.text_index_for("faqs", SearchBuilder.get_faq_search_config()),
+            SearchOptimizer.text_index_for("support_tickets", SearchBuilder.get_support_search_config())
+        ]
\ No newline at end of file